@@ -0,0 +1,113 @@
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import User, Message, ConversationSummary
+
+# Async twins of the request-path functions in crud.py,
+# used by the endpoints that run on the event loop.
+
+
+# ---------- USER ----------
+
+async def get_user_by_google_id(db: AsyncSession, google_id):
+    result = await db.execute(select(User).where(User.google_id == google_id))
+    return result.scalars().first()
+
+
+async def get_or_create_user(db: AsyncSession, google_id, email, name, commit=True):
+    """With commit=False the new user is only flushed (id assigned)."""
+    user = await get_user_by_google_id(db, google_id)
+
+    if not user:
+        user = User(
+            google_id=google_id,
+            email=email,
+            name=name
+        )
+        db.add(user)
+        if commit:
+            await db.commit()
+            await db.refresh(user)
+        else:
+            await db.flush()
+
+    return user
+
+
+# ---------- MESSAGE ----------
+
+async def save_message(db: AsyncSession, user_id, role, content):
+    db.add(Message(
+        user_id=user_id,
+        role=role,
+        content=content
+    ))
+    await db.commit()
+
+
+async def save_turn(db: AsyncSession, google_id, email, name, question, reply=None, asked_at=None):
+    """
+    Saves one chat turn - user (if new), question and reply -
+    in a single transaction. `reply` is None when generation failed.
+    """
+    try:
+        user = await get_or_create_user(db, google_id, email, name, commit=False)
+        db.add(Message(user_id=user.id, role="user", content=question, timestamp=asked_at))
+        if reply is not None:
+            db.add(Message(user_id=user.id, role="assistant", content=reply))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return user
+
+
+async def get_recent_messages(db: AsyncSession, user_id, n, after_id=None):
+    """Last `n` messages of a user (newer than `after_id`), oldest first."""
+    query = select(Message).where(Message.user_id == user_id)
+    if after_id:
+        query = query.where(Message.id > after_id)
+
+    result = await db.execute(
+        query.order_by(Message.id.desc()).limit(n)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def get_messages_page(db: AsyncSession, user_id, limit, before_id=None):
+    """
+    One page of history, newest page first, messages oldest first.
+
+    Returns:
+        tuple: (messages, next_cursor) - next_cursor is None on the last page
+    """
+    query = select(Message).where(Message.user_id == user_id)
+    if before_id is not None:
+        query = query.where(Message.id < before_id)
+
+    result = await db.execute(
+        query.order_by(Message.id.desc()).limit(limit + 1)
+    )
+    rows = result.scalars().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if has_more else None
+    return list(reversed(rows)), next_cursor
+
+
+async def count_messages_after(db: AsyncSession, user_id, after_id=0):
+    result = await db.execute(
+        select(func.count(Message.id))
+        .where(Message.user_id == user_id, Message.id > (after_id or 0))
+    )
+    return result.scalar_one()
+
+
+# ---------- SUMMARY ----------
+
+async def get_summary(db: AsyncSession, user_id):
+    result = await db.execute(
+        select(ConversationSummary).where(ConversationSummary.user_id == user_id)
+    )
+    return result.scalars().first()
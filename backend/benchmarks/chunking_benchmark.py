@@ -0,0 +1,111 @@
+# ==============================
+# chunking_benchmark.py - Compare chunk settings offline
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.chunking_benchmark --docs backend/rag/docs
+#   python -m backend.benchmarks.chunking_benchmark --sizes 400,800,1200 --overlaps 0,120
+#
+# Queries are sentences sampled from the corpus; a hit means a top-k chunk
+# contains that sentence's page offset. Reports hit@k, MRR and how many
+# prompt tokens the top-k chunks cost.
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_community.document_loaders import PyPDFLoader
+
+from backend.context_builder import count_tokens
+from backend.rag.chunking import split_documents, _sentence_spans
+from backend.rag.embeddings import get_embeddings
+
+DEFAULT_DOCS = Path(__file__).parent.parent / "rag" / "docs"
+
+
+def load_pages(folder: Path):
+    pages = []
+    for pdf in sorted(folder.glob("*.pdf")):
+        pages.extend(PyPDFLoader(str(pdf)).load())
+    return pages
+
+
+def sample_queries(pages, count: int, seed: int):
+    """(query text, source, page, offset) for sentences of a useful length."""
+    candidates = []
+    for page in pages:
+        text = page.page_content
+        for start, end in _sentence_spans(text):
+            if 40 <= end - start <= 300:
+                candidates.append((
+                    text[start:end],
+                    page.metadata.get("source"),
+                    page.metadata.get("page"),
+                    start,
+                ))
+    random.Random(seed).shuffle(candidates)
+    return candidates[:count]
+
+
+def evaluate(pages, queries, query_vectors, chunk_size, chunk_overlap, k):
+    chunks = split_documents(pages, chunk_size, chunk_overlap)
+
+    start = time.perf_counter()
+    matrix = np.asarray(get_embeddings().embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+
+    scores = query_vectors @ matrix.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+
+    hits, reciprocal_ranks, prompt_tokens = 0, 0.0, []
+    for (_, source, page, offset), row in zip(queries, top):
+        prompt_tokens.append(sum(count_tokens(chunks[i].page_content) for i in row))
+        for rank, i in enumerate(row, start=1):
+            meta = chunks[i].metadata
+            if (meta.get("source") == source and meta.get("page") == page
+                    and meta["start_offset"] <= offset < meta["end_offset"]):
+                hits += 1
+                reciprocal_ranks += 1 / rank
+                break
+
+    return {
+        "chunk_size": chunk_size,
+        "overlap": chunk_overlap,
+        "chunks": len(chunks),
+        f"hit@{k}": round(hits / len(queries), 3),
+        "mrr": round(reciprocal_ranks / len(queries), 3),
+        "avg_prompt_tokens": round(float(np.mean(prompt_tokens)), 1),
+        "embed_seconds": round(embed_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=Path, default=DEFAULT_DOCS)
+    parser.add_argument("--sizes", default="300,500,800,1200")
+    parser.add_argument("--overlaps", default="0,120")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pages = load_pages(args.docs)
+    queries = sample_queries(pages, args.queries, args.seed)
+    if not queries:
+        raise SystemExit(f"No usable text found in {args.docs}")
+
+    query_vectors = np.asarray(get_embeddings().embed_documents([q[0] for q in queries]), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True) + 1e-12
+
+    print(f"{len(pages)} pages, {len(queries)} queries, k={args.k}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for overlap in [int(o) for o in args.overlaps.split(",")]:
+            if overlap >= size:
+                continue
+            print(evaluate(pages, queries, query_vectors, size, overlap, args.k))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# ==============================
+# corpus.py - Synthetic PDF corpus for benchmarks
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.corpus --out /tmp/corpus --docs 20 --pages 10
+#
+# Writes small but real PDFs (plain text pages, standard Helvetica font)
+# without any PDF library, so benchmarks need nothing beyond the app's own
+# dependencies. Text is generated from a fixed seed: the same arguments
+# always produce byte-identical files.
+
+import argparse
+import random
+import textwrap
+from pathlib import Path
+
+TOPICS = {
+    "caching": "cache eviction ttl hit ratio memory lru invalidation warmup key",
+    "databases": "transaction index query pool connection wal commit replica lock",
+    "retrieval": "embedding vector similarity chunk rerank bm25 fusion recall index",
+    "networking": "latency bandwidth socket timeout retry backoff packet congestion tls",
+    "scheduling": "queue worker batch throughput backpressure deadline priority thread",
+    "compilers": "parser token grammar optimization register inlining loop bytecode",
+}
+FILLER = "the a this that each our system when which because therefore however also".split()
+
+LINES_PER_PAGE = 40
+CHARS_PER_LINE = 90
+
+
+def _sentence(rng, words):
+    n = rng.randint(8, 18)
+    tokens = [rng.choice(words) if rng.random() < 0.55 else rng.choice(FILLER) for _ in range(n)]
+    return " ".join(tokens).capitalize() + "."
+
+
+def page_text(rng, topic: str, doc: int, page: int):
+    """One page of deterministic prose about `topic`."""
+    words = TOPICS[topic].split()
+    lines = [f"Document {doc} - {topic.title()} - Page {page + 1}", ""]
+    while len(lines) < LINES_PER_PAGE:
+        paragraph = " ".join(_sentence(rng, words) for _ in range(rng.randint(3, 6)))
+        lines += textwrap.wrap(paragraph, CHARS_PER_LINE) + [""]
+    return lines[:LINES_PER_PAGE]
+
+
+def _escape(line: str):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages):
+    """Writes `pages` (lists of text lines) as a minimal PDF 1.4 file."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        ops += [f"({_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def generate_corpus(out_dir, docs: int = 20, pages: int = 10, seed: int = 0, prefix: str = "doc"):
+    """
+    Writes `docs` PDFs of `pages` pages each into `out_dir`.
+
+    Returns:
+        list of Path, the generated files
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    topics = sorted(TOPICS)
+    paths = []
+    for doc in range(docs):
+        rng = random.Random(f"{seed}/{prefix}/{doc}")
+        topic = topics[doc % len(topics)]
+        path = out_dir / f"{prefix}_{doc:04d}_{topic}.pdf"
+        write_pdf(path, [page_text(rng, topic, doc, page) for page in range(pages)])
+        paths.append(path)
+    return paths
+
+
+def questions(count: int, seed: int = 0):
+    """Deterministic user questions about the corpus topics."""
+    rng = random.Random(f"{seed}/questions")
+    templates = (
+        "How does {a} affect {b}?",
+        "What is the role of {a} in {topic}?",
+        "Explain {a} and {b} for {topic}.",
+        "When should I tune {a}?",
+    )
+    out = []
+    for _ in range(count):
+        topic = rng.choice(sorted(TOPICS))
+        a, b = rng.sample(TOPICS[topic].split(), 2)
+        out.append(rng.choice(templates).format(a=a, b=b, topic=topic))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF corpus")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.out, args.docs, args.pages, args.seed)
+    size_kb = sum(p.stat().st_size for p in paths) / 1024
+    print(f"Wrote {len(paths)} PDFs x {args.pages} pages ({size_kb:.0f} KB) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+# ==============================
+# e2e_benchmark.py - End-to-end load benchmark, fully offline
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.e2e_benchmark --out bench.json
+#   python -m backend.benchmarks.e2e_benchmark --out new.json --baseline bench.json --max-regression 10
+#   python -m backend.benchmarks.e2e_benchmark --scenarios chat,history --concurrency 32 --requests 500
+#
+# Runs the real backend (uvicorn backend.main:app) against throwaway
+# state in a temp dir: its own SQLite DB, vectorstores and uploads, and a
+# local fake Groq API (fake_groq.py) with configurable token latency.
+# A synthetic PDF corpus (corpus.py) is bulk-ingested as the global docs
+# first; then each scenario drives the HTTP API:
+#
+#   ingest       POST /documents per user PDF, polled until the job is done
+#   chat         POST /chat
+#   chat_stream  POST /chat/stream (also time to first token)
+#   history      GET /history/{google_id}
+#
+# Reports p50 / p95 / p99 latency, throughput, errors, the server's own
+# per-stage timings and server memory (RSS / peak RSS) as JSON. With
+# --baseline the run is diffed against an earlier result file.
+# The embedding model must be in the local Hugging Face cache (--offline
+# refuses downloads). The server and ingest subprocesses run with
+# NO_DOTENV=true, so a .env file in the repo never changes the settings
+# under test.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from backend.benchmarks.corpus import generate_corpus, questions
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+SCENARIOS = ("ingest", "chat", "chat_stream", "history")
+
+# Metrics compared against a baseline: name -> True if higher is better
+COMPARED = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "ttft_p50_ms": False,
+    "ttft_p95_ms": False,
+    "throughput_rps": True,
+    "pages_per_sec": True,
+    "error_rate": False,
+}
+
+
+# -----------------------------
+# Statistics
+# -----------------------------
+def percentile(values, p):
+    """Linear-interpolated percentile of a list of numbers."""
+    if not values:
+        return None
+    values = sorted(values)
+    pos = (len(values) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(latencies_ms, errors: int, wall_seconds: float, **extra):
+    """Latency percentiles + throughput for one scenario."""
+    total = len(latencies_ms) + errors
+    summary = {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(len(latencies_ms) / wall_seconds, 2) if wall_seconds else 0.0,
+        "wall_seconds": round(wall_seconds, 2),
+    }
+    for p in (50, 95, 99):
+        value = percentile(latencies_ms, p)
+        summary[f"p{p}_ms"] = round(value, 2) if value is not None else None
+    summary["max_ms"] = round(max(latencies_ms), 2) if latencies_ms else None
+    summary.update(extra)
+    return summary
+
+
+def stage_summary(timings):
+    """p50 / p95 of each server-reported stage ({"retrieval_ms": ...} dicts)."""
+    stages = {}
+    for t in timings:
+        for name, ms in t.items():
+            stages.setdefault(name, []).append(ms)
+    return {
+        name: {"p50": round(percentile(v, 50), 2), "p95": round(percentile(v, 95), 2)}
+        for name, v in sorted(stages.items())
+    }
+
+
+def compare(current, baseline, max_regression: float = None):
+    """
+    Diffs two result files.
+
+    Returns:
+        tuple: (rows of (scenario, metric, baseline, current, change %),
+                list of regressions beyond `max_regression` percent)
+    """
+    rows, regressions = [], []
+    for scenario, result in current.get("scenarios", {}).items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            new, old = result.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            change = ((new - old) / old * 100) if old else (0.0 if new == old else float("inf"))
+            rows.append((scenario, metric, old, new, change))
+            worse = -change if higher_is_better else change
+            if max_regression is not None and worse > max_regression:
+                regressions.append((scenario, metric, old, new, change))
+    return rows, regressions
+
+
+def print_results(results):
+    print(f"\n{'scenario':<12} {'reqs':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8}")
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:<12} {r['requests']:>6} {r['errors']:>5} {r['p50_ms'] or 0:>9.1f} "
+            f"{r['p95_ms'] or 0:>9.1f} {r['p99_ms'] or 0:>9.1f} {r['throughput_rps']:>8.1f}"
+        )
+    memory = results.get("memory", {})
+    if memory:
+        print(f"server memory: rss {memory.get('rss_mb')} MB, peak {memory.get('peak_rss_mb')} MB")
+
+
+def print_comparison(rows):
+    print(f"\n{'scenario':<12} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>9}")
+    for scenario, metric, old, new, change in rows:
+        print(f"{scenario:<12} {metric:<15} {old:>10.2f} {new:>10.2f} {change:>+8.1f}%")
+
+
+# -----------------------------
+# Processes
+# -----------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_memory(pid):
+    """Current and peak RSS of a process in MB (Linux /proc), or {}."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return {}
+    fields = dict(line.split(":", 1) for line in status.splitlines() if ":" in line)
+
+    def mb(key):
+        return round(int(fields[key].split()[0]) / 1024, 1) if key in fields else None
+    return {"rss_mb": mb("VmRSS"), "peak_rss_mb": mb("VmHWM")}
+
+
+def wait_for(url, timeout, proc=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{url} process exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def bench_env(workdir: Path, groq_url: str, offline: bool):
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+        "VECTORSTORE_DIR": str(workdir / "vectorstore"),
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "GROQ_BASE_URL": groq_url,
+        "GROQ_API_KEY": "benchmark-fake-key",
+        "WARMUP_EMBEDDINGS": "true",
+        "NO_DOTENV": "true",
+        "PYTHONPATH": str(REPO_ROOT) + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+    if offline:
+        env.update({"HF_HUB_OFFLINE": "1", "TRANSFORMERS_OFFLINE": "1"})
+    return env
+
+
+def seed_global_docs(env, docs_dir: Path):
+    """Bulk-ingests the global corpus in a child process; returns its stats."""
+    code = (
+        "import json, sys\n"
+        "from backend.rag.ingest_global import ingest_all_global_pdfs\n"
+        "stats = ingest_all_global_pdfs(sys.argv[1])\n"
+        "print('BENCH_STATS ' + json.dumps(stats))\n"
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code, str(docs_dir)],
+        env=env, cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    stats = next(
+        json.loads(line[len("BENCH_STATS "):])
+        for line in proc.stdout.splitlines() if line.startswith("BENCH_STATS ")
+    )
+    stats["process_seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def _chat_payload(i, users, prompts):
+    user = i % users
+    return {
+        "google_id": f"bench-user-{user}",
+        "email": f"bench{user}@example.com",
+        "name": f"Bench User {user}",
+        "message": prompts[i % len(prompts)],
+    }
+
+
+async def _drive(count, concurrency, warmup, call):
+    """
+    Runs `call(i)` for i in range(warmup + count) with at most
+    `concurrency` in flight. Warm-up calls are not measured.
+
+    Returns:
+        tuple: (latencies in ms, errors, wall seconds, extras from calls)
+    """
+    sem = asyncio.Semaphore(concurrency)
+    latencies, extras, errors = [], [], 0
+
+    async def one(i, measured):
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                extra = await call(i)
+            except Exception:
+                if measured:
+                    errors += 1
+                return
+            if measured:
+                latencies.append((time.perf_counter() - start) * 1000)
+                extras.append(extra)
+
+    await asyncio.gather(*(one(i, False) for i in range(warmup)))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, True) for i in range(warmup, warmup + count)))
+    return latencies, errors, time.perf_counter() - start, extras
+
+
+async def run_chat(client, args, prompts):
+    async def call(i):
+        r = await client.post("/chat", json=_chat_payload(i, args.users, prompts))
+        r.raise_for_status()
+        return r.json().get("timings", {})
+
+    latencies, errors, wall, timings = await _drive(args.requests, args.concurrency, args.warmup, call)
+    return summarize(latencies, errors, wall, stages=stage_summary(timings))
+
+
+async def run_chat_stream(client, args, prompts):
+    async def call(i):
+        start = time.perf_counter()
+        first = None
+        timings = {}
+        async with client.stream("POST", "/chat/stream", json=_chat_payload(i, args.users, prompts)) as r:
+            r.raise_for_status()
+            event = None
+            async for line in r.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    if event == "token" and first is None:
+                        first = (time.perf_counter() - start) * 1000
+                    elif event == "done":
+                        timings = json.loads(line[len("data:"):]).get("timings", {})
+                    elif event == "error":
+                        raise RuntimeError(line)
+        return first, timings
+
+    latencies, errors, wall, extras = await _drive(args.requests, args.concurrency, args.warmup, call)
+    ttfts = [first for first, _ in extras if first is not None]
+    return summarize(
+        latencies, errors, wall,
+        ttft_p50_ms=round(percentile(ttfts, 50), 2) if ttfts else None,
+        ttft_p95_ms=round(percentile(ttfts, 95), 2) if ttfts else None,
+        stages=stage_summary([timings for _, timings in extras]),
+    )
+
+
+async def run_history(client, args, prompts):
+    async def call(i):
+        r = await client.get(f"/history/bench-user-{i % args.users}", params={"limit": 50})
+        r.raise_for_status()
+
+    latencies, errors, wall, _ = await _drive(args.requests, args.concurrency, args.warmup, call)
+    return summarize(latencies, errors, wall)
+
+
+async def run_ingest(client, args, user_pdfs):
+    pages = args.user_pages
+
+    async def call(i):
+        pdf = user_pdfs[i]
+        with open(pdf, "rb") as f:
+            r = await client.post(
+                "/documents",
+                data={"google_id": f"bench-user-{i % args.users}"},
+                files={"file": (pdf.name, f.read(), "application/pdf")},
+            )
+        r.raise_for_status()
+        job_id = r.json()["job_id"]
+        while True:
+            job = (await client.get(f"/documents/jobs/{job_id}")).json()
+            if job["status"] == "done":
+                return
+            if job["status"] == "failed":
+                raise RuntimeError(job.get("error"))
+            await asyncio.sleep(0.05)
+
+    latencies, errors, wall, _ = await _drive(len(user_pdfs), args.concurrency, 0, call)
+    done = len(latencies)
+    return summarize(
+        latencies, errors, wall,
+        pages_per_sec=round(done * pages / wall, 2) if wall else 0.0,
+    )
+
+
+async def run_scenarios(base_url, args, prompts, user_pdfs, server_pid):
+    results, memory = {}, {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for name in args.scenarios:
+            print(f"Running {name} ...", flush=True)
+            if name == "ingest":
+                results[name] = await run_ingest(client, args, user_pdfs)
+            elif name == "chat":
+                results[name] = await run_chat(client, args, prompts)
+            elif name == "chat_stream":
+                results[name] = await run_chat_stream(client, args, prompts)
+            elif name == "history":
+                results[name] = await run_history(client, args, prompts)
+            results[name]["server_memory"] = process_memory(server_pid)
+            memory = results[name]["server_memory"] or memory
+    return results, memory
+
+
+# -----------------------------
+# Main
+# -----------------------------
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the chat backend")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="earlier results JSON to diff against")
+    parser.add_argument("--max-regression", type=float,
+                        help="exit 1 if any compared metric is this many percent worse")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--global-docs", type=int, default=30)
+    parser.add_argument("--global-pages", type=int, default=10)
+    parser.add_argument("--user-docs", type=int, default=10, help="PDFs uploaded in the ingest scenario")
+    parser.add_argument("--user-pages", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per request")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep state here instead of a temp dir")
+    parser.add_argument("--offline", action="store_true", help="never download models")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="copilot-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    procs = []
+
+    try:
+        # Corpus
+        global_docs = generate_corpus(workdir / "global_docs", args.global_docs, args.global_pages, args.seed)
+        user_pdfs = generate_corpus(
+            workdir / "user_docs", args.user_docs, args.user_pages, args.seed, prefix="user"
+        )
+        prompts = questions(max(50, args.requests), args.seed)
+
+        # Fake LLM
+        groq_port = free_port()
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "backend.benchmarks.fake_groq", "--port", str(groq_port),
+             "--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms),
+             "--tokens", str(args.tokens)],
+            cwd=REPO_ROOT, stdout=subprocess.DEVNULL
+        ))
+        groq_url = f"http://127.0.0.1:{groq_port}"
+        wait_for(f"{groq_url}/health", 30, procs[-1])
+        env = bench_env(workdir, groq_url, args.offline)
+
+        print(f"Seeding {len(global_docs)} global PDFs ...", flush=True)
+        seed_stats = seed_global_docs(env, workdir / "global_docs")
+
+        # Backend under test
+        api_port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.main:app",
+             "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=env
+        )
+        procs.append(server)
+        base_url = f"http://127.0.0.1:{api_port}"
+        wait_for(f"{base_url}/", args.startup_timeout, server)
+        startup_memory = process_memory(server.pid)
+
+        scenarios, memory = asyncio.run(run_scenarios(base_url, args, prompts, user_pdfs, server.pid))
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "config": {k: v for k, v in vars(args).items()
+                           if k not in ("out", "baseline", "workdir", "max_regression")},
+            },
+            "seed_ingest": seed_stats,
+            "scenarios": scenarios,
+            "memory": {**memory, "startup_rss_mb": startup_memory.get("rss_mb")},
+        }
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows, regressions = compare(results, baseline, args.max_regression)
+        print_comparison(rows)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.max_regression}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# ==============================
+# embedding_backend_benchmark.py - PyTorch vs int8 vs ONNX embeddings
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.embedding_backend_benchmark
+#   python -m backend.benchmarks.embedding_backend_benchmark \
+#       --backends torch,torch_int8,onnx,onnx:onnx/model_qint8_avx512_vnni.onnx --threads 4
+#
+# Embeds the same synthetic chunks with each EMBEDDING_BACKEND and reports
+# load time, throughput (texts/s) per batch size, single-query latency
+# (p50 / p95) and cosine drift against the first backend listed.
+# "onnx:<file>" picks a different ONNX file from the model repo.
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from backend.benchmarks.corpus import TOPICS, page_text
+from backend.config import settings
+from backend.rag.embedding_backends import DEFAULT_ONNX_FILE, load_embeddings
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def make_texts(count: int, seed: int = 0):
+    """`count` chunk-sized texts from the synthetic benchmark corpus."""
+    rng = random.Random(seed)
+    topics = sorted(TOPICS)
+    texts = []
+    page = 0
+    while len(texts) < count:
+        lines = page_text(rng, topics[page % len(topics)], doc=page, page=0)
+        body = " ".join(line for line in lines[2:] if line)
+        texts += [body[i:i + settings.CHUNK_SIZE] for i in range(0, len(body), settings.CHUNK_SIZE)]
+        page += 1
+    return texts[:count]
+
+
+def run(spec, texts, batch_sizes, queries, threads, model_name):
+    name, _, onnx_file = spec.partition(":")
+    start = time.perf_counter()
+    model = load_embeddings(name, model_name, threads=threads, onnx_file=onnx_file or DEFAULT_ONNX_FILE)
+    load_s = time.perf_counter() - start
+    model.embed_documents(texts[:8])  # warm up
+
+    result = {"backend": spec, "load_s": round(load_s, 2)}
+    vectors = None
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        out = []
+        for i in range(0, len(texts), batch_size):
+            out.extend(model.embed_documents(texts[i:i + batch_size]))
+        result[f"texts_per_s@{batch_size}"] = round(len(texts) / (time.perf_counter() - start), 1)
+        vectors = out
+
+    latencies = []
+    for text in texts[:queries]:
+        start = time.perf_counter()
+        model.embed_query(text[:120])
+        latencies.append((time.perf_counter() - start) * 1000)
+    result["query_p50_ms"] = round(statistics.median(latencies), 2)
+    result["query_p95_ms"] = round(percentile(latencies, 95), 2)
+    return result, np.asarray(vectors, dtype=np.float32)
+
+
+def drift(reference, vectors):
+    """Mean / min cosine similarity between matching rows."""
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cur = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosines = (ref * cur).sum(axis=1)
+    return {"cosine_mean": round(float(cosines.mean()), 5), "cosine_min": round(float(cosines.min()), 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--backends", default="torch,torch_int8,onnx")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="1,32")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=settings.EMBEDDING_THREADS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, args.seed)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+    print(f"--- {len(texts)} texts, model {args.model}, threads {args.threads or 'default'}")
+
+    reference = None
+    for spec in args.backends.split(","):
+        try:
+            result, vectors = run(spec, texts, batch_sizes, args.queries, args.threads, args.model)
+        except ImportError as e:
+            print({"backend": spec, "skipped": str(e)})
+            continue
+        if reference is None:
+            reference = vectors
+        else:
+            result.update(drift(reference, vectors))
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
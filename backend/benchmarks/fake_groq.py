@@ -0,0 +1,211 @@
+# ==============================
+# fake_groq.py - Local stand-in for the Groq chat completions API
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.fake_groq --port 8901 --ttft-ms 150 --token-ms 15
+#   GROQ_BASE_URL=http://127.0.0.1:8901 GROQ_API_KEY=fake uvicorn backend.main:app
+#
+# Speaks the OpenAI-compatible endpoint the Groq SDK calls
+# (POST /openai/v1/chat/completions), streaming and non-streaming, with a
+# configurable time to first token and per-token delay. Replies are
+# deterministic for a given prompt, so runs are repeatable and offline.
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the answer depends on context retrieved from your documents which mention "
+    "latency throughput cache index vector chunk summary user model token budget "
+    "request stage metric batch embedding query score rerank history prompt"
+).split()
+
+
+class FakeLLM:
+    """
+    Timing model + reply generator shared by the server and in-process use.
+
+    `script` optionally scripts the first calls, one dict per call:
+    {"status": 503} fails that call, {"ttft_ms": 2000} slows it down.
+    Later calls use the defaults.
+    """
+
+    def __init__(self, ttft_ms: float = 150.0, token_ms: float = 15.0,
+                 tokens: int = 60, jitter: float = 0.1, error_rate: float = 0.0,
+                 script=None):
+        self.ttft = ttft_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.tokens = tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.script = list(script or [])
+        self.calls = 0
+        self.models = []  # model requested by each call
+        self._lock = threading.Lock()
+
+    def _delay(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def next_call(self, model=None):
+        """Registers a call; returns its scripted behaviour ({} if none)."""
+        with self._lock:
+            step = self.script[self.calls] if self.calls < len(self.script) else {}
+            self.calls += 1
+            self.models.append(model)
+        if "status" not in step and self.error_rate and random.random() < self.error_rate:
+            step = {**step, "status": 503}
+        return step
+
+    def reply_tokens(self, messages):
+        """Deterministic tokens for a conversation."""
+        seed = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).digest()
+        rng = random.Random(seed)
+        return [rng.choice(WORDS) + " " for _ in range(self.tokens)]
+
+    def stream(self, messages, ttft=None):
+        """Yields tokens with the configured pacing."""
+        self._delay(self.ttft if ttft is None else ttft)
+        for i, token in enumerate(self.reply_tokens(messages)):
+            if i:
+                self._delay(self.token_delay)
+            yield token
+
+    def complete(self, messages, ttft=None):
+        ttft = self.ttft if ttft is None else ttft
+        self._delay(ttft + self.token_delay * max(0, self.tokens - 1))
+        return "".join(self.reply_tokens(messages))
+
+
+def _prompt_tokens(messages):
+    return sum(len(str(m.get("content", "")).split()) for m in messages)
+
+
+def _chunk(completion_id, model, created, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def make_handler(llm: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def _json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("", "/health"):
+                self._json(200, {"status": "ok", "calls": llm.calls})
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.startswith("/openai/v1/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = body.get("messages", [])
+            model = body.get("model", "fake-model")
+            completion_id = f"chatcmpl-{int(time.time() * 1e6)}"
+            created = int(time.time())
+
+            step = llm.next_call(model)
+            ttft = step["ttft_ms"] / 1000 if "ttft_ms" in step else None
+            if step.get("status"):
+                self._json(step["status"], {"error": {"message": "fake upstream error", "type": "server_error"}})
+                return
+
+            if not body.get("stream"):
+                content = llm.complete(messages, ttft)
+                self._json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": _prompt_tokens(messages),
+                        "completion_tokens": llm.tokens,
+                        "total_tokens": _prompt_tokens(messages) + llm.tokens,
+                    },
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(data: str):
+                raw = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+                self.wfile.flush()
+
+            try:
+                send(json.dumps(_chunk(completion_id, model, created, {"role": "assistant", "content": ""})))
+                for token in llm.stream(messages, ttft):
+                    send(json.dumps(_chunk(completion_id, model, created, {"content": token})))
+                send(json.dumps(_chunk(completion_id, model, created, {}, "stop")))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client went away mid-stream
+
+    return Handler
+
+
+def start_server(llm: FakeLLM, host: str = "127.0.0.1", port: int = 0):
+    """Starts the fake API on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(llm))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="time to first token")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="delay between tokens")
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per reply")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- fraction of each delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 replies")
+    args = parser.parse_args()
+
+    llm = FakeLLM(args.ttft_ms, args.token_ms, args.tokens, args.jitter, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(llm))
+    server.daemon_threads = True
+    print(f"Fake Groq API on http://{args.host}:{args.port} "
+          f"(ttft {args.ttft_ms} ms, {args.token_ms} ms/token, {args.tokens} tokens)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# ==============================
+# retrieval_backend_benchmark.py - Chroma vs NumPy exact vs HNSW
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.retrieval_backend_benchmark --sizes 200,2000,20000
+#   python -m backend.benchmarks.retrieval_backend_benchmark --backends chroma,numpy
+#
+# Fills a temporary Chroma collection with random 384-d vectors, wraps it in
+# each retrieval backend and reports build time, query latency (p50 / p95)
+# and recall@k against exact search.
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+from langchain_chroma import Chroma
+
+from backend.rag.backends import BACKENDS
+
+DIM = 384
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def make_store(path: Path, vectors):
+    db = Chroma(
+        client=chromadb.PersistentClient(path=str(path)),
+        collection_name="bench",
+        embedding_function=None,
+    )
+    for i in range(0, len(vectors), 4096):
+        batch = vectors[i:i + 4096]
+        db._collection.add(
+            ids=[f"c{i + j}" for j in range(len(batch))],
+            embeddings=batch.tolist(),
+            documents=[f"chunk {i + j}" for j in range(len(batch))],
+            metadatas=[{"n": i + j} for j in range(len(batch))],
+        )
+    return db
+
+
+def run(name, db, index_dir, vectors, queries, k):
+    start = time.perf_counter()
+    backend = BACKENDS[name](db, index_dir)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    latencies, recalls = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results = backend.search(q.tolist(), k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        exact = set(np.argsort(((vectors - q) ** 2).sum(axis=1))[:k])
+        found = {doc.metadata["n"] for doc, _ in results}
+        recalls.append(len(exact & found) / k)
+
+    return {
+        "backend": name,
+        "build_ms": round(build_ms, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        f"recall@{k}": round(float(np.mean(recalls)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="200,2000,20000")
+    parser.add_argument("--backends", default="chroma,numpy,hnsw")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="backend-bench-"))
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            vectors = rng.standard_normal((size, DIM)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            queries = vectors[rng.integers(0, size, args.queries)] + 0.05 * rng.standard_normal((args.queries, DIM)).astype(np.float32)
+
+            db = make_store(workdir / f"chroma_{size}", vectors)
+            print(f"--- {size} chunks, {args.queries} queries, k={args.k}")
+            for name in args.backends.split(","):
+                try:
+                    print(run(name, db, workdir / f"{name}_{size}", vectors, queries, args.k))
+                except ImportError as e:
+                    print({"backend": name, "skipped": str(e)})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# ==============================
+# user_layout_benchmark.py - Per-user directories vs one shared collection
+# ==============================
+# Usage:
+#   python -m backend.benchmarks.user_layout_benchmark --users 200 --chunks 50
+#
+# Builds both layouts from random 384-d vectors in a temp directory (no
+# embedding model needed), then reports query latency (p50 / p95), disk
+# footprint and resident memory growth for each.
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+DIM = 384
+
+
+def rss_mb():
+    """Current resident memory in MB (Linux), falls back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def disk_mb(path: Path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1024 / 1024
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _vectors(rng, n):
+    v = rng.standard_normal((n, DIM)).astype(np.float32)
+    return (v / np.linalg.norm(v, axis=1, keepdims=True)).tolist()
+
+
+def build_per_user(root: Path, users, chunks, rng):
+    for user in users:
+        col = chromadb.PersistentClient(path=str(root / user)).get_or_create_collection("langchain")
+        col.add(
+            ids=[f"{user}-{i}" for i in range(chunks)],
+            embeddings=_vectors(rng, chunks),
+            metadatas=[{"user_id": user} for _ in range(chunks)],
+        )
+
+
+def build_shared(root: Path, users, chunks, rng, batch=4096):
+    col = chromadb.PersistentClient(path=str(root)).get_or_create_collection("user_docs")
+    ids, metadatas = [], []
+    for user in users:
+        ids.extend(f"{user}-{i}" for i in range(chunks))
+        metadatas.extend({"user_id": user} for _ in range(chunks))
+    embeddings = _vectors(rng, len(ids))
+    for i in range(0, len(ids), batch):
+        col.add(ids=ids[i:i + batch], embeddings=embeddings[i:i + batch], metadatas=metadatas[i:i + batch])
+
+
+def time_queries(run_query, users, queries, rng):
+    latencies = []
+    for _ in range(queries):
+        user = random.choice(users)
+        vector = _vectors(rng, 1)
+        start = time.perf_counter()
+        run_query(user, vector)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per user")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    users = [f"user{i}" for i in range(args.users)]
+    workdir = Path(tempfile.mkdtemp(prefix="layout-bench-"))
+
+    try:
+        per_user_root, shared_root = workdir / "per_user", workdir / "shared"
+        build_per_user(per_user_root, users, args.chunks, rng)
+        build_shared(shared_root, users, args.chunks, rng)
+
+        # Per-user: one client per directory, kept open (as the handle cache does)
+        before = rss_mb()
+        clients = {}
+
+        def per_user_query(user, vector):
+            if user not in clients:
+                clients[user] = chromadb.PersistentClient(
+                    path=str(per_user_root / user)
+                ).get_collection("langchain")
+            clients[user].query(query_embeddings=vector, n_results=args.k)
+
+        per_user = time_queries(per_user_query, users, args.queries, rng)
+        per_user.update({
+            "open_stores": len(clients),
+            "rss_growth_mb": round(rss_mb() - before, 1),
+            "disk_mb": round(disk_mb(per_user_root), 1),
+        })
+
+        before = rss_mb()
+        shared_col = chromadb.PersistentClient(path=str(shared_root)).get_collection("user_docs")
+
+        def shared_query(user, vector):
+            shared_col.query(query_embeddings=vector, n_results=args.k, where={"user_id": user})
+
+        shared = time_queries(shared_query, users, args.queries, rng)
+        shared.update({
+            "open_stores": 1,
+            "rss_growth_mb": round(rss_mb() - before, 1),
+            "disk_mb": round(disk_mb(shared_root), 1),
+        })
+
+        print(f"{args.users} users x {args.chunks} chunks, {args.queries} queries, k={args.k}")
+        print("per_user:", per_user)
+        print("shared:  ", shared)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# ==============================
+# context_builder.py - Token-budgeted prompt assembly
+# ==============================
+
+import math
+import os
+import re
+import threading
+
+from backend.config import settings
+
+# Token counts come from a real BPE tokenizer (TOKENIZER: a tokenizer.json
+# path or Hugging Face repo id, loaded once with the `tokenizers` package).
+# If it can't be loaded, a local estimate is used instead: words are ~4
+# characters per token for Llama-style BPE vocabularies, punctuation is
+# one token each.
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_UNAVAILABLE = object()
+
+# Role markers and separators the chat template adds around each message
+MESSAGE_OVERHEAD = 4
+
+
+def _load_tokenizer():
+    name = settings.TOKENIZER
+    if not name:
+        return _UNAVAILABLE
+    try:
+        from tokenizers import Tokenizer
+
+        if os.path.isfile(name):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"Tokenizer '{name}' unavailable, estimating token counts: {e!r}")
+        return _UNAVAILABLE
+
+
+def get_tokenizer():
+    """The BPE tokenizer, loaded once per process, or None if unavailable."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = _load_tokenizer()
+    return None if _tokenizer is _UNAVAILABLE else _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Number of LLM tokens in `text` (estimated without a tokenizer)."""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return estimate_tokens(text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate of the number of LLM tokens in `text`."""
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece[0].isalnum() or piece[0] == "_":
+            total += math.ceil(len(piece) / 4)
+        else:
+            total += 1
+    return total
+
+
+def _message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+# -----------------------------
+# Function: Build Prompt
+# -----------------------------
+def build_prompt(system_template: str, chunks, history, summary: str = None, budget: int = None):
+    """
+    Fills the token budget in priority order:
+    1. system prompt (always)
+    2. current user message (always)
+    3. top-ranked retrieved chunks
+    4. most recent earlier turns, newest first, kept contiguous
+    5. summary of older turns
+
+    Args:
+        system_template: system prompt with a `{context}` placeholder
+        chunks: list of (text, source) pairs, best first
+        history: list of {"role", "content"} dicts, oldest first;
+                 the last one is the current user message
+        summary: optional summary of turns older than `history`
+        budget: token budget, defaults to CONTEXT_TOKEN_BUDGET
+    Returns:
+        tuple:
+            messages: list ready for chat.completions.create
+            sources: sources of the chunks that made it into the prompt
+            usage: tokens used per section
+    """
+    budget = budget or settings.CONTEXT_TOKEN_BUDGET
+
+    current = history[-1:]
+    earlier = history[:-1]
+
+    usage = {
+        "budget": budget,
+        "system": count_tokens(system_template.format(context="")) + MESSAGE_OVERHEAD,
+        "chunks": 0,
+        "history": sum(_message_tokens(m) for m in current),
+        "summary": 0,
+        "chunks_used": 0,
+        "chunks_dropped": 0,
+        "turns_used": len(current),
+        "turns_dropped": 0,
+    }
+    remaining = budget - usage["system"] - usage["history"]
+
+    # 3️⃣ Chunks: take each one that still fits, best first
+    context_parts, sources = [], []
+    for text, source in chunks:
+        cost = count_tokens(text) + 1  # + separator
+        if cost <= remaining:
+            context_parts.append(text)
+            sources.append(source)
+            usage["chunks"] += cost
+            usage["chunks_used"] += 1
+            remaining -= cost
+        else:
+            usage["chunks_dropped"] += 1
+
+    # 4️⃣ Recent turns: walk back from the newest, stop at the first gap
+    kept = []
+    for i, message in enumerate(reversed(earlier)):
+        cost = _message_tokens(message)
+        if cost > remaining:
+            usage["turns_dropped"] = len(earlier) - i
+            break
+        kept.append(message)
+        usage["history"] += cost
+        usage["turns_used"] += 1
+        remaining -= cost
+    kept.reverse()
+
+    # 5️⃣ Summary of older turns, if there is room left
+    system_content = system_template.format(context="\n\n".join(context_parts))
+    if summary:
+        block = f"\nCONVERSATION SUMMARY (older messages):\n{summary}\n"
+        cost = count_tokens(block)
+        if cost <= remaining:
+            system_content += block
+            usage["summary"] = cost
+            remaining -= cost
+
+    usage["total"] = budget - remaining
+
+    messages = [{"role": "system", "content": system_content}] + kept + list(current)
+    return messages, sources, usage
@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Session
-from backend.models import User, Message
+from backend.models import User, Message, ConversationSummary
 
 
 # ---------- USER ----------
 
-def get_or_create_user(db: Session, google_id, email, name):
+def get_or_create_user(db: Session, google_id, email, name, commit=True):
+    """With commit=False the new user is only flushed (id assigned)."""
     user = db.query(User).filter(User.google_id == google_id).first()
 
     if not user:
@@ -14,12 +15,19 @@ def get_or_create_user(db: Session, google_id, email, name):
             name=name
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        if commit:
+            db.commit()
+            db.refresh(user)
+        else:
+            db.flush()
 
     return user
 
 
+def get_user_by_google_id(db: Session, google_id):
+    return db.query(User).filter(User.google_id == google_id).first()
+
+
 # ---------- MESSAGE ----------
 
 def save_message(db: Session, user_id, role, content):
@@ -32,8 +40,108 @@ def save_message(db: Session, user_id, role, content):
     db.commit()
 
 
+def save_turn(db: Session, google_id, email, name, question, reply=None, asked_at=None):
+    """
+    Saves one chat turn - user (if new), question and reply -
+    in a single transaction. `reply` is None when generation failed.
+    """
+    try:
+        user = get_or_create_user(db, google_id, email, name, commit=False)
+        db.add(Message(user_id=user.id, role="user", content=question, timestamp=asked_at))
+        if reply is not None:
+            db.add(Message(user_id=user.id, role="assistant", content=reply))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return user
+
+
 def get_chat_history(db: Session, user_id):
     return db.query(Message)\
         .filter(Message.user_id == user_id)\
-        .order_by(Message.timestamp)\
+        .order_by(Message.id)\
+        .all()
+
+
+def get_recent_messages(db: Session, user_id, n, after_id=None):
+    """
+    Last `n` messages of a user, oldest first.
+    Only fetches n rows (uses the (user_id, id) index).
+
+    Messages are ordered by id (commit order), not timestamp: a question
+    keeps the time it was asked but is committed with its reply, so
+    overlapping turns would otherwise interleave and break id cursors.
+
+    Args:
+        after_id: only messages newer than this id (e.g. not yet summarized)
+    """
+    query = db.query(Message).filter(Message.user_id == user_id)
+    if after_id:
+        query = query.filter(Message.id > after_id)
+
+    rows = query\
+        .order_by(Message.id.desc())\
+        .limit(n)\
+        .all()
+    return list(reversed(rows))
+
+
+def get_messages_page(db: Session, user_id, limit, before_id=None):
+    """
+    One page of history, newest page first, messages oldest first.
+
+    Args:
+        before_id: cursor, only return messages before this message id
+            (same id order as get_recent_messages)
+    Returns:
+        tuple: (messages, next_cursor) - next_cursor is None on the last page
+    """
+    query = db.query(Message).filter(Message.user_id == user_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+
+    rows = query\
+        .order_by(Message.id.desc())\
+        .limit(limit + 1)\
         .all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if has_more else None
+    return list(reversed(rows)), next_cursor
+
+
+# ---------- SUMMARY ----------
+
+def get_summary(db: Session, user_id):
+    return db.query(ConversationSummary)\
+        .filter(ConversationSummary.user_id == user_id)\
+        .first()
+
+
+def get_unsummarized_messages(db: Session, user_id, after_id=0, limit=None):
+    """Messages newer than `after_id`, oldest first (the oldest `limit` if set)."""
+    query = db.query(Message)\
+        .filter(Message.user_id == user_id, Message.id > (after_id or 0))\
+        .order_by(Message.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def count_messages_after(db: Session, user_id, after_id=0):
+    return db.query(Message)\
+        .filter(Message.user_id == user_id, Message.id > (after_id or 0))\
+        .count()
+
+
+def save_summary(db: Session, user_id, content, last_message_id):
+    summary = get_summary(db, user_id)
+    if summary is None:
+        summary = ConversationSummary(user_id=user_id)
+        db.add(summary)
+    summary.content = content
+    summary.last_message_id = last_message_id
+    db.commit()
+    return summary
@@ -1,20 +1,70 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from backend.config import settings
 
 
+# SQLite file by default, Postgres (or any SQLAlchemy URL) via DATABASE_URL
+DATABASE_URL = settings.DATABASE_URL
 
 
-# SQLite database file
-DATABASE_URL = "sqlite:///./chat.db"
-DATABASE_URL = settings.DATABASE_URL
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers run while one writer commits, instead of every
+    request queueing behind a single file lock.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, far fewer fsyncs
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-16000")  # ~16 MB page cache
+    finally:
+        cursor.close()
+
+
+def make_engine(url: str = None):
+    """
+    Engine with a sized connection pool.
+    SQLite gets WAL mode + pragmas on every new connection;
+    other databases get pre-ping and recycling for long-lived pools.
+    """
+    url = make_url(url or DATABASE_URL)
+    pool_options = dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases are per connection, pool options don't apply
+            return create_engine(url, connect_args={"check_same_thread": False})
+
+        engine = create_engine(
+            url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+            },
+            **pool_options
+        )
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        **pool_options
+    )
+
 
 # Engine = connection to DB
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+engine = make_engine()
 
 # Session = talking channel with DB
 SessionLocal = sessionmaker(
@@ -25,3 +75,81 @@ SessionLocal = sessionmaker(
 
 # Base class for models
 Base = declarative_base()
+
+
+# -----------------------------
+# Async engine (request path)
+# -----------------------------
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url(url: str = None):
+    """DATABASE_URL with its driver swapped for the asyncio one."""
+    url = make_url(url or DATABASE_URL)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ("aiosqlite", "asyncpg"):
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def make_async_engine(url: str = None):
+    """
+    Async engine (aiosqlite / asyncpg) with the same pool sizing and
+    SQLite pragmas as `make_engine`.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(url)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return create_async_engine(url)
+        engine = create_async_engine(
+            url,
+            connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    return create_async_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+
+
+def get_async_sessionmaker():
+    """
+    Created on first use so the async drivers are only needed
+    by processes that serve requests.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = make_async_engine()
+        _async_sessionmaker = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_sessionmaker
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = _async_sessionmaker = None
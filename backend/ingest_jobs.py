@@ -0,0 +1,163 @@
+# ==============================
+# ingest_jobs.py - Background ingestion job queue
+# ==============================
+
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from backend.config import settings
+from backend.metrics import record_ingest
+
+# Finished jobs kept around for status lookups
+MAX_FINISHED_JOBS = 1000
+
+_queue = None
+_workers = []
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+# Target paths being ingested; a second job for the same file waits, so
+# its upload never replaces a file that is still being parsed
+_active_targets = set()
+_target_free = threading.Condition(_lock)
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue is at INGEST_QUEUE_SIZE."""
+
+
+# -----------------------------
+# Job bookkeeping
+# -----------------------------
+def _update(job_id: str, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+
+def get_job(job_id: str):
+    """Status of one job, or None if unknown."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def _prune_finished():
+    finished = [j for j, job in _jobs.items() if job["status"] in ("done", "failed")]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job_id]
+
+
+# -----------------------------
+# Worker loop
+# -----------------------------
+@contextmanager
+def _claim(pdf_path: str):
+    """Holds `pdf_path` for one job at a time."""
+    with _target_free:
+        while pdf_path in _active_targets:
+            _target_free.wait()
+        _active_targets.add(pdf_path)
+    try:
+        yield
+    finally:
+        with _target_free:
+            _active_targets.discard(pdf_path)
+            _target_free.notify_all()
+
+
+def _run_job(job_id: str, pdf_path: str, user_id: str, staged_path: str = None):
+    # Imported here so the API process doesn't load the RAG stack at import
+    from backend.rag.ingest_user import ingest_user_pdf
+
+    def progress(stage, **details):
+        _update(job_id, stage=stage, **details)
+
+    with _claim(pdf_path):
+        _update(job_id, status="running", stage="starting", started_at=time.time())
+        try:
+            if staged_path:
+                os.replace(staged_path, pdf_path)
+            result = ingest_user_pdf(pdf_path, user_id, progress=progress)
+            _update(job_id, status="done", stage="done", result=result, finished_at=time.time())
+        except Exception as e:
+            if staged_path:
+                Path(staged_path).unlink(missing_ok=True)
+            record_ingest("user", "failed")
+            _update(job_id, status="failed", stage="failed", error=str(e), finished_at=time.time())
+
+
+def _worker():
+    while True:
+        item = _queue.get()
+        try:
+            if item is None:  # shutdown signal
+                return
+            _run_job(*item)
+        finally:
+            _queue.task_done()
+
+
+def start_workers():
+    """Starts the bounded worker pool (idempotent)."""
+    global _queue
+    with _lock:
+        if _workers:
+            return
+        _queue = queue.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        for i in range(settings.INGEST_JOB_WORKERS):
+            t = threading.Thread(target=_worker, name=f"ingest-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def stop_workers(timeout: float = 5.0):
+    """Lets running jobs finish and stops the workers."""
+    global _queue
+    with _lock:
+        workers = list(_workers)
+        _workers.clear()
+    for _ in workers:
+        _queue.put(None)
+    for t in workers:
+        t.join(timeout)
+    _queue = None
+
+
+# -----------------------------
+# Function: Submit Job
+# -----------------------------
+def submit_ingest_job(pdf_path: str, user_id: str, filename: str = None, staged_path: str = None) -> str:
+    """
+    Queues a user PDF for background ingestion and returns its job id
+    immediately. Raises QueueFullError instead of waiting when the queue
+    is full, so callers never block. A `staged_path` upload is moved to
+    `pdf_path` when the job starts, after earlier jobs for it finished.
+    """
+    start_workers()
+
+    job_id = uuid.uuid4().hex
+    with _lock:
+        _prune_finished()
+        _jobs[job_id] = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "filename": filename or pdf_path,
+            "status": "queued",
+            "stage": "queued",
+            "created_at": time.time(),
+        }
+
+    try:
+        _queue.put_nowait((job_id, pdf_path, user_id, staged_path))
+    except queue.Full:
+        with _lock:
+            del _jobs[job_id]
+        raise QueueFullError("Ingestion queue is full, try again later")
+
+    return job_id
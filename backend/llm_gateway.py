@@ -0,0 +1,439 @@
+# ==============================
+# llm_gateway.py - Resilient access to the chat completions API
+# ==============================
+# One pooled AsyncGroq client shared by every request, plus:
+# - explicit connect / request timeouts (the SDK's own retries are off)
+# - retries of transient errors with jittered exponential backoff
+# - a cap on in-flight calls, so a slow upstream queues requests here
+#   instead of piling up sockets
+# - a circuit breaker per model; while the primary's is open, or its
+#   retries are exhausted, calls go to LLM_FALLBACK_MODEL
+# - optional hedging of non-streaming calls after the p95 latency
+#
+# Streams are only retried before the first token has been yielded.
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from backend.config import settings
+from backend.metrics import (
+    llm_calls_total, llm_call_seconds, llm_retries_total, llm_hedges_total,
+    llm_fallbacks_total, llm_rejected_total,
+)
+
+RETRYABLE_STATUS = {408, 409, 429}  # plus every 5xx
+LATENCY_WINDOW = 200                # recent latencies kept for the p95
+MIN_HEDGE_SAMPLES = 20              # no p95-based hedging before this many
+
+
+class LLMUnavailableError(RuntimeError):
+    """No model could answer: breakers open, retries exhausted or queue full."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx replies."""
+    import groq
+
+    if isinstance(error, (asyncio.TimeoutError, groq.APIConnectionError)):
+        return True  # APITimeoutError is an APIConnectionError
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def _outcome(error: Exception) -> str:
+    import groq
+
+    if isinstance(error, (asyncio.TimeoutError, groq.APITimeoutError)):
+        return "timeout"
+    return "error"
+
+
+# -----------------------------
+# Circuit breaker
+# -----------------------------
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; open -> half_open
+    once `reset_after` seconds have passed, letting a single trial call
+    through; the trial's result closes or re-opens the circuit.
+    """
+
+    def __init__(self, failures: int = 5, reset_after: float = 30.0, clock=time.monotonic):
+        self.failures = max(1, failures)
+        self.reset_after = reset_after
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+
+    def allow(self) -> bool:
+        """True if a call may go out now (claims the trial when half open)."""
+        if self.state == "open":
+            if self.clock() - self.opened_at < self.reset_after:
+                return False
+            self.state = "half_open"
+            self._trial = False
+        if self.state == "half_open":
+            if self._trial:
+                return False
+            self._trial = True
+        return True
+
+    def release(self):
+        """The allowed call ended without a verdict (cancelled, client error)."""
+        self._trial = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failures:
+            self.state = "open"
+            self.opened_at = self.clock()
+
+
+# -----------------------------
+# Gateway
+# -----------------------------
+class LLMGateway:
+    """
+    Chat completions with timeouts, retries, a concurrency limit, circuit
+    breakers, model fallback and optional hedging. Create it inside the
+    event loop that will use it (the HTTP pool belongs to that loop).
+    """
+
+    def __init__(self, model: str, fallback_model: str = None, *, api_key: str = None,
+                 base_url: str = None, timeout: float = 30.0, connect_timeout: float = 5.0,
+                 max_retries: int = 2, retry_base_delay: float = 0.25, retry_max_delay: float = 4.0,
+                 max_concurrency: int = 32, queue_timeout: float = 10.0,
+                 breaker_failures: int = 5, breaker_reset: float = 30.0,
+                 hedge: bool = False, hedge_delay_ms: float = 0.0, client=None):
+        self.model = model
+        self.fallback_model = fallback_model if fallback_model and fallback_model != model else None
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.hedge = hedge
+        self.hedge_delay_ms = hedge_delay_ms
+        self.breakers = {
+            name: CircuitBreaker(breaker_failures, breaker_reset)
+            for name in filter(None, (self.model, self.fallback_model))
+        }
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        if client is None:
+            import httpx
+            from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+            # Keep-alive pool sized for the concurrency limit (+ hedges)
+            http_client = DefaultAsyncHttpxClient(
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=2 * self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            client = AsyncGroq(
+                api_key=api_key,
+                base_url=base_url or None,
+                timeout=httpx.Timeout(timeout, connect=connect_timeout),
+                max_retries=0,  # retried here, with backoff and breakers
+                http_client=http_client,
+            )
+        self.client = client
+
+    # ---- helpers ----
+
+    def _models(self):
+        return [m for m in (self.model, self.fallback_model) if m]
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Waits up to queue_timeout for one of max_concurrency call slots."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            llm_rejected_total.inc(reason="queue_timeout")
+            raise LLMUnavailableError(
+                f"{self.max_concurrency} LLM calls in flight; none finished within {self.queue_timeout}s"
+            ) from None
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt + 1`."""
+        cap = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def p95(self):
+        """p95 of recent successful call latencies in seconds (None if too few)."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None to not hedge."""
+        if not self.hedge:
+            return None
+        if self.hedge_delay_ms > 0:
+            return self.hedge_delay_ms / 1000
+        return self.p95()
+
+    def _fallback_reason(self, model, skipped):
+        if model != self.model:
+            llm_fallbacks_total.inc(reason="breaker_open" if skipped else "errors")
+
+    # ---- non-streaming ----
+
+    async def _call(self, model, messages, kwargs):
+        response = await asyncio.wait_for(
+            self.client.chat.completions.create(model=model, messages=messages, **kwargs),
+            self.timeout,
+        )
+        return response.choices[0].message.content
+
+    async def _hedged_call(self, model, messages, kwargs):
+        """One attempt; duplicated after hedge_delay() if still unanswered."""
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._call(model, messages, kwargs)
+
+        tasks = {asyncio.ensure_future(self._call(model, messages, kwargs)): "primary"}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return next(iter(done)).result()
+            tasks[asyncio.ensure_future(self._call(model, messages, kwargs))] = "hedge"
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        llm_hedges_total.inc(winner=tasks[task])
+                        return task.result()
+                    error = task.exception()
+            llm_hedges_total.inc(winner="none")
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def complete(self, messages, **kwargs) -> str:
+        """
+        Text of one chat completion. Extra kwargs (max_tokens, ...) go to
+        the API as-is.
+
+        Raises:
+            LLMUnavailableError: no model answered
+            groq.APIStatusError: non-retryable error such as 400
+        """
+        async with self._slot():
+            last_error, skipped = None, False
+            for model in self._models():
+                breaker = self.breakers[model]
+                for attempt in range(self.max_retries + 1):
+                    if not breaker.allow():
+                        skipped = skipped or attempt == 0
+                        break
+                    if attempt == 0:
+                        self._fallback_reason(model, skipped)
+                    start = time.perf_counter()
+                    try:
+                        reply = await self._hedged_call(model, messages, kwargs)
+                    except asyncio.CancelledError:
+                        breaker.release()
+                        raise
+                    except Exception as e:
+                        if not is_retryable(e):
+                            breaker.release()
+                            raise
+                        breaker.record_failure()
+                        llm_calls_total.inc(model=model, outcome=_outcome(e))
+                        last_error = e
+                        if attempt < self.max_retries and breaker.state == "closed":
+                            llm_retries_total.inc(model=model)
+                            await asyncio.sleep(self.backoff(attempt))
+                            continue
+                        break
+                    elapsed = time.perf_counter() - start
+                    breaker.record_success()
+                    llm_calls_total.inc(model=model, outcome="ok")
+                    llm_call_seconds.observe(elapsed, model=model)
+                    self.latencies.append(elapsed)
+                    return reply
+            llm_rejected_total.inc(reason="unavailable")
+            raise LLMUnavailableError(f"LLM unavailable: {last_error or 'circuit open'}") from last_error
+
+    # ---- streaming ----
+
+    async def stream(self, messages, **kwargs):
+        """
+        Async iterator of reply tokens. Failures before the first token are
+        retried / routed to the fallback like complete(); once tokens have
+        been yielded, an error is raised as-is. The upstream response is
+        closed however iteration ends, so call aclose() on an abandoned
+        stream.
+        """
+        async with self._slot():
+            last_error, skipped = None, False
+            for model in self._models():
+                breaker = self.breakers[model]
+                for attempt in range(self.max_retries + 1):
+                    if not breaker.allow():
+                        skipped = skipped or attempt == 0
+                        break
+                    if attempt == 0:
+                        self._fallback_reason(model, skipped)
+                    start = time.perf_counter()
+                    started = False
+                    try:
+                        chunks = await asyncio.wait_for(
+                            self.client.chat.completions.create(
+                                model=model, messages=messages, stream=True, **kwargs
+                            ),
+                            self.timeout,
+                        )
+                        try:
+                            async for chunk in chunks:
+                                token = chunk.choices[0].delta.content if chunk.choices else None
+                                if token:
+                                    if not started:
+                                        started = True
+                                        llm_call_seconds.observe(time.perf_counter() - start, model=model)
+                                    yield token
+                        finally:
+                            # Release the upstream connection however the
+                            # stream ends: caller gone, error, or done
+                            await chunks.close()
+                    except (asyncio.CancelledError, GeneratorExit):
+                        breaker.release()
+                        raise
+                    except Exception as e:
+                        if not is_retryable(e):
+                            breaker.release()
+                            raise
+                        breaker.record_failure()
+                        llm_calls_total.inc(model=model, outcome=_outcome(e))
+                        if started:
+                            raise  # part of the reply is already out
+                        last_error = e
+                        if attempt < self.max_retries and breaker.state == "closed":
+                            llm_retries_total.inc(model=model)
+                            await asyncio.sleep(self.backoff(attempt))
+                            continue
+                        break
+                    breaker.record_success()
+                    llm_calls_total.inc(model=model, outcome="ok")
+                    return
+            llm_rejected_total.inc(reason="unavailable")
+            raise LLMUnavailableError(f"LLM unavailable: {last_error or 'circuit open'}") from last_error
+
+    # ---- introspection ----
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            "model": self.model,
+            "fallback_model": self.fallback_model,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "breakers": {
+                name: {"state": b.state, "consecutive_failures": b.consecutive_failures}
+                for name, b in self.breakers.items()
+            },
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedging": self.hedge,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1) if self.hedge_delay() else None,
+        }
+
+    async def aclose(self):
+        await self.client.close()
+
+
+# -----------------------------
+# Shared instance
+# -----------------------------
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """The process-wide gateway, configured from settings (created lazily)."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    settings.MODEL,
+                    settings.LLM_FALLBACK_MODEL,
+                    api_key=settings.GROQ_API_KEY,
+                    base_url=settings.LLM_BASE_URL,
+                    timeout=settings.LLM_TIMEOUT,
+                    connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                    retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+                    retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+                    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                    queue_timeout=settings.LLM_QUEUE_TIMEOUT,
+                    breaker_failures=settings.LLM_BREAKER_FAILURES,
+                    breaker_reset=settings.LLM_BREAKER_RESET,
+                    hedge=settings.LLM_HEDGE_ENABLED,
+                    hedge_delay_ms=settings.LLM_HEDGE_DELAY_MS,
+                )
+    return _gateway
+
+
+async def close_gateway():
+    """Closes the shared gateway's connection pool (on shutdown)."""
+    global _gateway
+    with _gateway_lock:
+        gateway, _gateway = _gateway, None
+    if gateway is not None:
+        await gateway.aclose()
+
+
+def gateway_stats():
+    return get_gateway().stats() if _gateway is not None else {"started": False}
+
+
+def breaker_collector():
+    """Collector exporting circuit state and in-flight calls as gauges."""
+    if _gateway is None:
+        return []
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    lines = [
+        "# HELP copilot_llm_circuit_state LLM circuit breaker state (0 closed, 1 half open, 2 open)",
+        "# TYPE copilot_llm_circuit_state gauge",
+    ]
+    lines += [
+        f'copilot_llm_circuit_state{{model="{name}"}} {states[b.state]}'
+        for name, b in _gateway.breakers.items()
+    ]
+    lines += [
+        "# HELP copilot_llm_in_flight LLM calls currently in flight",
+        "# TYPE copilot_llm_in_flight gauge",
+        f"copilot_llm_in_flight {_gateway.in_flight}",
+    ]
+    return lines
@@ -3,11 +3,20 @@
 # ==============================
 
 import os
+import asyncio
+import json
+import time
+import shutil
+import uuid
+from contextlib import aclosing
+from datetime import datetime
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from groq import Groq
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, field_validator
 from pathlib import Path
 
 # -----------------------------
@@ -15,21 +24,46 @@ from pathlib import Path
 # -----------------------------
 
 
+# .env wins over the shell, except with NO_DOTENV=true (set by the
+# benchmark harness) where only the caller's environment counts
 env_path = Path(__file__).parent.parent / ".env"
-load_dotenv(override=True)
+if os.getenv("NO_DOTENV", "").strip().lower() not in ("1", "true", "yes", "on"):
+    load_dotenv(override=True)
 
 
 # -----------------------------
 # Database Imports
 # -----------------------------
-from backend.database import engine, Base, SessionLocal
-from backend import models, crud
+from backend.database import (
+    engine, Base, SessionLocal, get_async_sessionmaker, dispose_async_engine
+)
+from backend import models, crud, async_crud
 from backend.config import settings  # GROQ API key & model settings
 
 # -----------------------------
 # RAG Imports
 # -----------------------------
-from backend.rag.retriever import retrieve_context
+from backend.rag.retriever import (
+    aretrieve_chunks, format_chunk, chunk_source, SYSTEM_PROMPT as RAG_RULES
+)
+from backend.context_builder import build_prompt, get_tokenizer
+from backend.rag.rerank import rerank, get_reranker, rerank_stats
+from backend.rag.query_cache import aembed_query, query_cache_stats
+from backend.rag.store_cache import store_cache_stats
+from backend.rag.rerank import score_cache
+from backend.rag.response_cache import (
+    response_cache, shared_cache_key, response_cache_stats
+)
+from backend.timing import StageTimer
+from backend import metrics
+from backend import ingest_jobs, summarizer
+from backend.llm_gateway import (
+    get_gateway, close_gateway, gateway_stats, breaker_collector, LLMUnavailableError
+)
+from backend.message_buffer import BufferFullError, get_message_buffer, merge_history
+from backend.validation import safe_user_id
+from backend.rag.embeddings import warmup_embeddings, embedding_stats
+from backend.rag.embed_batcher import query_batcher_stats, stop_query_batcher
 
 # -----------------------------
 # FastAPI App
@@ -41,6 +75,41 @@ app = FastAPI(title="Knowledge Copilot Backend 🚀")
 # -----------------------------
 Base.metadata.create_all(bind=engine)
 
+# Indexes added after the table was first created, and ones no longer used
+for index in models.Message.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+with engine.begin() as conn:
+    for name in models.Message.retired_indexes:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+# -----------------------------
+# Startup: optional embedding warm-up
+# -----------------------------
+@app.on_event("startup")
+def warmup():
+    """Load the embedding model before serving so /chat doesn't pay for it."""
+    if settings.WARMUP_EMBEDDINGS:
+        warmup_embeddings()
+        get_tokenizer()
+        if settings.RERANK_ENABLED:
+            get_reranker()
+    ingest_jobs.start_workers()
+    summarizer.start_worker()
+    if settings.WRITE_BEHIND_ENABLED:
+        get_message_buffer().start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Let running ingestion jobs and summary updates finish."""
+    await run_in_threadpool(ingest_jobs.stop_workers)
+    await run_in_threadpool(summarizer.stop_worker)
+    await run_in_threadpool(stop_query_batcher)
+    if settings.WRITE_BEHIND_ENABLED:
+        await run_in_threadpool(get_message_buffer().stop)  # flush buffered messages
+    await dispose_async_engine()
+    await close_gateway()
+
 # -----------------------------
 # Dependency: DB Session
 # -----------------------------
@@ -52,11 +121,17 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Async session for endpoints that run on the event loop."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
 # -----------------------------
 # GROQ LLM Client Setup
 # -----------------------------
-client = Groq(api_key=settings.GROQ_API_KEY)
-MODEL = settings.MODEL
+# /chat and /chat/stream go through the shared gateway (backend/llm_gateway.py):
+# pooled client, timeouts, retries, circuit breakers and model fallback
 
 # -----------------------------
 # Request Schema
@@ -67,6 +142,9 @@ class ChatRequest(BaseModel):
     name: str
     message: str
 
+    # The id names the user's vectorstore directory during retrieval
+    _check_google_id = field_validator("google_id")(safe_user_id)
+
 # -----------------------------
 # Root Endpoint (Health Check)
 # -----------------------------
@@ -75,6 +153,65 @@ def root():
     """Simple health check"""
     return {"status": "Backend running 🚀"}
 
+# -----------------------------
+# Embedding Model Stats
+# -----------------------------
+@app.get("/embeddings/stats")
+def get_embedding_stats():
+    """Load time and memory used by the shared embedding model, plus query batching."""
+    return {**embedding_stats(), "query_batching": query_batcher_stats()}
+
+
+@app.get("/rerank/stats")
+def get_rerank_stats():
+    """How often reranking ran or fell back, plus score cache hit rates."""
+    return rerank_stats()
+
+
+@app.get("/response-cache/stats")
+def get_response_cache_stats():
+    """Size and hit rate of the semantic response cache."""
+    return response_cache_stats()
+
+
+@app.get("/llm/stats")
+def get_llm_stats():
+    """LLM gateway state: circuit breakers, calls in flight, p95 latency."""
+    return gateway_stats()
+
+# -----------------------------
+# Prometheus Metrics
+# -----------------------------
+def _cache_stats():
+    """Hit / miss / size of every cache, read at scrape time."""
+    stores = store_cache_stats()
+    return {
+        **query_cache_stats(),
+        "rerank_scores": score_cache.stats(),
+        "response": response_cache_stats(),
+        "user_stores": {
+            "hits": stores["hits"],
+            "misses": stores["misses"],
+            "size": stores["open_user_stores"],
+        },
+    }
+
+
+metrics.REGISTRY.add_collector(metrics.cache_collector("copilot_cache", _cache_stats))
+metrics.REGISTRY.add_collector(breaker_collector)
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Stage latency histograms and counters in Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def count_prompt_tokens(usage: dict):
+    """Adds the tokens of a prompt that is sent to the LLM, per section."""
+    for section in ("system", "chunks", "history", "summary"):
+        metrics.prompt_tokens_total.inc(usage.get(section, 0), section=section)
+
 # -----------------------------
 # Test Database Endpoint
 # -----------------------------
@@ -104,99 +241,364 @@ def test_db(db: Session = Depends(get_db)):
     }
 
 # =============================
-# Chat Endpoint
+# Shared Prompt Preparation
 # =============================
-@app.post("/chat")
-def chat(req: ChatRequest, db: Session = Depends(get_db)):
-    """
-    Chat endpoint with:
-    - SQL memory (user messages)
-    - RAG knowledge retrieval (global + user docs)
-    - System behavior prompt
-    - Timestamped assistant response
-    """
-
-    # 1️⃣ Get or create user in DB
-    user = crud.get_or_create_user(
-        db, req.google_id, req.email, req.name
-    )
-
-    # 2️⃣ Save incoming user message
-    crud.save_message(db, user.id, "user", req.message)
-
-    # 3️⃣ Fetch user chat history from DB
-    history = crud.get_chat_history(db, user.id)
-
-    # 4️⃣ Limit to last N messages for context window
-    N = 10
-    last_messages = history[-N:]
-    messages = [{"role": m.role, "content": m.content} for m in last_messages]
-
-    # 5️⃣ Retrieve RAG context: global + user-specific docs
-    context, sources = retrieve_context(
-        user_query=req.message,
-        user_id=req.google_id
-    )
-
-    # 6️⃣ System prompt with retrieved context
-    #    LLM sees both system instructions and context
-    system_prompt = {
-        "role": "system",
-        "content": f"""
+# LLM sees both system instructions and retrieved context
+SYSTEM_TEMPLATE = f"""
 You are a helpful personal knowledge assistant.
 
 Use the provided CONTEXT if relevant.
 If context doesn't contain answer, respond normally.
 
 CONTEXT:
-{context}
+{RAG_RULES}
+
+{{context}}
 """
-    }
 
-    # 7️⃣ Combine system prompt with last user messages
-    messages = [system_prompt] + messages
 
-    # 8️⃣ Call LLM via GROQ API
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=messages
-    )
+async def prepare_chat(db: AsyncSession, req: ChatRequest, timer: StageTimer):
+    """
+    Steps shared by /chat and /chat/stream:
+    user lookup, history and RAG context, assembled within
+    CONTEXT_TOKEN_BUDGET. Each step is timed in `timer`.
+    Read-only: the whole turn is written later by `persist_turn`.
+
+    Returns:
+        tuple: (messages for the LLM, sources, time the question arrived,
+                tokens used per prompt section, response cache key or None)
+    """
+    asked_at = datetime.utcnow()
+
+    # 1️⃣ Look up the user (created together with the turn if new)
+    with timer.stage("user"):
+        user = await async_crud.get_user_by_google_id(db, req.google_id)
+
+    # 2️⃣ Rolling summary of older turns + the recent messages it doesn't cover
+    #    (candidates for the context window), then the incoming message
+    #    Buffered (write-behind) messages are read before the DB so none is missed
+    summary, last_messages = None, []
+    pending = get_message_buffer().pending(req.google_id) if settings.WRITE_BEHIND_ENABLED else []
+    with timer.stage("history"):
+        if user is not None:
+            summary = await async_crud.get_summary(db, user.id)
+            summarized_up_to = summary.last_message_id if summary else 0
+            last_messages = await async_crud.get_recent_messages(
+                db, user.id, settings.CONTEXT_HISTORY_MESSAGES - 1, after_id=summarized_up_to
+            )
+
+            # Fold older turns into the summary in the background every K turns
+            if settings.SUMMARY_ENABLED:
+                summarizer.schedule_summary(
+                    SessionLocal, user.id,
+                    await async_crud.count_messages_after(db, user.id, summarized_up_to)
+                    + len(pending) + 1
+                )
+        history = [
+            {"role": m["role"], "content": m["content"]}
+            for m in merge_history(last_messages, pending, settings.CONTEXT_HISTORY_MESSAGES - 1)
+        ]
+        history.append({"role": "user", "content": req.message})
+
+    # 4️⃣ Retrieve RAG context: global + user-specific docs, best first
+    #    (over-fetch when a reranker picks the final chunks)
+    k = settings.RERANK_CANDIDATES if settings.RERANK_ENABLED else settings.RETRIEVAL_K
+    with timer.stage("retrieval"):
+        scored_chunks = await aretrieve_chunks(
+            user_query=req.message,
+            user_id=req.google_id,
+            k_global=k,
+            k_user=k
+        )
+
+    if settings.RERANK_ENABLED:
+        with timer.stage("rerank"):
+            scored_chunks, _ = await run_in_threadpool(rerank, req.message, scored_chunks)
+
+    chunks = [
+        (format_chunk(doc, req.google_id), chunk_source(doc, req.google_id))
+        for doc, _ in scored_chunks
+    ]
+
+    # Semantic cache key: query embedding (already cached by retrieval) +
+    # exactly which chunks the answer is built from. Only turns answered
+    # from global chunks are cached, and their prompt leaves out history
+    # and summary so the answer can be shared by every user
+    cache_key = None
+    if settings.RESPONSE_CACHE_ENABLED:
+        cache_key = shared_cache_key(await aembed_query(req.message), [doc for doc, _ in scored_chunks])
+    if cache_key:
+        history, summary = history[-1:], None
+
+    # 5️⃣ - 7️⃣ System prompt + chunks + recent turns within the token budget
+    with timer.stage("prompt"):
+        messages, sources, usage = build_prompt(
+            SYSTEM_TEMPLATE, chunks, history,
+            summary=summary.content if summary else None
+        )
+
+    return messages, sources, asked_at, usage, cache_key
+
+
+async def persist_turn(req: ChatRequest, reply: str = None, asked_at=None, db: AsyncSession = None):
+    """
+    Saves the question and reply: into the write-behind buffer when
+    WRITE_BEHIND_ENABLED (no DB round trip), otherwise, or while the
+    buffer is full, in one transaction.
+    """
+    if settings.WRITE_BEHIND_ENABLED:
+        try:
+            get_message_buffer().add_turn(req.google_id, req.email, req.name, req.message, reply, asked_at)
+            return
+        except BufferFullError:
+            pass  # DB is falling behind: write through instead of growing memory
+    if db is None:
+        async with get_async_sessionmaker()() as db:
+            await async_crud.save_turn(db, req.google_id, req.email, req.name, req.message, reply, asked_at)
+        return
+    await async_crud.save_turn(db, req.google_id, req.email, req.name, req.message, reply, asked_at)
 
-    # Extract assistant reply
-    reply = response.choices[0].message.content
 
-    # 9️⃣ Save assistant reply to DB
-    crud.save_message(db, user.id, "assistant", reply)
+# =============================
+# Chat Endpoint
+# =============================
+@app.post("/chat")
+async def chat(req: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Chat endpoint with:
+    - SQL memory (user messages)
+    - RAG knowledge retrieval (global + user docs)
+    - System behavior prompt
+    - Timestamped assistant response
+    """
 
-    # 🔟 Return reply + sources + timestamp
+    timer = StageTimer("chat")
+
+    # 1️⃣ - 7️⃣ User, history, RAG context and prompt
+    messages, sources, timestamp, usage, cache_key = await prepare_chat(db, req, timer)
+
+    # 8️⃣ Reuse a cached answer to a near-identical question, else call LLM via GROQ API
+    cached = response_cache.get(*cache_key) if cache_key else None
+    if cached is not None:
+        reply = cached["response"]
+    else:
+        count_prompt_tokens(usage)
+        try:
+            with timer.stage("llm"):
+                reply = await get_gateway().complete(messages)
+        except Exception as e:
+            # Keep the question even though no answer came back
+            await persist_turn(req, asked_at=timestamp, db=db)
+            if isinstance(e, LLMUnavailableError):
+                raise HTTPException(status_code=503, detail=str(e))
+            raise
+
+        if cache_key:
+            response_cache.set(*cache_key, {"response": reply})
+
+    # 9️⃣ Save user (if new), question and reply in one transaction
+    with timer.stage("save"):
+        await persist_turn(req, reply, asked_at=timestamp, db=db)
+
+    # 🔟 Return reply + sources + timestamp + per-stage timings
     return {
         "response": reply,
         "sources": sources,
-        "timestamp": str(history[-1].timestamp)
+        "timestamp": str(timestamp),
+        "context_tokens": usage,
+        "timings": timer.as_dict(),
+        "cached": cached is not None
     }
 
+
+# =============================
+# Streaming Chat Endpoint (SSE)
+# =============================
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Same as /chat, but streams the reply as server-sent events:
+    - `token` events carry each piece of text as Groq generates it
+    - a final `done` event carries sources + timestamp + stage timings
+    - an `error` event is sent if the LLM call fails
+    The turn (question + reply) is saved once the stream has finished, or
+    with the partial reply if the client disconnects mid-stream.
+    """
+
+    timer = StageTimer("chat_stream")
+
+    async with get_async_sessionmaker()() as db:
+        messages, sources, timestamp, usage, cache_key = await prepare_chat(db, req, timer)
+    cached = response_cache.get(*cache_key) if cache_key else None
+
+    saved = False
+
+    async def _save_turn(reply: str = None):
+        # Once per stream; shielded so a client disconnect can't cut the write short
+        nonlocal saved
+        if saved:
+            return
+        saved = True
+        with timer.stage("save"):
+            await asyncio.shield(persist_turn(req, reply, asked_at=timestamp))
+
+    async def event_stream():
+        parts = []
+        llm_start = time.perf_counter()
+        try:
+            try:
+                if cached is not None:
+                    # Whole cached answer in one event, no LLM call
+                    parts.append(cached["response"])
+                    yield _sse("token", {"token": cached["response"]})
+                else:
+                    count_prompt_tokens(usage)
+                    # aclosing: a disconnect closes the upstream LLM stream now
+                    async with aclosing(get_gateway().stream(messages)) as tokens:
+                        async for token in tokens:
+                            if not parts:
+                                timer.record("first_token", time.perf_counter() - llm_start)
+                            parts.append(token)
+                            yield _sse("token", {"token": token})
+            except Exception as e:
+                await _save_turn()  # keep the question
+                yield _sse("error", {"error": str(e)})
+                return
+            reply = "".join(parts)
+            if cached is None:
+                timer.record("llm", time.perf_counter() - llm_start)
+                if cache_key and reply:
+                    response_cache.set(*cache_key, {"response": reply})
+
+            # 9️⃣ Persist the whole turn once generation has finished
+            await _save_turn(reply)
+
+            yield _sse("done", {
+                "sources": sources,
+                "timestamp": str(timestamp),
+                "context_tokens": usage,
+                "timings": timer.as_dict(),
+                "cached": cached is not None
+            })
+        finally:
+            # Client disconnected (GeneratorExit / CancelledError): keep the
+            # question and whatever part of the reply was generated
+            await _save_turn("".join(parts) or None)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # =============================
 # Fetch User Chat History
 # =============================
 @app.get("/history/{google_id}")
-def get_history(google_id: str, db: Session = Depends(get_db)):
+async def get_history(
+    google_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    before: int = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Return all chat messages for a specific user.
+    Return chat messages for a specific user, one page at a time.
+    Pass the returned `next_cursor` as `before` to load older messages.
+    The newest page also includes messages still in the write-behind buffer.
     If user not found, return empty list.
     """
-    user = crud.get_user_by_google_id(db, google_id)
-    if not user:
-        return {"messages": []}
-
-    history = crud.get_chat_history(db, user.id)
+    # Read the buffer before the DB so a concurrent flush can't hide a message
+    pending = []
+    if settings.WRITE_BEHIND_ENABLED and before is None:
+        pending = get_message_buffer().pending(google_id)
+
+    user = await async_crud.get_user_by_google_id(db, google_id)
+    rows, next_cursor = [], None
+    if user:
+        rows, next_cursor = await async_crud.get_messages_page(db, user.id, limit, before)
+
+    history = merge_history(rows, pending, None)
+    if len(history) > limit:
+        # Buffered messages pushed the oldest rows of this page to the next one
+        dropped = len(history) - limit
+        history = history[dropped:]
+        if dropped < len(rows):
+            next_cursor = rows[dropped].id
+        elif rows:
+            next_cursor = rows[-1].id + 1
 
     return {
         "messages": [
             {
-                "role": m.role,
-                "content": m.content,
-                "time": str(m.timestamp)
+                "role": m["role"],
+                "content": m["content"],
+                "time": str(m["timestamp"])
             }
             for m in history
-        ]
+        ],
+        "next_cursor": next_cursor
     }
+
+
+# =============================
+# Document Upload (background ingestion)
+# =============================
+UPLOAD_DIR = Path(settings.UPLOAD_DIR or Path(__file__).parent / "rag" / "uploads")
+
+
+@app.post("/documents", status_code=202)
+async def upload_document(google_id: str = Form(...), file: UploadFile = File(...)):
+    """
+    Accepts a PDF for the user's knowledge base and returns a job id right
+    away. Parsing + embedding run on the bounded ingestion worker pool;
+    poll /documents/jobs/{job_id} for progress.
+    """
+    try:
+        google_id = safe_user_id(google_id)  # used in upload and vectorstore paths
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = Path(file.filename or "").name
+    if not filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if file.size is not None and file.size > settings.MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File larger than {settings.MAX_UPLOAD_MB} MB")
+
+    # Same filename -> same path, so re-uploads are incremental (see manifest).
+    # The upload is staged under a unique name and only replaces the target
+    # when its job starts, so it never overwrites a file still being parsed
+    user_dir = UPLOAD_DIR / google_id
+    user_dir.mkdir(parents=True, exist_ok=True)
+    target = user_dir / filename
+    staged = user_dir / f".{filename}.{uuid.uuid4().hex}.part"
+
+    def _save():
+        try:
+            with open(staged, "wb") as out:
+                shutil.copyfileobj(file.file, out)
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+
+    await run_in_threadpool(_save)
+
+    try:
+        job_id = ingest_jobs.submit_ingest_job(str(target), google_id, filename, staged_path=str(staged))
+    except ingest_jobs.QueueFullError as e:
+        staged.unlink(missing_ok=True)  # nothing will ingest it; the target is untouched
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/documents/jobs/{job_id}")
+def get_ingest_job(job_id: str):
+    """Status / progress of a background ingestion job."""
+    job = ingest_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,263 @@
+# ==============================
+# message_buffer.py - Write-behind chat message persistence
+# ==============================
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from backend.config import settings
+from backend.models import User, Message
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFullError(Exception):
+    """Raised when WRITE_BEHIND_MAX_PENDING messages are already buffered."""
+
+
+class MessageBuffer:
+    """
+    Holds chat messages in memory and writes them in batches.
+
+    `add_turn` only appends to the buffer. A background thread flushes
+    once WRITE_BEHIND_BATCH_SIZE messages are waiting or every
+    WRITE_BEHIND_FLUSH_INTERVAL seconds, with one bulk INSERT per batch.
+    Messages stay visible through `pending()` until their batch is
+    committed; a failed flush keeps them buffered for the next attempt.
+
+    At most WRITE_BEHIND_MAX_PENDING messages are held: past that
+    `add_turn` raises BufferFullError and the caller writes directly.
+    After WRITE_BEHIND_MAX_ATTEMPTS failed flushes in a row the batch is
+    written one message at a time; messages that still fail while others
+    succeed are poison rows and are dropped (logged), so they cannot block
+    everyone else's. If no message goes through, the database itself is
+    down and everything stays buffered.
+    """
+
+    def __init__(self, session_factory, batch_size: int = None, flush_interval: float = None,
+                 max_pending: int = None, max_attempts: int = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.WRITE_BEHIND_FLUSH_INTERVAL
+        self.max_pending = max_pending or settings.WRITE_BEHIND_MAX_PENDING
+        self.max_attempts = max_attempts or settings.WRITE_BEHIND_MAX_ATTEMPTS
+        self._messages = []            # buffered message dicts, oldest first
+        self._users = {}               # google_id -> (email, name) of buffered authors
+        self._failed_flushes = 0       # consecutive failed bulk flushes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self.stats = {"buffered": 0, "flushed": 0, "batches": 0, "failures": 0, "rejected": 0, "dropped": 0}
+
+    # -----------------------------
+    # Request path
+    # -----------------------------
+    def add_turn(self, google_id, email, name, question, reply=None, asked_at=None):
+        """Buffers one chat turn; returns immediately (BufferFullError if full)."""
+        asked_at = asked_at or datetime.utcnow()
+        messages = [{"google_id": google_id, "role": "user", "content": question, "timestamp": asked_at}]
+        if reply is not None:
+            messages.append({
+                "google_id": google_id, "role": "assistant", "content": reply,
+                "timestamp": max(datetime.utcnow(), asked_at),
+            })
+
+        with self._lock:
+            if len(self._messages) + len(messages) > self.max_pending:
+                self.stats["rejected"] += 1
+                raise BufferFullError(f"{len(self._messages)} messages already waiting to be written")
+            self._users.setdefault(google_id, (email, name))
+            self._messages.extend(messages)
+            self.stats["buffered"] += len(messages)
+            full = len(self._messages) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def pending(self, google_id):
+        """Buffered (not yet committed) messages of a user, oldest first."""
+        with self._lock:
+            return [dict(m) for m in self._messages if m["google_id"] == google_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._messages)
+
+    # -----------------------------
+    # Flushing
+    # -----------------------------
+    def flush(self):
+        """
+        Writes everything currently buffered: missing users first, then
+        all messages in one bulk INSERT, in a single transaction.
+
+        Returns:
+            int: number of messages written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._messages)
+                users = dict(self._users)
+            if not batch:
+                return 0
+
+            try:
+                self._write(batch, users)
+                written = len(batch)
+            except Exception:
+                self.stats["failures"] += 1
+                self._failed_flushes += 1
+                if self._failed_flushes < self.max_attempts:
+                    raise
+                written = self._write_one_by_one(batch, users)
+            self._failed_flushes = 0
+
+            # Only drop messages once they are committed (or given up on)
+            with self._lock:
+                del self._messages[:len(batch)]
+                remaining = {m["google_id"] for m in self._messages}
+                for google_id in list(self._users):
+                    if google_id not in remaining:
+                        del self._users[google_id]
+                self.stats["flushed"] += written
+                self.stats["batches"] += 1
+            return written
+
+    def _write(self, batch, users):
+        """Inserts `batch` (and any missing users) in one transaction."""
+        db = self.session_factory()
+        try:
+            google_ids = {m["google_id"] for m in batch}
+            user_ids = dict(
+                db.query(User.google_id, User.id)
+                .filter(User.google_id.in_(google_ids))
+                .all()
+            )
+            for google_id in google_ids - user_ids.keys():
+                email, name = users[google_id]
+                user = User(google_id=google_id, email=email, name=name)
+                db.add(user)
+                db.flush()
+                user_ids[google_id] = user.id
+
+            db.execute(insert(Message), [
+                {
+                    "user_id": user_ids[m["google_id"]],
+                    "role": m["role"],
+                    "content": m["content"],
+                    "timestamp": m["timestamp"],
+                }
+                for m in batch
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_one_by_one(self, batch, users):
+        """
+        Writes `batch` a message at a time, in order, dropping the ones that
+        fail. Raises the last error, dropping nothing, if none succeed.
+
+        Returns:
+            int: number of messages written
+        """
+        written, poison, error = 0, [], None
+        for message in batch:
+            try:
+                self._write([message], users)
+                written += 1
+            except Exception as e:
+                poison.append(message)
+                error = e
+        if not written:
+            raise error
+
+        for message in poison:
+            logger.error(
+                "Dropping %s message of user %s after %d failed flushes: %s",
+                message["role"], message["google_id"], self.max_attempts, error,
+            )
+        self.stats["dropped"] += len(poison)
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Message flush failed, will retry: %s", e)
+            if self._stopping:
+                return
+
+    def start(self):
+        """Starts the flush thread (idempotent) and flushes at interpreter exit."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="message-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the flush thread and writes whatever is still buffered."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._wake.set()
+            thread.join(timeout)
+        atexit.unregister(self.stop)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Final message flush failed, %d messages lost: %s", len(self), e)
+
+    def buffer_stats(self):
+        with self._lock:
+            return {**self.stats, "pending": len(self._messages)}
+
+
+# -----------------------------
+# History helpers
+# -----------------------------
+def merge_history(rows, pending, limit: int):
+    """
+    Recent DB rows + buffered messages as {"role", "content", "timestamp"}
+    dicts, oldest first, at most `limit`. A message that was committed
+    between reading the buffer and the DB shows up only once.
+    """
+    merged = [{"role": m.role, "content": m.content, "timestamp": m.timestamp} for m in rows]
+    seen = {(m["role"], m["content"], m["timestamp"]) for m in merged}
+    merged += [
+        {"role": m["role"], "content": m["content"], "timestamp": m["timestamp"]}
+        for m in pending
+        if (m["role"], m["content"], m["timestamp"]) not in seen
+    ]
+    return merged[-limit:] if limit else merged
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_message_buffer():
+    """Process-wide buffer writing through the sync session factory."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                from backend.database import SessionLocal
+
+                _buffer = MessageBuffer(SessionLocal)
+    return _buffer
@@ -0,0 +1,299 @@
+# ==============================
+# metrics.py - In-process metrics in Prometheus text format
+# ==============================
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds: 1 ms .. 30 s
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic total, e.g. cache hits or chunks retrieved."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies) over fixed buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+            return sum(counts)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics of this process plus collectors: callables run at scrape time
+    that return extra exposition lines (e.g. counters kept by the caches).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for collector in collectors:
+            try:
+                lines += collector()
+            except Exception as e:  # a broken collector must not break /metrics
+                lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------
+# Shared metrics
+# -----------------------------
+request_stage_seconds = REGISTRY.histogram(
+    "copilot_request_stage_seconds",
+    "Time spent in each stage of a chat request",
+    ("endpoint", "stage"),
+)
+rag_span_seconds = REGISTRY.histogram(
+    "copilot_rag_span_seconds",
+    "Time spent in RAG operations (embedding, searches, reranking, ingestion steps)",
+    ("span",),
+)
+chunks_retrieved_total = REGISTRY.counter(
+    "copilot_chunks_retrieved_total",
+    "Chunks returned by retrieval, per scope",
+    ("scope",),
+)
+prompt_tokens_total = REGISTRY.counter(
+    "copilot_prompt_tokens_total",
+    "Estimated prompt tokens sent to the LLM, per prompt section",
+    ("section",),
+)
+ingest_files_total = REGISTRY.counter(
+    "copilot_ingest_files_total",
+    "PDFs processed by ingestion, by scope and outcome",
+    ("scope", "outcome"),
+)
+ingest_pages_total = REGISTRY.counter(
+    "copilot_ingest_pages_total",
+    "PDF pages ingested, by scope",
+    ("scope",),
+)
+ingest_chunks_total = REGISTRY.counter(
+    "copilot_ingest_chunks_total",
+    "Chunks embedded and written by ingestion, by scope",
+    ("scope",),
+)
+llm_calls_total = REGISTRY.counter(
+    "copilot_llm_calls_total",
+    "Upstream LLM attempts, by model and outcome (ok, error, timeout)",
+    ("model", "outcome"),
+)
+llm_call_seconds = REGISTRY.histogram(
+    "copilot_llm_call_seconds",
+    "Latency of successful upstream LLM attempts (streams: time to first token)",
+    ("model",),
+)
+llm_retries_total = REGISTRY.counter(
+    "copilot_llm_retries_total",
+    "LLM attempts retried after a retryable error",
+    ("model",),
+)
+llm_hedges_total = REGISTRY.counter(
+    "copilot_llm_hedges_total",
+    "Hedged LLM calls, by which request answered first (primary, hedge, none)",
+    ("winner",),
+)
+llm_fallbacks_total = REGISTRY.counter(
+    "copilot_llm_fallbacks_total",
+    "Calls routed to the fallback model, by reason (breaker_open, errors)",
+    ("reason",),
+)
+llm_rejected_total = REGISTRY.counter(
+    "copilot_llm_rejected_total",
+    "Calls refused without reaching upstream, by reason (queue_timeout, unavailable)",
+    ("reason",),
+)
+
+embed_batch_size = REGISTRY.histogram(
+    "copilot_embed_batch_size",
+    "Requests served by one micro-batched embedding call",
+    ("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+embed_batch_seconds = REGISTRY.histogram(
+    "copilot_embed_batch_seconds",
+    "Duration of one micro-batched embedding forward pass",
+    ("batcher",),
+)
+embed_queue_seconds = REGISTRY.histogram(
+    "copilot_embed_queue_seconds",
+    "Time an embedding request waited to join a batch",
+    ("batcher",),
+)
+
+@contextmanager
+def span(name: str):
+    """Times a block into copilot_rag_span_seconds{span=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rag_span_seconds.observe(time.perf_counter() - start, span=name)
+
+
+def record_ingest(scope: str, outcome: str, pages: int = 0, chunks: int = 0, seconds: float = None):
+    """Counts one ingested (or skipped / failed) PDF and its throughput."""
+    ingest_files_total.inc(scope=scope, outcome=outcome)
+    if pages:
+        ingest_pages_total.inc(pages, scope=scope)
+    if chunks:
+        ingest_chunks_total.inc(chunks, scope=scope)
+    if seconds is not None:
+        rag_span_seconds.observe(seconds, span=f"ingest_{scope}_pdf")
+
+
+def cache_collector(metric_prefix: str, stats_by_name):
+    """
+    Collector exporting hit / miss / size numbers of caches that keep
+    their own counters (`stats_by_name()` -> {cache name: stats dict}).
+    """
+    def collect():
+        stats = stats_by_name()
+        lines = [
+            f"# HELP {metric_prefix}_hits_total Cache hits",
+            f"# TYPE {metric_prefix}_hits_total counter",
+        ]
+        lines += [f'{metric_prefix}_hits_total{{cache="{n}"}} {s.get("hits", 0)}' for n, s in stats.items()]
+        lines += [
+            f"# HELP {metric_prefix}_misses_total Cache misses",
+            f"# TYPE {metric_prefix}_misses_total counter",
+        ]
+        lines += [f'{metric_prefix}_misses_total{{cache="{n}"}} {s.get("misses", 0)}' for n, s in stats.items()]
+        lines += [
+            f"# HELP {metric_prefix}_entries Entries currently cached",
+            f"# TYPE {metric_prefix}_entries gauge",
+        ]
+        lines += [f'{metric_prefix}_entries{{cache="{n}"}} {s.get("size", 0)}' for n, s in stats.items()]
+        return lines
+    collect.__name__ = f"{metric_prefix}_collector"
+    return collect
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -26,3 +26,22 @@ class Message(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     owner = relationship("User", back_populates="messages")
+
+    # Recent-history, paging and summary queries filter by user and walk
+    # ids (commit order), which is also what their cursors compare
+    __table_args__ = (
+        Index("ix_messages_user_id_id", "user_id", "id"),
+    )
+
+    # Replaced by ix_messages_user_id_id; no query orders by timestamp
+    retired_indexes = ("ix_messages_user_id_timestamp",)
+
+
+class ConversationSummary(Base):
+    """Running summary of a user's messages up to `last_message_id`."""
+    __tablename__ = "conversation_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content = Column(Text, default="")
+    last_message_id = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
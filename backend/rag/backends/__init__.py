@@ -0,0 +1,18 @@
+# backend/rag/backends/__init__.py
+# -----------------------------
+# Pluggable retrieval backends (RETRIEVAL_BACKEND)
+# -----------------------------
+# Store lookups (get_global_backend / get_user_backend) live in
+# backend.rag.backends.factory so importing a backend stays lightweight.
+from backend.rag.backends.base import RetrievalBackend
+from backend.rag.backends.chroma_backend import ChromaBackend
+from backend.rag.backends.numpy_backend import NumpyBackend
+from backend.rag.backends.hnsw_backend import HnswBackend
+
+BACKENDS = {
+    "chroma": ChromaBackend,
+    "numpy": NumpyBackend,
+    "hnsw": HnswBackend,
+}
+
+__all__ = ["BACKENDS", "ChromaBackend", "HnswBackend", "NumpyBackend", "RetrievalBackend"]
@@ -0,0 +1,204 @@
+# backend/rag/backends/base.py
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+EXPORT_PAGE_SIZE = 5000
+
+
+# -----------------------------
+# Backend interface
+# -----------------------------
+class RetrievalBackend(ABC):
+    """
+    Vector search over one store. Chroma stays the source of truth (ingest
+    writes there); other backends build their index from it.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def search(self, vector, k: int, filter: dict = None):
+        """
+        Returns:
+            list of (Document, distance) pairs, closest first. Distances are
+            squared L2, same as Chroma's default, so scopes can be merged.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of indexed chunks."""
+
+
+# -----------------------------
+# Helpers shared by index-building backends
+# -----------------------------
+def collection_fingerprint(collection) -> str:
+    """Hash of every chunk ID; content-hash IDs change when content does."""
+    ids = sorted(collection.get(include=[])["ids"])
+    return hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+
+
+def export_collection(collection):
+    """
+    Reads every vector, text and metadata out of a Chroma collection,
+    page by page.
+
+    Returns:
+        tuple: (ids, float32 matrix, documents, metadatas)
+    """
+    ids, vectors, documents, metadatas = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=EXPORT_PAGE_SIZE,
+            offset=offset,
+        )
+        if not len(page["ids"]):
+            break
+        ids.extend(page["ids"])
+        vectors.extend(page["embeddings"])
+        documents.extend(page["documents"])
+        metadatas.extend(m or {} for m in page["metadatas"])
+        offset += len(page["ids"])
+
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+    return ids, matrix, documents, metadatas
+
+
+def matches_filter(metadata: dict, filter: dict) -> bool:
+    """Equality filters, optionally combined with {"$and": [...]}."""
+    for key, value in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in value):
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+def filter_mask(metadatas, filter: dict):
+    return np.fromiter((matches_filter(m, filter) for m in metadatas), dtype=bool, count=len(metadatas))
+
+
+class MaskCache:
+    """
+    filter_mask() results per filter, least recently used dropped past
+    `size`. In the shared user layout every user is a distinct filter, and
+    each mask costs one byte per indexed chunk.
+    """
+
+    def __init__(self, metadatas, size: int):
+        self.metadatas = metadatas
+        self.size = max(1, size)
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filter: dict):
+        key = repr(sorted(filter.items()))
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = filter_mask(self.metadatas, filter)
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.size:
+                self._masks.popitem(last=False)
+        return mask
+
+    def __len__(self):
+        return len(self._masks)
+
+
+def to_documents(indices, distances, documents, metadatas):
+    return [
+        (Document(page_content=documents[i], metadata=dict(metadatas[i])), float(d))
+        for i, d in zip(indices, distances)
+    ]
+
+
+def load_meta(index_dir: Path):
+    path = Path(index_dir) / "meta.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return None
+
+
+def save_meta(index_dir: Path, meta: dict):
+    path = Path(index_dir) / "meta.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(meta))
+    tmp.replace(path)
+
+
+# -----------------------------
+# Index files: build lock + atomic, versioned writes
+# -----------------------------
+# Readers memory-map (or load) index files named in meta.json. A rebuild
+# writes files under new names and swaps meta.json last, so an instance
+# still mapping the previous files never sees them change underneath it.
+@contextmanager
+def index_lock(index_dir: Path):
+    """Exclusive lock (across processes) while (re)building `index_dir`."""
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    with open(index_dir / ".lock", "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def new_build_tag() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def write_index_file(index_dir: Path, name: str, write) -> str:
+    """
+    Writes a new index file via `write(path)` to a temp name, then renames it
+    into place. Returns the file name to record in meta.json.
+    """
+    path = Path(index_dir) / name
+    tmp = path.with_name(f".{name}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+    return name
+
+
+def remove_stale_files(index_dir: Path, keep, patterns):
+    """Best-effort cleanup of index files from earlier builds."""
+    for pattern in patterns:
+        for path in Path(index_dir).glob(pattern):
+            if path.name not in keep:
+                try:
+                    path.unlink()
+                except OSError:  # still mapped on Windows; retried next build
+                    pass
@@ -0,0 +1,18 @@
+# backend/rag/backends/chroma_backend.py
+from backend.rag.backends.base import RetrievalBackend
+
+
+class ChromaBackend(RetrievalBackend):
+    """The current behaviour: LangChain's Chroma similarity search."""
+
+    name = "chroma"
+
+    def __init__(self, db, index_dir=None):
+        self.db = db
+
+    def search(self, vector, k: int, filter: dict = None):
+        search_kwargs = {"filter": filter} if filter else {}
+        return self.db.similarity_search_by_vector_with_relevance_scores(vector, k=k, **search_kwargs)
+
+    def count(self) -> int:
+        return self.db._collection.count()
@@ -0,0 +1,96 @@
+# backend/rag/backends/factory.py
+from backend.config import settings
+from backend.rag.backends import BACKENDS, RetrievalBackend
+from backend.rag.ingest_global import CHROMA_PATH, get_global_vectorstore
+from backend.rag.ingest_user import (
+    SHARED_USER_VECTORSTORE_PATH,
+    get_user_vectorstore,
+    get_shared_user_vectorstore,
+    shared_index_stale,
+    shared_layout,
+    user_filter,
+    user_store_dir,
+)
+from backend.rag.lexical import (
+    build_lexical_index_later, collection_bootstrap, index_path, load_lexical_index
+)
+from backend.rag.store_cache import get_cached_store
+
+
+def open_backend(db, store_dir, name: str = None) -> RetrievalBackend:
+    """Wraps a Chroma store in the configured backend."""
+    name = name or settings.RETRIEVAL_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RETRIEVAL_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](db, store_dir / f"_index_{name}")
+
+
+# -----------------------------
+# Function: Get Global Backend
+# -----------------------------
+def get_global_backend() -> RetrievalBackend:
+    """Backend over the global store, cached until the next global ingest."""
+    name = settings.RETRIEVAL_BACKEND
+    return get_cached_store(
+        f"global/{name}",
+        factory=lambda: open_backend(get_global_vectorstore(), CHROMA_PATH, name)
+    )
+
+
+# -----------------------------
+# Function: Get User Backend
+# -----------------------------
+def get_user_backend(user_id: str):
+    """
+    Backend over a user's documents, or None if they have none.
+    In the shared layout every user shares one backend over the shared
+    collection; pass filter=user_filter(user_id) when searching it. Users
+    who uploaded since that backend's index was built search Chroma.
+    """
+    if not get_user_vectorstore(user_id):
+        return None
+
+    name = settings.RETRIEVAL_BACKEND
+    if shared_layout():
+        if shared_index_stale(user_id):
+            name = "chroma"
+        return get_cached_store(
+            f"users_shared/{name}",
+            factory=lambda: open_backend(get_shared_user_vectorstore(), SHARED_USER_VECTORSTORE_PATH, name)
+        )
+    return get_cached_store(
+        f"user/{name}", user_id,
+        factory=lambda: open_backend(get_user_vectorstore(user_id), user_store_dir(user_id), name)
+    )
+
+
+# -----------------------------
+# Lexical (BM25) indexes
+# -----------------------------
+# Ingest writes bm25.json next to each store. A store ingested before that
+# has none: it is built from Chroma in the background and the scope is
+# searched by vector only until then, so no request pays for the build.
+def _cached_lexical(scope: str, user_id, store_dir, bootstrap):
+    if not index_path(store_dir).exists():
+        build_lexical_index_later(store_dir, bootstrap)
+        return None
+    return get_cached_store(scope, user_id, factory=lambda: load_lexical_index(store_dir))
+
+
+def get_global_lexical():
+    """BM25 index of the global store, or None until it has been built."""
+    return _cached_lexical(
+        "global/bm25", None, CHROMA_PATH,
+        collection_bootstrap(get_global_vectorstore())
+    )
+
+
+def get_user_lexical(user_id: str):
+    """BM25 index of a user's documents, or None if they have none or it is being built."""
+    db = get_user_vectorstore(user_id)
+    if not db:
+        return None
+    return _cached_lexical(
+        "user/bm25", user_id, user_store_dir(user_id),
+        collection_bootstrap(db, where=user_filter(user_id))
+    )
@@ -0,0 +1,138 @@
+# backend/rag/backends/hnsw_backend.py
+from pathlib import Path
+
+import numpy as np
+
+from backend.config import settings
+from backend.rag.backends.base import (
+    MaskCache,
+    RetrievalBackend,
+    collection_fingerprint,
+    export_collection,
+    index_lock,
+    new_build_tag,
+    remove_stale_files,
+    to_documents,
+    load_meta,
+    save_meta,
+    write_index_file,
+)
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+
+class HnswBackend(RetrievalBackend):
+    """
+    Approximate search with an hnswlib graph (pip install hnswlib).
+    Tunables: HNSW_M, HNSW_EF_CONSTRUCTION (build) and HNSW_EF_SEARCH (query).
+    Filtered queries the graph cannot answer fall back to exact search.
+
+    Files in `index_dir`: hnsw-<build>.bin and meta.json naming it; rebuilt
+    (under a file lock, into a new file) from Chroma when the collection's
+    IDs or the build parameters change.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, db, index_dir, m: int = None, ef_construction: int = None, ef_search: int = None):
+        if hnswlib is None:
+            raise ImportError("RETRIEVAL_BACKEND=hnsw needs the hnswlib package")
+
+        self.index_dir = Path(index_dir)
+        self.params = {
+            "m": m or settings.HNSW_M,
+            "ef_construction": ef_construction or settings.HNSW_EF_CONSTRUCTION,
+        }
+        self.ef_search = ef_search or settings.HNSW_EF_SEARCH
+
+        fingerprint = collection_fingerprint(db._collection)
+        meta = load_meta(self.index_dir)
+        if self._stale(meta, fingerprint):
+            with index_lock(self.index_dir):
+                meta = load_meta(self.index_dir)  # another worker may have built it
+                if self._stale(meta, fingerprint):
+                    meta = self._build(db, fingerprint)
+
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self._masks = MaskCache(self.metadatas, settings.FILTER_MASK_CACHE_SIZE)
+        self.index = None
+        if self.documents:
+            self.index = hnswlib.Index(space="l2", dim=meta["dim"])
+            self.index.load_index(str(self.index_dir / meta["index_file"]), max_elements=len(self.documents))
+            self.index.set_ef(self.ef_search)
+
+    def _stale(self, meta, fingerprint):
+        return (
+            not meta
+            or "index_file" not in meta
+            or meta["fingerprint"] != fingerprint
+            or meta["params"] != self.params
+        )
+
+    def _build(self, db, fingerprint):
+        ids, matrix, documents, metadatas = export_collection(db._collection)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        dim = matrix.shape[1] if len(ids) else 0
+        index_file = None
+        if len(ids):
+            index = hnswlib.Index(space="l2", dim=dim)
+            index.init_index(
+                max_elements=len(ids),
+                M=self.params["m"],
+                ef_construction=self.params["ef_construction"],
+            )
+            index.add_items(matrix, np.arange(len(ids)))
+            index_file = write_index_file(
+                self.index_dir, f"hnsw-{new_build_tag()}.bin", lambda p: index.save_index(str(p))
+            )
+        meta = {
+            "fingerprint": fingerprint,
+            "params": self.params,
+            "dim": dim,
+            "index_file": index_file,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+        }
+        save_meta(self.index_dir, meta)
+        remove_stale_files(self.index_dir, {index_file}, ("hnsw*.bin",))
+        return meta
+
+    def search(self, vector, k: int, filter: dict = None):
+        if self.index is None:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        kwargs = {}
+        mask = None
+        if filter:
+            mask = self._masks.get(filter)
+            allowed = int(mask.sum())
+            if not allowed:
+                return []
+            k = min(k, allowed)
+            kwargs["filter"] = lambda label: bool(mask[label])
+
+        k = min(k, len(self.documents))
+        try:
+            labels, distances = self.index.knn_query(q, k=k, **kwargs)
+        except RuntimeError:
+            # The graph walk reached fewer than k allowed nodes (a sparse
+            # filter at this ef): score the allowed rows exactly instead
+            labels, distances = self._exact_search(q, k, mask)
+        return to_documents(labels[0], distances[0], self.documents, self.metadatas)
+
+    def _exact_search(self, q, k: int, mask=None):
+        """Brute-force squared-L2 top k over the rows in `mask` (all if None)."""
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self.documents))
+        vectors = np.asarray(self.index.get_items(rows), dtype=np.float32)
+        distances = ((vectors - q) ** 2).sum(axis=1)
+        best = np.argsort(distances)[:k]
+        return rows[best][None, :], distances[best][None, :]
+
+    def count(self) -> int:
+        return len(self.documents)
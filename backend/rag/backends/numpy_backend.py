@@ -0,0 +1,122 @@
+# backend/rag/backends/numpy_backend.py
+from pathlib import Path
+
+import numpy as np
+
+from backend.config import settings
+from backend.rag.backends.base import (
+    MaskCache,
+    RetrievalBackend,
+    collection_fingerprint,
+    export_collection,
+    index_lock,
+    new_build_tag,
+    remove_stale_files,
+    to_documents,
+    load_meta,
+    save_meta,
+    write_index_file,
+)
+
+# Rows scored per matmul, bounds temporary memory for float16 indexes
+BLOCK_ROWS = 65536
+
+
+def _save(path, array):
+    with open(path, "wb") as f:  # a file object keeps np.save from renaming
+        np.save(f, array)
+
+
+class NumpyBackend(RetrievalBackend):
+    """
+    Exact search: one matrix-vector product over a memory-mapped embedding
+    matrix (float32 or float16, NUMPY_INDEX_DTYPE). For small corpora this
+    skips Chroma's per-query overhead entirely.
+
+    Files in `index_dir`: embeddings-<build>.npy, norms-<build>.npy and
+    meta.json naming them. They are rebuilt from Chroma when the
+    collection's IDs change; rebuilds write new files and swap meta.json,
+    under a file lock, so older instances keep reading their own files.
+    """
+
+    name = "numpy"
+
+    def __init__(self, db, index_dir, dtype: str = None):
+        self.index_dir = Path(index_dir)
+        self.dtype = np.dtype(dtype or settings.NUMPY_INDEX_DTYPE)
+
+        fingerprint = collection_fingerprint(db._collection)
+        meta = load_meta(self.index_dir)
+        if self._stale(meta, fingerprint):
+            with index_lock(self.index_dir):
+                meta = load_meta(self.index_dir)  # another worker may have built it
+                if self._stale(meta, fingerprint):
+                    meta = self._build(db, fingerprint)
+
+        self.documents = meta["documents"]
+        self.metadatas = meta["metadatas"]
+        self._masks = MaskCache(self.metadatas, settings.FILTER_MASK_CACHE_SIZE)
+        if self.documents:
+            files = meta["files"]
+            self.matrix = np.load(self.index_dir / files["embeddings"], mmap_mode="r")
+            self.norms = np.load(self.index_dir / files["norms"])
+        else:
+            self.matrix = np.zeros((0, 0), dtype=self.dtype)
+            self.norms = np.zeros(0, dtype=np.float32)
+
+    def _stale(self, meta, fingerprint):
+        return (
+            not meta
+            or "files" not in meta
+            or meta["fingerprint"] != fingerprint
+            or meta["dtype"] != self.dtype.name
+        )
+
+    def _build(self, db, fingerprint):
+        ids, matrix, documents, metadatas = export_collection(db._collection)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        files = {}
+        if len(ids):
+            tag = new_build_tag()
+            files["embeddings"] = write_index_file(
+                self.index_dir, f"embeddings-{tag}.npy", lambda p: _save(p, matrix.astype(self.dtype))
+            )
+            files["norms"] = write_index_file(
+                self.index_dir, f"norms-{tag}.npy", lambda p: _save(p, np.einsum("ij,ij->i", matrix, matrix))
+            )
+        meta = {
+            "fingerprint": fingerprint,
+            "dtype": self.dtype.name,
+            "files": files,
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+        }
+        save_meta(self.index_dir, meta)
+        remove_stale_files(self.index_dir, set(files.values()), ("embeddings*.npy", "norms*.npy"))
+        return meta
+
+    def search(self, vector, k: int, filter: dict = None):
+        n = len(self.documents)
+        if not n:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32)
+        dots = np.empty(n, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            block = np.asarray(self.matrix[start:start + BLOCK_ROWS], dtype=np.float32)
+            dots[start:start + BLOCK_ROWS] = block @ q
+
+        # squared L2 = |x|^2 - 2 x.q + |q|^2
+        distances = self.norms - 2 * dots + q @ q
+        if filter:
+            distances = np.where(self._masks.get(filter), distances, np.inf)
+
+        k = min(k, n)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        top = top[np.isfinite(distances[top])]
+        return to_documents(top, distances[top], self.documents, self.metadatas)
+
+    def count(self) -> int:
+        return len(self.documents)
@@ -0,0 +1,296 @@
+# backend/rag/bulk_ingest.py
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+
+from backend.config import settings
+from backend.metrics import (
+    ingest_files_total, ingest_pages_total, ingest_chunks_total, rag_span_seconds
+)
+from backend.rag.chunking import split_documents
+from backend.rag.embeddings import get_embeddings
+from backend.rag.manifest import (
+    load_manifest, save_manifest, file_unchanged, diff_chunks, record_file
+)
+from backend.rag.lexical import load_lexical_index, collection_bootstrap
+
+
+# -----------------------------
+# Parsing (runs in worker processes)
+# -----------------------------
+def parse_pdf(pdf_path: str, metadata: dict, chunk_size: int, chunk_overlap: int):
+    """
+    Loads and chunks one PDF.
+
+    Returns:
+        tuple: (pdf_path, page count, list of chunk Documents)
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    pages = PyPDFLoader(pdf_path).load()
+    for p in pages:
+        p.metadata.update(metadata)
+        p.metadata["source"] = pdf_path
+    return pdf_path, len(pages), split_documents(pages, chunk_size, chunk_overlap)
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+def _load_checkpoint(path: Path):
+    if path and path.exists():
+        return set(json.loads(path.read_text()).get("done", []))
+    return set()
+
+
+def _save_checkpoint(path: Path, done: set):
+    if path:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"done": sorted(done)}, indent=2))
+        tmp.replace(path)  # atomic, so a crash never leaves half a file
+
+
+class _Checkpointer:
+    """
+    Collects finished files and calls `save(done)` every `every` files or
+    `interval` seconds, whichever comes first, plus once from flush().
+    Rewriting the manifest and BM25 index after every PDF made a large
+    run quadratic in I/O. Files finished since the last save are simply
+    re-checked on resume: their chunk IDs are content hashes, so nothing
+    is written twice.
+    """
+
+    def __init__(self, done: set, save, every: int, interval: float):
+        self.done = done
+        self.save = save
+        self.every = max(1, every)
+        self.interval = interval
+        self.unsaved = 0
+        self.last_save = time.monotonic()
+
+    def file_done(self, pdf_path: str):
+        self.done.add(pdf_path)
+        self.unsaved += 1
+        if self.unsaved >= self.every or time.monotonic() - self.last_save >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self.save(self.done)
+        self.unsaved = 0
+        self.last_save = time.monotonic()
+
+
+# -----------------------------
+# Batched embed + write
+# -----------------------------
+class _BatchWriter:
+    """
+    Buffers new chunks, embeds them EMBED_BATCH_SIZE at a time and writes
+    to Chroma WRITE_BATCH_SIZE at a time. Chunks whose content-hash ID is
+    already indexed are skipped, stale ones deleted. A file counts as done
+    only once all of its new chunks have been written.
+    """
+
+    def __init__(self, db, manifest: dict, embed_batch_size: int, write_batch_size: int, on_file_done, lexical=None):
+        self.db = db
+        self.manifest = manifest
+        self.lexical = lexical  # BM25 index kept in step with the writes
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        self.on_file_done = on_file_done
+        self.buffer = []    # (chunk id, chunk, pdf_path)
+        self.pending = {}   # pdf_path -> unwritten chunk count
+        self.file_ids = {}  # pdf_path -> all chunk ids of the file
+        self.chunks_written = 0
+        self.chunks_skipped = 0
+        self.chunks_deleted = 0
+
+    def add_file(self, pdf_path: str, chunks):
+        if pdf_path not in self.manifest:
+            # Indexed before manifests existed (random IDs): start clean
+            self.db._collection.delete(where={"source": pdf_path})
+            if self.lexical is not None:
+                self.lexical.remove_source(pdf_path)
+
+        new, stale_ids, all_ids = diff_chunks(self.manifest, pdf_path, chunks)
+        if stale_ids:
+            self.db._collection.delete(ids=stale_ids)
+            if self.lexical is not None:
+                self.lexical.remove(stale_ids)
+            self.chunks_deleted += len(stale_ids)
+        self.chunks_skipped += len(all_ids) - len(new)
+        self.file_ids[pdf_path] = all_ids
+
+        if not new:
+            self._file_done(pdf_path)
+            return
+        self.pending[pdf_path] = len(new)
+        self.buffer.extend((cid, c, pdf_path) for cid, c in new)
+        while len(self.buffer) >= self.write_batch_size:
+            self._write_next()
+
+    def flush(self):
+        """Writes everything still buffered (end of run)."""
+        while self.buffer:
+            self._write_next()
+
+    def _write_next(self):
+        batch = self.buffer[:self.write_batch_size]
+        self.buffer = self.buffer[self.write_batch_size:]
+        self._write(batch)
+
+    def _write(self, batch):
+        texts = [chunk.page_content for _, chunk, _ in batch]
+
+        embeddings = []
+        model = get_embeddings()
+        for i in range(0, len(texts), self.embed_batch_size):
+            embeddings.extend(model.embed_documents(texts[i:i + self.embed_batch_size]))
+
+        self.db._collection.upsert(
+            ids=[cid for cid, _, _ in batch],
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=[chunk.metadata for _, chunk, _ in batch],
+        )
+        self.chunks_written += len(batch)
+        if self.lexical is not None:
+            for cid, chunk, _ in batch:
+                self.lexical.add(cid, chunk.page_content, chunk.metadata)
+
+        for _, _, pdf_path in batch:
+            self.pending[pdf_path] -= 1
+            if self.pending[pdf_path] == 0:
+                del self.pending[pdf_path]
+                self._file_done(pdf_path)
+
+    def _file_done(self, pdf_path):
+        record_file(self.manifest, pdf_path, self.file_ids.pop(pdf_path))
+        self.on_file_done(pdf_path)
+
+
+def parse_in_window(pool, pdf_paths, max_pending: int, *args):
+    """
+    Yields parse_pdf(path, *args) results as they complete, keeping at
+    most `max_pending` files submitted but not yet consumed, so a large
+    folder never holds every parsed PDF in memory at once.
+    """
+    paths = iter(pdf_paths)
+    pending = {pool.submit(parse_pdf, path, *args) for path in islice(paths, max_pending)}
+    while pending:
+        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+        while finished:
+            result = finished.pop().result()
+            pending.update(pool.submit(parse_pdf, path, *args) for path in islice(paths, 1))
+            yield result
+
+
+# -----------------------------
+# Function: Bulk Ingest
+# -----------------------------
+def bulk_ingest_pdfs(
+    pdf_paths,
+    db,
+    store_dir,
+    metadata: dict,
+    checkpoint_path: Path = None,
+    workers: int = None,
+    embed_batch_size: int = None,
+    write_batch_size: int = None,
+):
+    """
+    Ingests many PDFs: parsed + chunked in a process pool, embedded in
+    fixed-size batches, written to Chroma in large batches.
+    Files listed in `checkpoint_path` are skipped, so an interrupted run can
+    be resumed by calling again with the same checkpoint. Files unchanged
+    since the last run (per the store's manifest) are skipped too, and
+    changed files only embed their new chunks.
+
+    Args:
+        pdf_paths: PDFs to ingest
+        db: Chroma vectorstore to write into
+        store_dir: directory of that store (holds manifest.json)
+        metadata: extra metadata for every chunk (e.g. scope, user_id)
+        checkpoint_path: optional JSON file recording finished PDFs
+    Returns:
+        dict: files, pages, chunks, seconds, pages_per_sec, chunks_per_sec
+    """
+    workers = workers or settings.INGEST_WORKERS
+    checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+
+    done = _load_checkpoint(checkpoint_path)
+    manifest = load_manifest(store_dir)
+    todo = [
+        str(p) for p in pdf_paths
+        if str(p) not in done and not file_unchanged(manifest, p)
+    ]
+    skipped = len(pdf_paths) - len(todo)
+    if skipped:
+        print(f"{skipped} PDFs already ingested / unchanged, {len(todo)} left")
+
+    lexical = load_lexical_index(store_dir, bootstrap=collection_bootstrap(db))
+
+    def save(done):
+        # Manifest and BM25 first: the checkpoint never names a file they lack
+        save_manifest(store_dir, manifest)
+        lexical.save()
+        _save_checkpoint(checkpoint_path, done)
+
+    checkpointer = _Checkpointer(
+        done, save, settings.INGEST_CHECKPOINT_FILES, settings.INGEST_CHECKPOINT_SECONDS
+    )
+    writer = _BatchWriter(
+        db,
+        manifest,
+        embed_batch_size or settings.EMBED_BATCH_SIZE,
+        write_batch_size or settings.WRITE_BATCH_SIZE,
+        checkpointer.file_done,
+        lexical,
+    )
+
+    start = time.perf_counter()
+    pages_total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = parse_in_window(
+            pool, todo, 2 * workers, metadata, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP
+        )
+        for n, (pdf_path, page_count, chunks) in enumerate(parsed, start=1):
+            pages_total += page_count
+            writer.add_file(pdf_path, chunks)
+
+            elapsed = time.perf_counter() - start
+            print(
+                f"[{n}/{len(todo)}] {Path(pdf_path).name}: "
+                f"{page_count} pages, {len(chunks)} chunks "
+                f"({pages_total / elapsed:.1f} pages/s)"
+            )
+    writer.flush()
+    checkpointer.flush()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "files": len(todo),
+        "skipped": skipped,
+        "pages": pages_total,
+        "chunks": writer.chunks_written,
+        "chunks_unchanged": writer.chunks_skipped,
+        "chunks_deleted": writer.chunks_deleted,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages_total / elapsed, 2) if elapsed else 0.0,
+        "chunks_per_sec": round(writer.chunks_written / elapsed, 2) if elapsed else 0.0,
+    }
+    scope = metadata.get("scope", "global")
+    ingest_files_total.inc(len(todo), scope=scope, outcome="ingested")
+    ingest_files_total.inc(skipped, scope=scope, outcome="skipped")
+    ingest_pages_total.inc(pages_total, scope=scope)
+    ingest_chunks_total.inc(writer.chunks_written, scope=scope)
+    rag_span_seconds.observe(elapsed, span=f"bulk_ingest_{scope}")
+
+    print(
+        f"Bulk ingest done ✔: {stats['pages']} pages, {stats['chunks']} chunks "
+        f"in {stats['seconds']}s ({stats['pages_per_sec']} pages/s, "
+        f"{stats['chunks_per_sec']} chunks/s)"
+    )
+    return stats
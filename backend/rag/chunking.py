@@ -0,0 +1,108 @@
+# backend/rag/chunking.py
+import re
+
+from langchain_core.documents import Document
+
+from backend.config import settings
+
+# Sentence ends (. ! ? followed by whitespace) and blank-line paragraph breaks
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+# -----------------------------
+# Sentence splitting
+# -----------------------------
+def _sentence_spans(text: str):
+    """(start, end) offsets of each sentence in `text`, whitespace trimmed."""
+    spans = []
+    cuts = [0]
+    for match in _BOUNDARY_RE.finditer(text):
+        cuts.extend(match.span())
+    cuts.append(len(text))
+
+    for start, end in zip(cuts[::2], cuts[1::2]):
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+    return spans
+
+
+def _hard_split(start: int, end: int, text: str, size: int):
+    """Splits one over-long sentence into <= size pieces, at spaces if possible."""
+    spans = []
+    while end - start > size:
+        cut = text.rfind(" ", start + 1, start + size)
+        if cut == -1:
+            cut = start + size
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+# -----------------------------
+# Function: Split Text
+# -----------------------------
+def split_text(text: str, chunk_size: int = None, chunk_overlap: int = None):
+    """
+    Packs whole sentences into chunks of at most `chunk_size` characters.
+    Consecutive chunks share trailing sentences worth up to `chunk_overlap`
+    characters. Sentences longer than a chunk are split at spaces.
+
+    Returns:
+        list of (start_offset, end_offset) into `text`
+    """
+    chunk_size = chunk_size or settings.CHUNK_SIZE
+    chunk_overlap = settings.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap
+
+    sentences = []
+    for start, end in _sentence_spans(text):
+        sentences.extend(_hard_split(start, end, text, chunk_size))
+
+    chunks = []
+    current = []  # sentence spans in the chunk being built
+    for span in sentences:
+        if current and span[1] - current[0][0] > chunk_size:
+            chunks.append((current[0][0], current[-1][1]))
+
+            # Carry the last sentences over as overlap
+            carried = []
+            for prev in reversed(current):
+                if span[1] - prev[0] > chunk_size or current[-1][1] - prev[0] > chunk_overlap:
+                    break
+                carried.insert(0, prev)
+            current = carried
+        current.append(span)
+
+    if current:
+        chunks.append((current[0][0], current[-1][1]))
+    return chunks
+
+
+# -----------------------------
+# Function: Split Documents
+# -----------------------------
+def split_documents(pages, chunk_size: int = None, chunk_overlap: int = None):
+    """
+    Chunks loaded PDF pages for indexing.
+    Each chunk keeps the page metadata (source, page, scope, ...) and adds
+    chunk_index, start_offset and end_offset within the page text.
+    """
+    chunks = []
+    for page in pages:
+        text = page.page_content
+        for i, (start, end) in enumerate(split_text(text, chunk_size, chunk_overlap)):
+            metadata = dict(page.metadata)
+            metadata.update({
+                "chunk_index": i,
+                "start_offset": start,
+                "end_offset": end,
+            })
+            chunks.append(Document(page_content=text[start:end], metadata=metadata))
+    return chunks
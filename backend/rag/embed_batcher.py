@@ -0,0 +1,164 @@
+# backend/rag/embed_batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.config import settings
+from backend.metrics import embed_batch_size, embed_batch_seconds, embed_queue_seconds
+
+
+# -----------------------------
+# Micro-batching executor
+# -----------------------------
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched ones.
+
+    Callers block in `__call__(item)`; a worker thread takes the first
+    queued item, waits up to `max_wait` seconds for more (or until
+    `max_batch_size` are queued), runs `fn(unique items)` once and hands
+    each caller its own result. Identical items in a batch are computed once.
+    """
+
+    def __init__(self, fn, max_batch_size: int = 32, max_wait: float = 0.005, name: str = "batcher"):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item) -> Future:
+        """Queues `item`; the future resolves to fn's result for it."""
+        self.start()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _collect(self):
+        """Next batch (list of queued entries), or None on shutdown."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _process(self, batch):
+        start = time.perf_counter()
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        for _, _, queued_at in batch:
+            embed_queue_seconds.observe(start - queued_at, batcher=self.name)
+
+        unique = list(dict.fromkeys(item for item, _, _ in batch))
+        try:
+            results = self.fn(unique)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finally:
+            embed_batch_seconds.observe(time.perf_counter() - start, batcher=self.name)
+            embed_batch_size.observe(len(batch), batcher=self.name)
+
+        by_item = dict(zip(unique, results))
+        for item, future, _ in batch:
+            future.set_result(by_item[item])
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._process(batch)
+
+    def start(self):
+        """Starts the worker thread (idempotent)."""
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Serves what is already queued, then stops the worker."""
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(None)
+            worker.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+            }
+
+
+# -----------------------------
+# Shared query batcher
+# -----------------------------
+_query_batcher = None
+_lock = threading.Lock()
+
+
+def _embed_batch(texts):
+    from backend.rag.embeddings import get_embeddings
+
+    return get_embeddings().embed_documents(texts)
+
+
+def get_query_batcher() -> MicroBatcher:
+    """Batcher for /chat query embeddings, configured from settings."""
+    global _query_batcher
+    if _query_batcher is None:
+        with _lock:
+            if _query_batcher is None:
+                _query_batcher = MicroBatcher(
+                    _embed_batch,
+                    max_batch_size=settings.QUERY_EMBED_BATCH_SIZE,
+                    max_wait=settings.QUERY_EMBED_MAX_WAIT_MS / 1000,
+                    name="query_embed",
+                )
+    return _query_batcher
+
+
+def stop_query_batcher():
+    if _query_batcher is not None:
+        _query_batcher.stop()
+
+
+def query_batcher_stats():
+    if _query_batcher is None:
+        return {"enabled": settings.QUERY_EMBED_BATCHING, "batches": 0}
+    return {"enabled": settings.QUERY_EMBED_BATCHING, **_query_batcher.stats()}
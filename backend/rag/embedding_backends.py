@@ -0,0 +1,161 @@
+# backend/rag/embedding_backends.py
+# -----------------------------
+# CPU embedding backends (EMBEDDING_BACKEND)
+# -----------------------------
+# "torch"       HuggingFaceEmbeddings, the original PyTorch fp32 path
+# "torch_int8"  the same SentenceTransformer with its Linear layers
+#               dynamically quantized to int8 (no extra files needed)
+# "onnx"        ONNX Runtime + tokenizers, loading EMBEDDING_ONNX_FILE from
+#               the model repo; point it at one of the published int8 files
+#               (e.g. onnx/model_qint8_avx512_vnni.onnx) for int8 on ONNX
+#
+# All three produce mean-pooled, L2-normalised vectors for
+# sentence-transformers models such as all-MiniLM-L6-v2, so an index built
+# with one backend stays searchable with another (see test_embedding_backends
+# for the measured drift).
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_ONNX_FILE = "onnx/model.onnx"
+
+
+def _set_torch_threads(threads: int):
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _repo_id(model_name: str) -> str:
+    """Short sentence-transformers names map to their hub repo."""
+    if os.path.isdir(model_name) or "/" in model_name:
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+def _model_file(model_name: str, filename: str) -> str:
+    """Path of `filename` in a local model dir or the (cached) hub repo."""
+    if os.path.isdir(model_name):
+        return os.path.join(model_name, filename)
+    from huggingface_hub import hf_hub_download
+
+    return hf_hub_download(_repo_id(model_name), filename)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+# -----------------------------
+# PyTorch int8 (dynamic quantization)
+# -----------------------------
+class QuantizedTorchEmbeddings(Embeddings):
+    """SentenceTransformer on CPU with int8 dynamically quantized Linear layers."""
+
+    def __init__(self, model_name: str, threads: int = 0, batch_size: int = 32):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        _set_torch_threads(threads)
+        model = SentenceTransformer(_repo_id(model_name), device="cpu")
+        self.model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# -----------------------------
+# ONNX Runtime
+# -----------------------------
+class OnnxEmbeddings(Embeddings):
+    """
+    Transformer forward pass in ONNX Runtime, then mean pooling over the
+    attention mask and L2 normalisation (the sentence-transformers pipeline
+    of MiniLM-style models). `threads` sets intra-op threads (0 = all cores).
+    """
+
+    def __init__(self, model_name: str, onnx_file: str = DEFAULT_ONNX_FILE, threads: int = 0,
+                 batch_size: int = 32, max_length: int = 256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(_model_file(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+        self.tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            _model_file(model_name, onnx_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]  # (batch, tokens, dim)
+        weights = mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return _normalize(pooled)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        out = []
+        for i in range(0, len(texts), self.batch_size):
+            out.extend(self._encode(texts[i:i + self.batch_size]).tolist())
+        return out
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# -----------------------------
+# Factory
+# -----------------------------
+def _load_torch(model_name, threads, onnx_file):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    _set_torch_threads(threads)
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _load_torch_int8(model_name, threads, onnx_file):
+    return QuantizedTorchEmbeddings(model_name, threads)
+
+
+def _load_onnx(model_name, threads, onnx_file):
+    return OnnxEmbeddings(model_name, onnx_file, threads)
+
+
+EMBEDDING_BACKENDS = {
+    "torch": _load_torch,
+    "torch_int8": _load_torch_int8,
+    "onnx": _load_onnx,
+}
+
+
+def load_embeddings(name: str, model_name: str, threads: int = 0, onnx_file: str = DEFAULT_ONNX_FILE):
+    """Builds the embedding model for backend `name`."""
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}', expected one of {sorted(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[name](model_name, threads, onnx_file or DEFAULT_ONNX_FILE)
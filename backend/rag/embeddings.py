@@ -0,0 +1,99 @@
+# backend/rag/embeddings.py
+import threading
+import time
+
+from backend.config import settings
+
+try:
+    import resource  # not available on Windows
+except ImportError:  # pragma: no cover
+    resource = None
+
+# -----------------------------
+# Process-wide embedding registry
+# -----------------------------
+# Every Chroma handle (global, user, ingestion) shares one model instance
+# so it is loaded once per worker instead of once per module / call.
+_lock = threading.Lock()
+_embeddings = None
+_stats = {
+    "model_name": settings.EMBEDDING_MODEL,
+    "backend": settings.EMBEDDING_BACKEND,
+    "threads": settings.EMBEDDING_THREADS or None,
+    "loaded": False,
+    "load_seconds": None,
+    "rss_delta_mb": None,
+}
+
+
+def _rss_mb():
+    """Peak resident memory of this process in MB (None if unknown)."""
+    if resource is None:
+        return None
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_model(model_name: str):
+    from backend.rag.embedding_backends import load_embeddings
+
+    return load_embeddings(
+        settings.EMBEDDING_BACKEND,
+        model_name,
+        threads=settings.EMBEDDING_THREADS,
+        onnx_file=settings.EMBEDDING_ONNX_FILE,
+    )
+
+
+# -----------------------------
+# Function: Get Shared Embeddings
+# -----------------------------
+def get_embeddings():
+    """
+    Returns the shared embedding model, loading it on first use.
+    Safe to call from multiple threads; only one thread loads the model.
+    """
+    global _embeddings
+
+    if _embeddings is not None:
+        return _embeddings
+
+    with _lock:
+        if _embeddings is None:
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+
+            model = _load_model(settings.EMBEDDING_MODEL)
+
+            _stats["load_seconds"] = round(time.perf_counter() - start, 3)
+            rss_after = _rss_mb()
+            if rss_before is not None and rss_after is not None:
+                _stats["rss_delta_mb"] = round(rss_after - rss_before, 1)
+            _stats["loaded"] = True
+
+            _embeddings = model
+            print(
+                f"Embedding model loaded ✔: {settings.EMBEDDING_MODEL} "
+                f"[{settings.EMBEDDING_BACKEND}] "
+                f"in {_stats['load_seconds']}s "
+                f"(+{_stats['rss_delta_mb']} MB)"
+            )
+
+    return _embeddings
+
+
+# -----------------------------
+# Function: Warm Up
+# -----------------------------
+def warmup_embeddings():
+    """
+    Loads the model and runs one dummy query so the first /chat request
+    doesn't pay the load + first-inference cost.
+    """
+    get_embeddings().embed_query("warmup")
+    return embedding_stats()
+
+
+def embedding_stats():
+    """Load time and memory usage of the shared model."""
+    return dict(_stats)
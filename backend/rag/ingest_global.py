@@ -1,18 +1,24 @@
 # backend/rag/ingest_global.py
+import time
 from pathlib import Path
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
+from backend.config import settings
+from backend.rag.embeddings import get_embeddings
+from backend.rag.chunking import split_documents
+from backend.rag.manifest import is_ingested, sync_chunks
+from backend.rag.bulk_ingest import bulk_ingest_pdfs
+from backend.rag.store_cache import get_cached_store, invalidate_store
+from backend.rag.query_cache import invalidate_retrieval_cache
+from backend.metrics import record_ingest
 
 # -----------------------------
-# Paths & Embeddings
+# Paths
 # -----------------------------
-CHROMA_PATH = Path(__file__).parent / "vectorstore" / "global"
+VECTORSTORE_ROOT = Path(settings.VECTORSTORE_DIR or Path(__file__).parent / "vectorstore")
+CHROMA_PATH = VECTORSTORE_ROOT / "global"
 CHROMA_PATH.mkdir(parents=True, exist_ok=True)  # ensure directory exists
 
-# HuggingFace embeddings model
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
 
 # -----------------------------
 # Function: Get or Create Global Vectorstore
@@ -21,12 +27,16 @@ def get_global_vectorstore():
     """
     Returns the Chroma vectorstore for global documents.
     Creates a new one if it doesn't exist yet.
+    The handle is opened once and reused across requests.
     """
-    db = Chroma(
+    return get_cached_store("global", factory=_open_global_vectorstore)
+
+
+def _open_global_vectorstore():
+    return Chroma(
         persist_directory=str(CHROMA_PATH),
-        embedding_function=embeddings
+        embedding_function=get_embeddings()
     )
-    return db
 
 
 # -----------------------------
@@ -34,7 +44,10 @@ def get_global_vectorstore():
 # -----------------------------
 def ingest_global_pdf(pdf_path: str):
     """
-    Loads a PDF, adds metadata, and indexes it into the global vectorstore.
+    Loads a PDF, adds metadata, splits it into chunks (CHUNK_SIZE /
+    CHUNK_OVERLAP) and indexes them into the global vectorstore.
+    Re-ingesting is incremental: unchanged files are skipped, and for
+    changed files only new chunks are embedded and stale ones deleted.
     
     Args:
         pdf_path: str, path to PDF file
@@ -43,6 +56,12 @@ def ingest_global_pdf(pdf_path: str):
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found at {pdf_path}")
 
+    if is_ingested(CHROMA_PATH, pdf_path):
+        print(f"Global PDF unchanged, skipped: {pdf_path.name}")
+        record_ingest("global", "skipped")
+        return
+
+    start = time.perf_counter()
     loader = PyPDFLoader(str(pdf_path))
     pages = loader.load()
 
@@ -51,22 +70,43 @@ def ingest_global_pdf(pdf_path: str):
         p.metadata["scope"] = "global"
         p.metadata["source"] = str(pdf_path)
 
+    chunks = split_documents(pages)
+
     # Get global vectorstore
     db = get_global_vectorstore()
-    db.add_documents(pages)
+    added, deleted = sync_chunks(db, CHROMA_PATH, pdf_path, chunks)
     # db.persist()
+    if added or deleted:
+        invalidate_store("global")
+        invalidate_retrieval_cache("global")
 
-    print(f"Global PDF indexed ✔: {pdf_path.name}")
+    record_ingest("global", "ingested", len(pages), added, time.perf_counter() - start)
+    print(f"Global PDF indexed ✔: {pdf_path.name} (+{added} / -{deleted} chunks)")
 
 
 # -----------------------------
 # Optional: Ingest all PDFs in folder
 # -----------------------------
-def ingest_all_global_pdfs(folder_path: str):
+def ingest_all_global_pdfs(folder_path: str, checkpoint_path: str = None):
+    """
+    Bulk-ingests every PDF in a folder (parallel parsing, batched
+    embedding and writes). Pass `checkpoint_path` to make the run resumable.
+
+    Returns:
+        dict: throughput stats (pages/sec, chunks/sec, ...)
+    """
     folder_path = Path(folder_path)
     if not folder_path.exists():
         raise FileNotFoundError(f"Folder not found: {folder_path}")
 
-    pdfs = list(folder_path.glob("*.pdf"))
-    for pdf in pdfs:
-        ingest_global_pdf(str(pdf))
+    pdfs = sorted(folder_path.glob("*.pdf"))
+    stats = bulk_ingest_pdfs(
+        pdfs,
+        get_global_vectorstore(),
+        CHROMA_PATH,
+        metadata={"scope": "global"},
+        checkpoint_path=checkpoint_path
+    )
+    invalidate_store("global")
+    invalidate_retrieval_cache("global")
+    return stats
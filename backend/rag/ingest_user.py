@@ -1,19 +1,92 @@
 # backend/rag/ingest_user.py
 
+import threading
+import time
 from pathlib import Path
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
+from backend.config import settings
 from backend.rag.vectorstore.vectorstore import get_vectorstore
+from backend.rag.embeddings import get_embeddings
+from backend.rag.chunking import split_documents
+from backend.rag.manifest import is_ingested, sync_chunks
+from backend.rag.store_cache import close_store, get_cached_store, invalidate_store
+from backend.rag.query_cache import invalidate_retrieval_cache
+from backend.metrics import record_ingest
+from backend.validation import safe_user_id
 
 # -----------------------------
 # Base path where user vectorstores are stored
 # -----------------------------
-USER_VECTORSTORE_PATH = Path(__file__).parent / "vectorstore" / "users"
+VECTORSTORE_ROOT = Path(settings.VECTORSTORE_DIR or Path(__file__).parent / "vectorstore")
+USER_VECTORSTORE_PATH = VECTORSTORE_ROOT / "users"
 USER_VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
 
-# Embeddings model
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Shared layout (USER_STORE_LAYOUT=shared): one collection for all users
+SHARED_USER_VECTORSTORE_PATH = VECTORSTORE_ROOT / "users_shared"
+SHARED_USER_COLLECTION = "user_docs"
+
+# Users whose shared-collection chunks changed since the shared numpy / hnsw
+# index was built; their searches go to Chroma until the next rebuild
+_stale_shared_users = set()
+_stale_lock = threading.Lock()
+
+
+def shared_layout() -> bool:
+    return settings.USER_STORE_LAYOUT == "shared"
+
+
+def user_filter(user_id: str):
+    """Metadata filter for user searches (only needed in the shared layout)."""
+    return {"user_id": user_id} if shared_layout() else None
+
+
+def shared_index_stale(user_id: str) -> bool:
+    """True if the shared index misses some of the user's chunks."""
+    with _stale_lock:
+        return user_id in _stale_shared_users
+
+
+def _shared_collection_changed(user_id: str):
+    """
+    Records an upload into the shared collection. Rebuilding the shared
+    index (every user's chunks) on each upload would make one upload cost
+    a full re-export, so only the uploader is routed to Chroma; once
+    SHARED_INDEX_STALE_USERS users are, the index is rebuilt on next use.
+    """
+    if settings.RETRIEVAL_BACKEND == "chroma":
+        return  # Chroma is always current
+    with _stale_lock:
+        _stale_shared_users.add(user_id)
+        if len(_stale_shared_users) < settings.SHARED_INDEX_STALE_USERS:
+            return
+        _stale_shared_users.clear()
+        invalidate_store(f"users_shared/{settings.RETRIEVAL_BACKEND}")
+
+
+def user_store_dir(user_id: str) -> Path:
+    """Directory holding the user's manifest (and, per-user, the index)."""
+    user_id = safe_user_id(user_id)
+    if shared_layout():
+        return SHARED_USER_VECTORSTORE_PATH / "manifests" / user_id
+    return USER_VECTORSTORE_PATH / user_id
+
+
+# -----------------------------
+# Function: Get Shared User Vectorstore
+# -----------------------------
+def get_shared_user_vectorstore():
+    """The single collection holding every user's chunks (shared layout)."""
+    return get_cached_store("users_shared", factory=_open_shared_user_vectorstore)
+
+
+def _open_shared_user_vectorstore():
+    SHARED_USER_VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+    return Chroma(
+        collection_name=SHARED_USER_COLLECTION,
+        persist_directory=str(SHARED_USER_VECTORSTORE_PATH),
+        embedding_function=get_embeddings()
+    )
 
 
 # -----------------------------
@@ -22,18 +95,34 @@ embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 def get_user_vectorstore(user_id: str):
     """
     Returns a Chroma vectorstore for a specific user.
-    If the user has no uploaded documents, creates a new vectorstore.
+    If the user has no uploaded documents, returns None.
+    Handles (and the empty result) are cached until the user ingests a PDF.
+    In the shared layout this is the shared collection; search it with
+    filter=user_filter(user_id).
     """
-    user_path = USER_VECTORSTORE_PATH / user_id
+    return get_cached_store(
+        "user", user_id, factory=lambda: _open_user_vectorstore(user_id)
+    )
+
+
+def _open_user_vectorstore(user_id: str):
+    if shared_layout():
+        db = get_shared_user_vectorstore()
+        if not db._collection.get(where={"user_id": user_id}, limit=1)["ids"]:
+            return None
+        return db
+
+    user_path = user_store_dir(user_id)
     user_path.mkdir(parents=True, exist_ok=True)  # ensure folder exists
 
     db = Chroma(
         persist_directory=str(user_path),
-        embedding_function=embeddings
+        embedding_function=get_embeddings()
     )
 
     # If vectorstore is empty, return None so RAG can skip user docs
     if not db._collection.count():  # _collection is internal Chroma collection
+        close_store(db)
         return None
 
     return db
@@ -42,18 +131,33 @@ def get_user_vectorstore(user_id: str):
 # -----------------------------
 # Function: Ingest User PDF
 # -----------------------------
-def ingest_user_pdf(pdf_path: str, user_id: str):
+def ingest_user_pdf(pdf_path: str, user_id: str, progress=None):
     """
-    Loads a user PDF, adds metadata, and indexes it into the user's vectorstore.
+    Loads a user PDF, adds metadata, splits it into chunks and indexes them
+    into the user's vectorstore. Unchanged files are skipped and changed
+    files only embed their new chunks.
 
     Args:
         pdf_path: str, path to PDF file
         user_id: str, Google ID or unique user identifier
+        progress: optional callback(stage, **details) for job status
+    Returns:
+        dict: pages, chunks, added, deleted (skipped=True if unchanged)
     """
+    progress = progress or (lambda stage, **details: None)
+
     pdf_path = Path(pdf_path)
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF not found at {pdf_path}")
 
+    user_path = user_store_dir(user_id)
+    if is_ingested(user_path, pdf_path):
+        print(f"User PDF unchanged, skipped: {pdf_path.name} for user {user_id}")
+        record_ingest("user", "skipped")
+        return {"skipped": True}
+
+    start = time.perf_counter()
+    progress("parsing")
     loader = PyPDFLoader(str(pdf_path))
     pages = loader.load()
 
@@ -63,9 +167,30 @@ def ingest_user_pdf(pdf_path: str, user_id: str):
         p.metadata["user_id"] = user_id
         p.metadata["source"] = str(pdf_path)
 
+    chunks = split_documents(pages)
+    progress("embedding", pages=len(pages), chunks=len(chunks))
+
     # Get user vectorstore
-    db = get_vectorstore(persist_dir=USER_VECTORSTORE_PATH / user_id)
-    db.add_documents(pages)
-    db.persist()
+    if shared_layout():
+        db = get_shared_user_vectorstore()
+        added, deleted = sync_chunks(
+            db, user_path, pdf_path, chunks,
+            namespace=user_id, where={"user_id": user_id}
+        )
+    else:
+        db = get_vectorstore(persist_dir=user_path)
+        try:
+            added, deleted = sync_chunks(db, user_path, pdf_path, chunks)
+            db.persist()
+        finally:
+            close_store(db)  # its own client; the cached handle is reopened below
+
+    # Next lookup reopens the store so the new pages are visible
+    invalidate_store("user", user_id)
+    if shared_layout():
+        _shared_collection_changed(user_id)
+    invalidate_retrieval_cache("user", user_id)
 
-    print(f"User PDF indexed ✔: {pdf_path.name} for user {user_id}")
+    record_ingest("user", "ingested", len(pages), added, time.perf_counter() - start)
+    print(f"User PDF indexed ✔: {pdf_path.name} for user {user_id} (+{added} / -{deleted} chunks)")
+    return {"pages": len(pages), "chunks": len(chunks), "added": added, "deleted": deleted}
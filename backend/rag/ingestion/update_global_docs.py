@@ -1,20 +1,16 @@
 # backend/ingestion/update_global_docs.py
 
-from loader import load_pdf
-from splitter import split_into_chunks
-from vectordb import vector_db
+from backend.rag.ingest_global import ingest_global_pdf
 
 files = [
-    "backend\rag\docs\IV DELTA DATABASE  modified.pdf",
-    "backend\rag\docs\Dinesh_Resume (2).pdf",
-    "backend\rag\docs\Brand Book - Pi Dot.pdf"
+    "backend/rag/docs/IV DELTA DATABASE  modified.pdf",
+    "backend/rag/docs/Dinesh_Resume (2).pdf",
+    "backend/rag/docs/Brand Book - Pi Dot.pdf"
 ]
 
-docs = load_pdf(files)
-chunks = split_into_chunks(docs)
-
-
-vector_db.add_documents(chunks)
-vector_db.persist()
+# Safe to re-run: unchanged files are skipped, changed ones only
+# embed their new chunks (see backend/rag/manifest.py)
+for f in files:
+    ingest_global_pdf(f)
 
 print("Global docs updated ✅")
@@ -0,0 +1,241 @@
+# backend/rag/lexical.py
+import json
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from backend.config import settings
+from backend.rag.backends.base import matches_filter
+
+# -----------------------------
+# BM25 inverted index
+# -----------------------------
+# Kept next to each vector store (bm25.json) and updated by the same
+# ingest calls, so exact identifiers like product codes can be matched
+# even when MiniLM embeddings don't separate them.
+INDEX_NAME = "bm25.json"
+
+# Words, numbers and codes like "IV-DELTA-204" or "v2.1" as single terms
+_TERM_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str):
+    """Lowercased terms; compound codes also yield their parts."""
+    terms = []
+    for term in _TERM_RE.findall(text.lower()):
+        terms.append(term)
+        parts = re.split(r"[-_./]", term)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p)
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over chunks, persisted as JSON.
+    add() / remove() keep it in step with the vector store.
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else None
+        self.docs = {}        # id -> (text, metadata)
+        self.lengths = {}     # id -> number of terms
+        self.postings = {}    # term -> {id: term frequency}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    # ---------- updates ----------
+
+    def add(self, doc_id: str, text: str, metadata: dict = None):
+        with self._lock:
+            if doc_id in self.docs:
+                self.remove([doc_id])
+            counts = Counter(tokenize(text))
+            self.docs[doc_id] = (text, dict(metadata or {}))
+            self.lengths[doc_id] = sum(counts.values())
+            self.total_length += self.lengths[doc_id]
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id not in self.docs:
+                    continue
+                text, _ = self.docs.pop(doc_id)
+                self.total_length -= self.lengths.pop(doc_id)
+                for term in set(tokenize(text)):
+                    postings = self.postings.get(term)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self.postings[term]
+
+    def remove_source(self, source: str):
+        """Drops every chunk of one source file."""
+        with self._lock:
+            self.remove([i for i, (_, meta) in self.docs.items() if meta.get("source") == source])
+
+    # ---------- search ----------
+
+    def search(self, query: str, k: int, filter: dict = None):
+        """
+        Returns:
+            list of (Document, bm25 score) pairs, best first
+        """
+        k1, b = settings.BM25_K1, settings.BM25_B
+        with self._lock:
+            n = len(self.docs)
+            if not n:
+                return []
+            avg_length = self.total_length / n
+
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + k1 * (1 - b + b * self.lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (k1 + 1) / norm
+
+            results = []
+            for doc_id, score in scores.most_common():
+                text, metadata = self.docs[doc_id]
+                if filter and not matches_filter(metadata, filter):
+                    continue
+                results.append((Document(page_content=text, metadata=dict(metadata)), score))
+                if len(results) == k:
+                    break
+            return results
+
+    # ---------- persistence ----------
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {i: {"text": t, "metadata": m} for i, (t, m) in self.docs.items()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data))
+        tmp.replace(self.path)
+
+    @classmethod
+    def load(cls, path: Path):
+        index = cls(path)
+        if index.path.exists():
+            for doc_id, item in json.loads(index.path.read_text()).items():
+                index.add(doc_id, item["text"], item["metadata"])
+        return index
+
+    def __len__(self):
+        return len(self.docs)
+
+
+# -----------------------------
+# Loading / building per store
+# -----------------------------
+# Loaded indexes are not kept here: the retriever caches them in
+# store_cache ("global/bm25", "user/bm25") under the same LRU cap and
+# invalidation as the vector stores. Ingest loads, updates and saves.
+_load_locks = {}   # path -> [lock held while that index loads, holders]
+_registry_lock = threading.Lock()
+
+# Indexes missing on the request path are built here, off the latency budget
+_bootstrap_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25-bootstrap")
+_pending_builds = set()
+
+
+@contextmanager
+def _load_lock(path):
+    """Per-path load lock, dropped again once nobody holds or waits for it."""
+    with _registry_lock:
+        entry = _load_locks.setdefault(path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _registry_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _load_locks[path]
+
+
+def index_path(store_dir) -> Path:
+    return Path(store_dir) / INDEX_NAME
+
+
+def load_lexical_index(store_dir, bootstrap=None) -> BM25Index:
+    """
+    Loads the BM25 index kept in `store_dir`.
+    If no index file exists yet, `bootstrap()` may return
+    (ids, documents, metadatas) of already-indexed chunks to build it from;
+    the result is saved, so concurrent loads of one store bootstrap once.
+    Loading holds a per-path lock only, so a slow load or bootstrap of
+    one store never blocks loads of the others.
+    """
+    path = index_path(store_dir)
+    with _load_lock(path):
+        existed = path.exists()
+        index = BM25Index.load(path)
+        if not existed and bootstrap is not None:
+            ids, documents, metadatas = bootstrap()
+            for doc_id, text, metadata in zip(ids, documents, metadatas):
+                index.add(doc_id, text or "", metadata)
+            index.save()
+        return index
+
+
+def build_lexical_index_later(store_dir, bootstrap):
+    """Bootstraps a store's missing index in the background (once at a time)."""
+    path = index_path(store_dir)
+    with _registry_lock:
+        if path in _pending_builds:
+            return
+        _pending_builds.add(path)
+
+    def build():
+        try:
+            load_lexical_index(store_dir, bootstrap)
+        except Exception as e:
+            print(f"Building BM25 index in {store_dir} failed: {e!r}")
+        finally:
+            with _registry_lock:
+                _pending_builds.discard(path)
+
+    _bootstrap_executor.submit(build)
+
+
+def collection_bootstrap(db, where: dict = None):
+    """bootstrap callable for load_lexical_index() reading a Chroma store."""
+    def bootstrap():
+        kwargs = {"where": where} if where else {}
+        data = db._collection.get(include=["documents", "metadatas"], **kwargs)
+        return data["ids"], data["documents"], [m or {} for m in data["metadatas"]]
+    return bootstrap
+
+
+def update_lexical_index(index: BM25Index, added=(), removed_ids=(), removed_source: str = None):
+    """
+    Applies an ingest to a store's BM25 index and saves it.
+
+    Args:
+        added: (id, Document) pairs that were written to the vector store
+        removed_ids: chunk IDs deleted from the vector store
+        removed_source: source whose legacy chunks were cleared
+    """
+    if removed_source:
+        index.remove_source(removed_source)
+    index.remove(removed_ids)
+    for doc_id, chunk in added:
+        index.add(doc_id, chunk.page_content, chunk.metadata)
+    index.save()
@@ -0,0 +1,186 @@
+# backend/rag/manifest.py
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from backend.rag.lexical import load_lexical_index, update_lexical_index, collection_bootstrap
+
+# -----------------------------
+# Ingest manifest + stable chunk IDs
+# -----------------------------
+# Each vectorstore directory keeps a manifest.json:
+#   {source: {"mtime", "size", "sha256", "chunk_ids": [...]}}
+# Chunk IDs are a hash of source + chunk text, so re-ingesting the same
+# content maps onto the same IDs instead of adding duplicates.
+MANIFEST_NAME = "manifest.json"
+
+# One lock per store directory, held only while its manifest (and BM25
+# index) is read, changed and written, never while chunks are embedded
+_store_locks = {}   # store dir -> [lock, holders]
+_registry_lock = threading.Lock()
+
+
+@contextmanager
+def _store_lock(store_dir):
+    key = str(Path(store_dir).resolve())
+    with _registry_lock:
+        entry = _store_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _registry_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _store_locks[key]
+
+
+def chunk_id(source: str, text: str, namespace: str = "") -> str:
+    """
+    Stable ID for a chunk: content hash scoped to its source file.
+    `namespace` (the user id in the shared user collection) keeps IDs of
+    different owners apart when they live in one collection.
+    """
+    key = f"{source}\x00{text}"
+    if namespace:
+        key = f"{namespace}\x00{key}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(store_dir) -> dict:
+    path = Path(store_dir) / MANIFEST_NAME
+    if path.exists():
+        return json.loads(path.read_text())
+    return {}
+
+
+def save_manifest(store_dir, manifest: dict):
+    path = Path(store_dir) / MANIFEST_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(path)
+
+
+# -----------------------------
+# Function: File Unchanged
+# -----------------------------
+def file_unchanged(manifest: dict, pdf_path) -> bool:
+    """
+    True if `pdf_path` was already ingested with the same contents.
+    Checks mtime + size first and only hashes the file when they differ;
+    a file that was merely touched gets its mtime refreshed.
+    """
+    entry = manifest.get(str(pdf_path))
+    if not entry:
+        return False
+
+    stat = Path(pdf_path).stat()
+    if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+        return True
+
+    if entry["sha256"] == file_sha256(pdf_path):
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+        return True
+    return False
+
+
+def is_ingested(store_dir, pdf_path) -> bool:
+    """file_unchanged() against the manifest stored in `store_dir`."""
+    with _store_lock(store_dir):
+        manifest = load_manifest(store_dir)
+        unchanged = file_unchanged(manifest, pdf_path)
+        if unchanged:
+            save_manifest(store_dir, manifest)  # keep refreshed mtimes
+        return unchanged
+
+
+# -----------------------------
+# Function: Diff Chunks
+# -----------------------------
+def diff_chunks(manifest: dict, source: str, chunks, namespace: str = ""):
+    """
+    Compares freshly parsed chunks with what the manifest says is indexed.
+
+    Returns:
+        tuple:
+            new: list of (id, chunk) that need embedding
+            stale_ids: IDs indexed before but no longer present
+            all_ids: IDs of every chunk of the file (for record_file)
+    """
+    unique = {}
+    for chunk in chunks:
+        unique.setdefault(chunk_id(source, chunk.page_content, namespace), chunk)
+
+    entry = manifest.get(source)
+    old = set(entry["chunk_ids"]) if entry else set()
+
+    new = [(cid, chunk) for cid, chunk in unique.items() if cid not in old]
+    stale_ids = sorted(old - unique.keys())
+    return new, stale_ids, list(unique)
+
+
+def record_file(manifest: dict, pdf_path, chunk_ids):
+    """Stores the file's fingerprint and chunk IDs after it was indexed."""
+    stat = Path(pdf_path).stat()
+    manifest[str(pdf_path)] = {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha256": file_sha256(pdf_path),
+        "chunk_ids": list(chunk_ids),
+    }
+
+
+# -----------------------------
+# Function: Sync Chunks
+# -----------------------------
+def sync_chunks(db, store_dir, pdf_path, chunks, namespace: str = "", where: dict = None):
+    """
+    Makes the store match `chunks` for one source file: embeds only new
+    chunks, deletes stale ones and updates the manifest and the store's
+    BM25 index (built from the store on first use). Sources ingested
+    before manifests existed (random IDs) are cleared by their `source`
+    metadata first (narrowed by `where` in shared collections).
+    The store's lock is not held while embedding.
+
+    Returns:
+        tuple: (chunks added, chunks deleted)
+    """
+    source = str(pdf_path)
+    with _store_lock(store_dir):
+        manifest = load_manifest(store_dir)
+        legacy_source = None if source in manifest else source
+        new, stale_ids, all_ids = diff_chunks(manifest, source, chunks, namespace)
+
+    # Embedding and store writes run unlocked; other files of the store
+    # (and is_ingested checks) go on meanwhile
+    if legacy_source:
+        legacy = {"source": source}
+        if where:
+            legacy = {"$and": [legacy, where]}
+        db._collection.delete(where=legacy)
+    if stale_ids:
+        db.delete(ids=stale_ids)
+    if new:
+        db.add_documents([chunk for _, chunk in new], ids=[cid for cid, _ in new])
+
+    with _store_lock(store_dir):
+        lexical = load_lexical_index(store_dir, bootstrap=collection_bootstrap(db, where))
+        update_lexical_index(lexical, added=new, removed_ids=stale_ids, removed_source=legacy_source)
+        manifest = load_manifest(store_dir)  # other files may have been recorded meanwhile
+        record_file(manifest, pdf_path, all_ids)
+        save_manifest(store_dir, manifest)
+
+    return len(new), len(stale_ids)
@@ -0,0 +1,112 @@
+# backend/rag/migrate_user_stores.py
+# ==============================
+# Moves per-user Chroma directories (vectorstore/users/<user_id>) into the
+# shared user collection used by USER_STORE_LAYOUT=shared.
+# Embeddings are copied as-is, nothing is re-embedded.
+#
+# Usage:
+#   python -m backend.rag.migrate_user_stores              # copy all users
+#   python -m backend.rag.migrate_user_stores --dry-run    # only count
+#   python -m backend.rag.migrate_user_stores --delete-old # remove old dirs after copying
+# ==============================
+
+import argparse
+import shutil
+
+from langchain_chroma import Chroma
+
+from backend.config import settings
+from backend.rag.ingest_user import (
+    USER_VECTORSTORE_PATH,
+    SHARED_USER_VECTORSTORE_PATH,
+    SHARED_USER_COLLECTION,
+)
+from backend.rag.manifest import chunk_id, load_manifest, save_manifest
+
+
+def _open(path, collection_name=None):
+    kwargs = {"collection_name": collection_name} if collection_name else {}
+    # No embedding function: we only move stored vectors around
+    return Chroma(persist_directory=str(path), embedding_function=None, **kwargs)
+
+
+# -----------------------------
+# Function: Migrate One User
+# -----------------------------
+def migrate_user(user_dir, shared_db, dry_run: bool = False):
+    """
+    Copies one user's chunks into the shared collection with namespaced
+    IDs and writes the matching manifest for the shared layout.
+
+    Returns:
+        int: number of chunks copied
+    """
+    user_id = user_dir.name
+    data = _open(user_dir)._collection.get(include=["embeddings", "documents", "metadatas"])
+    if not data["ids"]:
+        return 0
+
+    records = {}
+    source_ids = {}
+    for embedding, text, metadata in zip(data["embeddings"], data["documents"], data["metadatas"]):
+        metadata = dict(metadata or {})
+        metadata["user_id"] = user_id
+        metadata["scope"] = "user"
+        source = metadata.get("source", "")
+        cid = chunk_id(source, text, namespace=user_id)
+        records[cid] = (embedding, text, metadata)
+        source_ids.setdefault(source, []).append(cid)
+
+    if dry_run:
+        return len(records)
+
+    ids = list(records)
+    for i in range(0, len(ids), settings.WRITE_BATCH_SIZE):
+        batch = ids[i:i + settings.WRITE_BATCH_SIZE]
+        shared_db._collection.upsert(
+            ids=batch,
+            embeddings=[records[cid][0] for cid in batch],
+            documents=[records[cid][1] for cid in batch],
+            metadatas=[records[cid][2] for cid in batch],
+        )
+
+    # Carry the incremental-ingest manifest over with the new IDs
+    old_manifest = load_manifest(user_dir)
+    new_manifest = {}
+    for source, entry in old_manifest.items():
+        if source in source_ids:
+            new_manifest[source] = {**entry, "chunk_ids": sorted(set(source_ids[source]))}
+    save_manifest(SHARED_USER_VECTORSTORE_PATH / "manifests" / user_id, new_manifest)
+
+    copied = len(shared_db._collection.get(where={"user_id": user_id}, include=[])["ids"])
+    if copied < len(records):
+        raise RuntimeError(f"User {user_id}: copied {copied} of {len(records)} chunks")
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-user Chroma dirs into one shared collection")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--delete-old", action="store_true")
+    args = parser.parse_args()
+
+    SHARED_USER_VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+    shared_db = _open(SHARED_USER_VECTORSTORE_PATH, SHARED_USER_COLLECTION)
+
+    user_dirs = sorted(p for p in USER_VECTORSTORE_PATH.iterdir() if p.is_dir())
+    total = 0
+    for n, user_dir in enumerate(user_dirs, start=1):
+        count = migrate_user(user_dir, shared_db, dry_run=args.dry_run)
+        total += count
+        print(f"[{n}/{len(user_dirs)}] {user_dir.name}: {count} chunks")
+        if args.delete_old and not args.dry_run:
+            shutil.rmtree(user_dir)
+
+    action = "would copy" if args.dry_run else "copied"
+    print(f"Migration done ✔: {action} {total} chunks from {len(user_dirs)} users")
+    if not args.dry_run:
+        print("Set USER_STORE_LAYOUT=shared to serve from the shared collection")
+
+
+if __name__ == "__main__":
+    main()
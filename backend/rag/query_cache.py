@@ -0,0 +1,154 @@
+# backend/rag/query_cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from backend.config import settings
+from backend.metrics import span
+from backend.rag.embeddings import get_embeddings
+from backend.rag.embed_batcher import get_query_batcher
+from backend.rag.store_cache import collection_version
+
+
+# -----------------------------
+# TTL + LRU cache
+# -----------------------------
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    Keeps hit / miss counters for monitoring.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate):
+        """Removes every entry whose key matches `predicate(key)`."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+# query text -> embedding vector
+query_embedding_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+
+# (scope, user_id, collection version, query, k) -> (document, distance) pairs
+retrieval_cache = TTLCache(settings.RETRIEVAL_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+
+
+# -----------------------------
+# Function: Embed Query (cached)
+# -----------------------------
+def embed_query(query: str):
+    """
+    Returns the embedding for `query`, computing it at most once per TTL.
+    Both the global and user searches reuse this single vector. With
+    QUERY_EMBED_BATCHING, misses from concurrent requests share one
+    batched forward pass.
+    """
+    vector = query_embedding_cache.get(query)
+    if vector is None:
+        with span("embed_query"):
+            if settings.QUERY_EMBED_BATCHING:
+                vector = get_query_batcher()(query)
+            else:
+                vector = get_embeddings().embed_query(query)
+        query_embedding_cache.set(query, vector)
+    return vector
+
+
+async def aembed_query(query: str):
+    """
+    Same as `embed_query`, but awaits the embedding so the event loop and
+    the retrieval pool stay free while it is computed. With
+    QUERY_EMBED_BATCHING the request only waits on the batcher's future,
+    so a batch can hold every concurrent request, not one per free thread.
+    """
+    vector = query_embedding_cache.get(query)
+    if vector is None:
+        with span("embed_query"):
+            if settings.QUERY_EMBED_BATCHING:
+                vector = await asyncio.wrap_future(get_query_batcher().submit(query))
+            else:
+                vector = await asyncio.to_thread(get_embeddings().embed_query, query)
+        query_embedding_cache.set(query, vector)
+    return vector
+
+
+# -----------------------------
+# Function: Cached Search
+# -----------------------------
+def cached_search(backend, query: str, vector, k: int, scope: str, user_id: str = None, filter: dict = None):
+    """
+    Runs a vector search on a retrieval backend, reusing results for the same query while
+    the collection version is unchanged (any ingest bumps the version).
+    `filter` is a Chroma metadata filter (e.g. user_id in a shared collection).
+
+    Returns:
+        list of (document, distance) pairs, closest first
+    """
+    key = (scope, user_id, collection_version(scope, user_id), query, k)
+    results = retrieval_cache.get(key)
+    if results is None:
+        with span(f"vector_search_{scope}"):
+            results = backend.search(vector, k=k, filter=filter)
+        retrieval_cache.set(key, results)
+    return results
+
+
+def invalidate_retrieval_cache(scope: str, user_id: str = None):
+    """Frees cached results for one store after its contents change."""
+    retrieval_cache.discard_where(lambda key: key[0] == scope and key[1] == user_id)
+
+
+def query_cache_stats():
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+    }
@@ -0,0 +1,114 @@
+# backend/rag/rerank.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from backend.config import settings
+from backend.metrics import span
+from backend.rag.query_cache import TTLCache
+
+# -----------------------------
+# Cross-encoder reranker (optional, CPU)
+# -----------------------------
+_lock = threading.Lock()
+_model = None
+
+# (query, source, chunk text) -> relevance score
+score_cache = TTLCache(settings.RETRIEVAL_CACHE_SIZE * 10, settings.QUERY_CACHE_TTL)
+
+# One scoring job runs at a time and at most RERANK_MAX_PENDING are queued
+# or running; beyond that a request skips reranking instead of piling up
+# behind the model. A job that misses the latency cap is cancelled if it
+# has not started; a running one finishes and fills the cache for the next
+# identical query
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+_slots = threading.BoundedSemaphore(max(1, settings.RERANK_MAX_PENDING))
+
+_stats = {"reranked": 0, "fallbacks": 0, "busy": 0, "errors": 0}
+
+
+def get_reranker():
+    """Loads the cross-encoder once per process (thread-safe)."""
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import CrossEncoder
+
+                start = time.perf_counter()
+                _model = CrossEncoder(settings.RERANK_MODEL, device="cpu")
+                print(f"Reranker loaded ✔: {settings.RERANK_MODEL} in {time.perf_counter() - start:.2f}s")
+    return _model
+
+
+def _key(query, doc):
+    return query, doc.metadata.get("source"), doc.page_content
+
+
+def _score_batch(query, docs):
+    """Scores every pair in one batched forward pass and caches the result."""
+    pairs = [(query, doc.page_content) for doc in docs]
+    with span("rerank_score"):
+        scores = get_reranker().predict(pairs, batch_size=len(pairs))
+    for doc, score in zip(docs, scores):
+        score_cache.set(_key(query, doc), float(score))
+
+
+# -----------------------------
+# Function: Rerank
+# -----------------------------
+def rerank(query: str, scored_chunks, top_n: int = None, timeout: float = None):
+    """
+    Reorders retrieved chunks by cross-encoder relevance and keeps `top_n`.
+    Only chunks without a cached score are sent to the model. If scoring
+    takes longer than `timeout`, the reranker is busy, or scoring fails
+    (model missing, load error), the original (retrieval) order is kept.
+
+    Args:
+        scored_chunks: list of (document, retrieval score), best first
+    Returns:
+        tuple: (list of (document, score) best first, True if reranked)
+    """
+    top_n = top_n or settings.RERANK_TOP_N
+    timeout = settings.RERANK_TIMEOUT if timeout is None else timeout
+    if not scored_chunks:
+        return [], False
+
+    docs = [doc for doc, _ in scored_chunks]
+    missing = [doc for doc in docs if score_cache.get(_key(query, doc)) is None]
+
+    if missing:
+        if not _slots.acquire(blocking=False):
+            _stats["busy"] += 1
+            _stats["fallbacks"] += 1
+            return scored_chunks[:top_n], False
+        try:
+            future = _executor.submit(_score_batch, query, missing)
+        except BaseException:
+            _slots.release()
+            raise
+        future.add_done_callback(lambda _: _slots.release())
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            _stats["fallbacks"] += 1
+            return scored_chunks[:top_n], False
+        except Exception as e:
+            print(f"Rerank failed, keeping retrieval order: {e!r}")
+            _stats["errors"] += 1
+            _stats["fallbacks"] += 1
+            return scored_chunks[:top_n], False
+
+    scores = [score_cache.get(_key(query, doc)) for doc in docs]
+    if any(score is None for score in scores):  # evicted meanwhile
+        _stats["fallbacks"] += 1
+        return scored_chunks[:top_n], False
+
+    _stats["reranked"] += 1
+    ranked = sorted(zip(docs, scores), key=lambda pair: pair[1], reverse=True)
+    return ranked[:top_n], True
+
+
+def rerank_stats():
+    return {**_stats, "score_cache": score_cache.stats()}
@@ -0,0 +1,152 @@
+# backend/rag/response_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.config import settings
+
+
+# -----------------------------
+# Semantic response cache
+# -----------------------------
+class SemanticCache:
+    """
+    Thread-safe LRU + TTL cache of LLM answers looked up by query similarity.
+
+    Entries live in buckets keyed by (scope, context fingerprint): a query can
+    only reuse an answer generated from exactly the same retrieved chunks and
+    visible to the same users. Inside a bucket the closest cached query wins
+    if its cosine similarity is at least `threshold`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, threshold: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry id -> (bucket, unit vector, value, expires_at)
+        self._buckets = {}             # bucket -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, entry_id):
+        bucket = self._entries.pop(entry_id)[0]
+        ids = self._buckets[bucket]
+        ids.discard(entry_id)
+        if not ids:
+            del self._buckets[bucket]
+
+    def get(self, vector, scope, fingerprint):
+        """Returns the cached value for the most similar query, or None."""
+        query = self._unit(vector)
+        bucket = (scope, fingerprint)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id in list(self._buckets.get(bucket, ())):
+                _, cached, _, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    self._drop(entry_id)
+                    continue
+                sim = float(np.dot(query, cached))
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def set(self, vector, scope, fingerprint, value):
+        bucket = (scope, fingerprint)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (bucket, self._unit(vector), value, time.monotonic() + self.ttl)
+            self._buckets.setdefault(bucket, set()).add(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# (scope, context fingerprint) + query embedding -> {"response", "sources"}
+response_cache = SemanticCache(
+    settings.RESPONSE_CACHE_SIZE,
+    settings.RESPONSE_CACHE_TTL,
+    settings.RESPONSE_CACHE_THRESHOLD,
+)
+
+
+# -----------------------------
+# Cache keys
+# -----------------------------
+def context_fingerprint(docs):
+    """Order-sensitive hash of the retrieved chunks (source + content)."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update((doc.metadata.get("source") or "").encode())
+        digest.update(b"\0")
+        digest.update(hashlib.sha256(doc.page_content.encode()).digest())
+    return digest.hexdigest()
+
+
+def cache_scope(docs, user_id: str):
+    """
+    Answers built only from global docs can be shared by every user;
+    anything that saw a user's own documents stays private to them.
+    """
+    if any(doc.metadata.get("scope") == "user" for doc in docs):
+        return f"user/{user_id}"
+    return "global"
+
+
+def shared_cache_key(vector, docs):
+    """
+    Cache key for a turn whose answer every user may reuse, or None.
+    Only turns answered from global chunks alone qualify, and the caller
+    must build their prompt without history or summary: the answer then
+    depends on nothing but the question and the chunks, so users with
+    different conversations share it.
+
+    Returns:
+        tuple: (query vector, scope, context fingerprint) or None
+    """
+    if cache_scope(docs, None) != "global":
+        return None
+    return vector, "global", context_fingerprint(docs)
+
+
+def response_cache_stats():
+    return response_cache.stats()
@@ -1,5 +1,15 @@
-from backend.rag.ingest_user import get_user_vectorstore  # user docs
-from backend.rag.ingest_global import get_global_vectorstore  # global docs
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from backend.config import settings
+from backend.metrics import span, chunks_retrieved_total
+from backend.rag.ingest_user import user_filter
+from backend.rag.backends.factory import (
+    get_global_backend, get_user_backend, get_global_lexical, get_user_lexical
+)
+from backend.rag.query_cache import aembed_query, embed_query, cached_search
 
 # ----------------------------
 # System Prompt / Rules
@@ -9,6 +19,192 @@ Answer questions concisely and clearly.
 Always use information from the provided documents.
 If the answer is not found in the documents, respond politely that you do not know."""
 
+# Shared pool so global and user scopes are searched at the same time.
+# At most RETRIEVAL_MAX_PENDING searches per scope are queued or running;
+# beyond that a request skips the scope instead of queueing behind
+# searches it would time out on anyway. A search that misses its budget
+# is cancelled if it has not started; a running one finishes and fills
+# the cache for the next turn
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RETRIEVAL_WORKERS,
+    thread_name_prefix="retrieval"
+)
+_slots = {
+    scope: threading.BoundedSemaphore(max(1, settings.RETRIEVAL_MAX_PENDING))
+    for scope in ("global", "user")
+}
+_stats = {"timeouts": 0, "busy": 0}
+
+
+# ----------------------------
+# Hybrid fusion
+# ----------------------------
+def _chunk_key(doc):
+    return doc.metadata.get("source"), doc.page_content
+
+
+def _hybrid_weights(scope: str):
+    """(vector weight, lexical weight) for a scope."""
+    raw = settings.HYBRID_WEIGHTS_GLOBAL if scope == "global" else settings.HYBRID_WEIGHTS_USER
+    vector_weight, lexical_weight = (float(w) for w in raw.split(","))
+    return vector_weight, lexical_weight
+
+
+def fuse_results(vector_results, lexical_results, weights, k: int):
+    """
+    Weighted reciprocal rank fusion of two best-first result lists.
+
+    Returns:
+        list of (document, fused score) pairs, highest score first
+    """
+    fused, docs = {}, {}
+    for results, weight in zip((vector_results, lexical_results), weights):
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = _chunk_key(doc)
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight / (settings.RRF_K + rank)
+
+    best = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [(docs[key], fused[key]) for key in best]
+
+
+# ----------------------------
+# Per-scope searches (run on the pool)
+# ----------------------------
+def _search_global(user_query, query_vector, k):
+    global_backend = get_global_backend()  # global docs
+    results = cached_search(global_backend, user_query, query_vector, k, scope="global")
+    if settings.HYBRID_SEARCH:
+        with span("lexical_search_global"):
+            index = get_global_lexical()
+            lexical = index.search(user_query, k) if index is not None else []
+        results = fuse_results(results, lexical, _hybrid_weights("global"), k)
+    return results
+
+
+def _search_user(user_query, query_vector, k, user_id):
+    user_backend = get_user_backend(user_id)  # user docs
+    if not user_backend:  # user may not have uploaded anything
+        return []
+    filter = user_filter(user_id)
+    results = cached_search(
+        user_backend, user_query, query_vector, k,
+        scope="user", user_id=user_id, filter=filter
+    )
+    if settings.HYBRID_SEARCH:
+        with span("lexical_search_user"):
+            index = get_user_lexical(user_id)
+            lexical = index.search(user_query, k, filter=filter) if index is not None else []
+        results = fuse_results(results, lexical, _hybrid_weights("user"), k)
+    return results
+
+
+# ----------------------------
+# Retrieve Chunks Function
+# ----------------------------
+def _submit(scope, fn, *args):
+    """Submits a scope's search if it has a free slot, else returns None."""
+    slots = _slots[scope]
+    if not slots.acquire(blocking=False):
+        _stats["busy"] += 1
+        print(f"Retrieval skipped for {scope} docs: {settings.RETRIEVAL_MAX_PENDING} searches pending")
+        return None
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _submit_searches(user_query, query_vector, user_id, k_global, k_user):
+    """Starts the per-scope searches on the pool: list of (scope, timeout, future)."""
+    tasks = [(
+        "global",
+        settings.RETRIEVAL_TIMEOUT_GLOBAL,
+        _submit("global", _search_global, user_query, query_vector, k_global)
+    )]
+    if user_id:
+        tasks.append((
+            "user",
+            settings.RETRIEVAL_TIMEOUT_USER,
+            _submit("user", _search_user, user_query, query_vector, k_user, user_id)
+        ))
+    return [task for task in tasks if task[2] is not None]
+
+
+def _timed_out(scope, timeout, future):
+    """Drops a search that missed its budget; cancels it if still queued."""
+    future.cancel()
+    _stats["timeouts"] += 1
+    print(f"Retrieval timed out for {scope} docs after {timeout}s")
+
+
+def _merge(results_by_scope):
+    """Tags each hit with its scope and sorts all hits best first."""
+    scored = []
+    for scope, results in results_by_scope:
+        chunks_retrieved_total.inc(len(results), scope=scope)
+        for doc, score in results:
+            doc.metadata.setdefault("scope", scope)
+            scored.append((doc, score))
+
+    # Fused scores: higher is better. Distances: lower is better
+    # (both scopes use the same embedding space).
+    scored.sort(key=lambda pair: pair[1], reverse=settings.HYBRID_SEARCH)
+    return scored
+
+
+def retrieve_chunks(user_query: str, user_id: str = None, k_global=3, k_user=3):
+    """
+    Searches the global and user stores concurrently and merges the hits
+    by score. A scope that misses its latency budget
+    (RETRIEVAL_TIMEOUT_GLOBAL / RETRIEVAL_TIMEOUT_USER), or already has
+    RETRIEVAL_MAX_PENDING searches in flight, is skipped.
+    With HYBRID_SEARCH each scope fuses BM25 and vector hits first.
+
+    Returns:
+        list of (document, score) pairs, best first: the fused RRF score
+        with HYBRID_SEARCH, otherwise the vector distance. Each document
+        has metadata["scope"] set to "global" or "user"
+    """
+    # Embed the query once; both searches reuse the same vector
+    query_vector = embed_query(user_query)
+    start = time.perf_counter()
+
+    results_by_scope = []
+    for scope, timeout, future in _submit_searches(user_query, query_vector, user_id, k_global, k_user):
+        remaining = max(0.0, timeout - (time.perf_counter() - start))
+        try:
+            results_by_scope.append((scope, future.result(timeout=remaining)))
+        except FutureTimeout:
+            _timed_out(scope, timeout, future)
+
+    return _merge(results_by_scope)
+
+
+async def aretrieve_chunks(user_query: str, user_id: str = None, k_global=3, k_user=3):
+    """
+    Same as `retrieve_chunks`, but awaits the embedding and the searches
+    instead of blocking the calling thread, so it can run on the event loop.
+    """
+    query_vector = await aembed_query(user_query)
+    start = time.perf_counter()
+
+    results_by_scope = []
+    for scope, timeout, future in _submit_searches(user_query, query_vector, user_id, k_global, k_user):
+        remaining = max(0.0, timeout - (time.perf_counter() - start))
+        try:
+            # shield: a timeout stops waiting, not the search itself
+            results = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), remaining)
+            results_by_scope.append((scope, results))
+        except asyncio.TimeoutError:
+            _timed_out(scope, timeout, future)
+
+    return _merge(results_by_scope)
+
+
 # ----------------------------
 # Retrieve Context Function
 # ----------------------------
@@ -17,7 +213,7 @@ def retrieve_context(user_query: str, user_id: str = None, k_global=3, k_user=3)
     Retrieves context for a query combining:
     1. Global documents (shared PDFs)
     2. User-specific documents (uploaded by that user)
-    3. Returns system prompt + combined context
+    3. Returns system prompt + combined context, best-scoring chunks first
 
     Args:
         user_query: string
@@ -33,26 +229,24 @@ def retrieve_context(user_query: str, user_id: str = None, k_global=3, k_user=3)
     combined_context = SYSTEM_PROMPT + "\n\n"
     sources = []
 
-    # ----------------------------
-    # 1️⃣ Global documents
-    # ----------------------------
-    global_db = get_global_vectorstore()
-    global_docs = global_db.similarity_search(user_query, k=k_global)
-    if global_docs:
-        global_text = "\n\n".join([doc.page_content for doc in global_docs])
-        combined_context += "Global Docs:\n" + global_text + "\n\n"
-        sources.extend([doc.metadata.get("source", "global") for doc in global_docs])
-
-    # ----------------------------
-    # 2️⃣ User-specific documents
-    # ----------------------------
-    if user_id:
-        user_db = get_user_vectorstore(user_id)
-        if user_db:  # user may not have uploaded anything
-            user_docs = user_db.similarity_search(user_query, k=k_user)
-            if user_docs:
-                user_text = "\n\n".join([doc.page_content for doc in user_docs])
-                combined_context += f"User Docs ({user_id}):\n" + user_text + "\n\n"
-                sources.extend([doc.metadata.get("source", f"user_{user_id}") for doc in user_docs])
+    for doc, _ in retrieve_chunks(user_query, user_id, k_global, k_user):
+        combined_context += format_chunk(doc, user_id) + "\n\n"
+        sources.append(chunk_source(doc, user_id))
 
     return combined_context, sources
+
+
+def chunk_source(doc, user_id: str = None):
+    """Citation label for a retrieved chunk."""
+    if doc.metadata.get("scope") == "user":
+        return doc.metadata.get("source", f"user_{user_id}")
+    return doc.metadata.get("source", "global")
+
+
+def format_chunk(doc, user_id: str = None):
+    """Chunk text prefixed with where it came from."""
+    if doc.metadata.get("scope") == "user":
+        label = f"User Docs ({user_id})"
+    else:
+        label = "Global Docs"
+    return f"[{label}]\n{doc.page_content}"
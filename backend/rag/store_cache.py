@@ -0,0 +1,182 @@
+# backend/rag/store_cache.py
+import threading
+import time
+from collections import OrderedDict, deque
+
+from backend.config import settings
+
+# -----------------------------
+# Vector store handle cache
+# -----------------------------
+# Opening a persistent Chroma client (and counting its collection) on every
+# chat turn dominates retrieval latency, so handles are kept open here.
+# Keys are (scope, user_id); the global store has user_id=None and is never
+# evicted, per-user stores are evicted least-recently-used.
+#
+# The cache and its invalidation are per process: an ingest run by one
+# uvicorn worker (or a separate CLI) does not drop the handles cached by
+# the others, which keep serving the old contents until they restart.
+# Run ingestion in the serving process, or a single worker, when uploads
+# must be visible at once.
+#
+# Dropping a handle is not enough to free it: chromadb keeps one System
+# (SQLite connections, HNSW segments) per path alive until every client
+# on it is closed. Evicted, invalidated and discarded handles are closed
+# STORE_CLOSE_GRACE seconds later, so searches still holding them finish.
+_MISSING = object()
+
+_lock = threading.Lock()
+_global_handles = {}
+_user_handles = OrderedDict()
+_versions = {}
+_generation = 0   # bumped by every invalidation; fences in-flight builds
+_closing = deque()  # (close at, handle), in retirement order
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "closed": 0}
+
+
+# -----------------------------
+# Closing dropped handles
+# -----------------------------
+def close_store(handle):
+    """Closes the Chroma client behind a handle (or a backend wrapping one)."""
+    db = getattr(handle, "db", handle)  # ChromaBackend keeps its store as .db
+    close = getattr(getattr(db, "_client", None), "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception as e:
+        print(f"Closing vector store failed: {e}")
+
+
+def _retire(handles):
+    """Queues dropped handles for closing once the grace period is over (hold _lock)."""
+    deadline = time.monotonic() + settings.STORE_CLOSE_GRACE
+    for handle in handles:
+        if handle is not None:
+            _closing.append((deadline, handle))
+
+
+def _close_retired():
+    """Closes every retired handle whose grace period is over."""
+    now = time.monotonic()
+    with _lock:
+        if not _closing:
+            return
+        due = [handle for deadline, handle in _closing if deadline <= now]
+        waiting = [(deadline, handle) for deadline, handle in _closing if deadline > now]
+        _closing.clear()
+        _closing.extend(waiting)
+        _stats["closed"] += len(due)
+    for handle in due:
+        close_store(handle)
+
+
+# -----------------------------
+# Function: Get Cached Store
+# -----------------------------
+def get_cached_store(scope: str, user_id: str = None, factory=None):
+    """
+    Returns the cached handle for (scope, user_id), building it with
+    `factory()` on a miss. A factory result of None (e.g. an empty user
+    store) is cached too, until the store is invalidated. A build that
+    overlaps an invalidation may have read the old contents, so it is
+    returned to its caller but not cached.
+
+    Args:
+        scope: "global" or "user"
+        user_id: owner of the store, None for global
+        factory: zero-arg callable that opens the store
+    """
+    key = (scope, user_id)
+    handles = _global_handles if user_id is None else _user_handles
+    _close_retired()
+
+    with _lock:
+        handle = handles.get(key, _MISSING)
+        if handle is not _MISSING:
+            if user_id is not None:
+                _user_handles.move_to_end(key)
+            _stats["hits"] += 1
+            return handle
+        _stats["misses"] += 1
+        generation = _generation
+
+    # Build outside the lock so one slow open doesn't block other users
+    handle = factory()
+
+    with _lock:
+        if generation != _generation:
+            _retire([handle])  # the caller may use it for this one request
+            return handle
+        # Another thread may have built it meanwhile; keep the first one
+        existing = handles.get(key, _MISSING)
+        if existing is not _MISSING:
+            _retire([handle])
+            return existing
+
+        handles[key] = handle
+        if user_id is not None:
+            while len(_user_handles) > settings.MAX_OPEN_USER_STORES:
+                # A user's store and the handles derived from it go together
+                _, lru_user = next(iter(_user_handles))
+                evicted = [k for k in _user_handles if k[1] == lru_user]
+                _retire([_user_handles.pop(k) for k in evicted])
+                _stats["evictions"] += 1
+
+    _close_retired()
+    return handle
+
+
+# -----------------------------
+# Function: Invalidate Store
+# -----------------------------
+def invalidate_store(scope: str, user_id: str = None):
+    """
+    Drops the cached handle so the next lookup reopens the store, and bumps
+    the collection version so results cached for the old contents are stale.
+    Handles derived from the store (cached as "<scope>/<name>", e.g. a
+    retrieval backend's index) are dropped too.
+    """
+    global _generation
+    key = (scope, user_id)
+    with _lock:
+        _generation += 1
+        _versions[key] = _versions.get(key, 0) + 1
+        handles = _global_handles if user_id is None else _user_handles
+        stale = [
+            k for k in handles
+            if k[1] == user_id and (k[0] == scope or k[0].startswith(scope + "/"))
+        ]
+        _retire([handles.pop(k) for k in stale])
+        if stale:
+            _stats["invalidations"] += 1
+    _close_retired()
+
+
+def collection_version(scope: str, user_id: str = None) -> int:
+    """Counter bumped every time documents are added to the store."""
+    with _lock:
+        return _versions.get((scope, user_id), 0)
+
+
+def clear_store_cache():
+    """Drops every cached handle."""
+    global _generation
+    with _lock:
+        _generation += 1
+        _retire(list(_global_handles.values()) + list(_user_handles.values()))
+        _global_handles.clear()
+        _user_handles.clear()
+    _close_retired()
+
+
+def store_cache_stats():
+    """Hit / miss / eviction counters and the number of open handles."""
+    with _lock:
+        return {
+            **_stats,
+            "open_user_stores": len(_user_handles),
+            "closing": len(_closing),
+            "max_user_stores": settings.MAX_OPEN_USER_STORES,
+        }
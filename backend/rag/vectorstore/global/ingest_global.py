@@ -1,8 +1,8 @@
 from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from pathlib import Path
+from backend.rag.embeddings import get_embeddings
+from backend.rag.chunking import split_documents
 
 DOCS_PATH = Path(__file__).parent / "docs"
 VECTORSTORE_PATH = Path(__file__).parent / "vectorstore" / "global"
@@ -14,15 +14,11 @@ for pdf_file in DOCS_PATH.glob("*.pdf"):
     docs = loader.load()
     documents.extend(docs)
 
-# 2️⃣ Split into chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=50
-)
-docs_split = text_splitter.split_documents(documents)
+# 2️⃣ Split into chunks (same settings as the ingest functions)
+docs_split = split_documents(documents)
 
 # 3️⃣ Embeddings
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+embeddings = get_embeddings()
 
 # 4️⃣ Create Chroma vectorstore
 VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
@@ -1,21 +1,19 @@
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from pathlib import Path
 
+from backend.rag.embeddings import get_embeddings
+
 # Path to your Chroma DB folder
 CHROMA_PATH = Path(__file__).parent / "vectorstore"
 
-def get_vectorstore():
+def get_vectorstore(persist_dir=None):
     """
-    Returns a Chroma vector store instance with embeddings
+    Returns a Chroma vector store instance with embeddings.
+    Uses the shared embedding model instead of loading a new one per call.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2"
-    )
-
     db = Chroma(
-        persist_directory=str(CHROMA_PATH),
-        embedding_function=embeddings
+        persist_directory=str(persist_dir or CHROMA_PATH),
+        embedding_function=get_embeddings()
     )
 
     return db
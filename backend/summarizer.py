@@ -0,0 +1,180 @@
+# ==============================
+# summarizer.py - Rolling conversation summaries
+# ==============================
+
+import queue
+import threading
+import time
+
+from backend.config import settings
+from backend import crud
+from backend.metrics import span
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+Update the summary with the new messages below. Keep facts about the user,
+their goals, decisions made and open questions. Drop small talk.
+Reply with the updated summary only, in at most {max_words} words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+"""
+
+_queue = queue.Queue()
+_pending = set()   # user ids queued or being summarized
+_failures = {}     # user id -> (consecutive failures, monotonic time of next try)
+_worker = None
+_lock = threading.Lock()
+_client = None
+
+
+# -----------------------------
+# LLM call
+# -----------------------------
+def _get_client():
+    global _client
+    if _client is None:
+        from groq import Groq
+
+        # Off the request path: plain SDK retries are enough here
+        _client = Groq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.LLM_BASE_URL or None,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    return _client
+
+
+def complete(prompt: str) -> str:
+    """One non-streaming completion used to write the summary."""
+    with span("summarize"):
+        response = _get_client().chat.completions.create(
+            model=settings.MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=settings.SUMMARY_MAX_TOKENS,
+        )
+    return response.choices[0].message.content.strip()
+
+
+# -----------------------------
+# Function: Summarize User
+# -----------------------------
+def _due(unsummarized: int) -> int:
+    """How many of the oldest unsummarized messages to fold now (or 0)."""
+    older = unsummarized - settings.SUMMARY_KEEP_MESSAGES
+    if older < 2 * settings.SUMMARY_EVERY_TURNS:
+        return 0
+    return min(older, settings.SUMMARY_MAX_MESSAGES)
+
+
+def summarize_user(session_factory, user_id: int):
+    """
+    Folds the user's unsummarized messages, except the SUMMARY_KEEP_MESSAGES
+    most recent ones, into their stored summary. A long backlog is folded
+    SUMMARY_MAX_MESSAGES at a time, oldest first, so one prompt stays small;
+    later turns schedule the rest.
+
+    Returns:
+        bool: True if the summary was updated
+    """
+    db = session_factory()
+    try:
+        summary = crud.get_summary(db, user_id)
+        last_id = summary.last_message_id if summary else 0
+        count = _due(crud.count_messages_after(db, user_id, last_id))
+        if not count:
+            return False
+        older = crud.get_unsummarized_messages(db, user_id, last_id, limit=count)
+
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(settings.SUMMARY_MAX_TOKENS * 0.75),
+            summary=summary.content if summary and summary.content else "(none yet)",
+            messages="\n".join(f"{m.role}: {m.content}" for m in older),
+        )
+        crud.save_summary(db, user_id, complete(prompt), older[-1].id)
+        return True
+    finally:
+        db.close()
+
+
+# -----------------------------
+# Background worker
+# -----------------------------
+def _run():
+    while True:
+        item = _queue.get()
+        try:
+            if item is None:  # shutdown signal
+                return
+            session_factory, user_id = item
+            try:
+                summarize_user(session_factory, user_id)
+            except Exception as e:
+                delay = _record_failure(user_id)
+                print(f"Summary for user {user_id} failed, retrying in {delay:.0f}s: {e}")
+            else:
+                with _lock:
+                    _failures.pop(user_id, None)
+            finally:
+                with _lock:
+                    _pending.discard(user_id)
+        finally:
+            _queue.task_done()
+
+
+def _record_failure(user_id: int) -> float:
+    """Backs the user off exponentially; returns the delay in seconds."""
+    with _lock:
+        failures = _failures.get(user_id, (0, 0.0))[0] + 1
+        delay = min(settings.SUMMARY_RETRY_SECONDS * 2 ** (failures - 1), settings.SUMMARY_RETRY_MAX_SECONDS)
+        _failures[user_id] = (failures, time.monotonic() + delay)
+    return delay
+
+
+def start_worker():
+    """Starts the single summary worker (idempotent)."""
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="summarizer", daemon=True)
+            _worker.start()
+
+
+def stop_worker(timeout: float = 5.0):
+    """Lets the current summary finish and stops the worker."""
+    global _worker
+    with _lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        _queue.put(None)
+        worker.join(timeout)
+
+
+def schedule_summary(session_factory, user_id: int, unsummarized: int):
+    """
+    Queues a summary update off the request path once enough turns have
+    piled up. `unsummarized` is how many messages are newer than the
+    current summary; at most one update per user is queued at a time, and
+    none while the user is backing off after a failed update.
+
+    Returns:
+        bool: True if an update was queued
+    """
+    if not settings.SUMMARY_ENABLED:
+        return False
+    threshold = settings.SUMMARY_KEEP_MESSAGES + 2 * settings.SUMMARY_EVERY_TURNS
+    if unsummarized < threshold:
+        return False
+
+    start_worker()
+    with _lock:
+        if user_id in _pending:
+            return False
+        if user_id in _failures and time.monotonic() < _failures[user_id][1]:
+            return False
+        _pending.add(user_id)
+    _queue.put((session_factory, user_id))
+    return True
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("greenlet")
+pytest.importorskip("aiosqlite")
+
+from backend import async_crud
+from backend.database import Base, make_async_engine
+
+
+def _run(test):
+    async def main():
+        engine = make_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                await test(db)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def test_save_turn_and_recent_history():
+    async def test(db):
+        user = await async_crud.save_turn(db, "g1", "a@b.c", "A", "hi", "hello")
+        await async_crud.save_turn(db, "g1", "a@b.c", "A", "again")
+
+        recent = await async_crud.get_recent_messages(db, user.id, 10)
+        assert [m.content for m in recent] == ["hi", "hello", "again"]
+        assert await async_crud.count_messages_after(db, user.id, recent[0].id) == 2
+
+    _run(test)
+
+
+def test_messages_page_walks_back_with_cursor():
+    async def test(db):
+        user = await async_crud.get_or_create_user(db, "g1", "a@b.c", "A")
+        for i in range(5):
+            await async_crud.save_message(db, user.id, "user", f"m{i}")
+
+        page, cursor = await async_crud.get_messages_page(db, user.id, limit=3)
+        assert [m.content for m in page] == ["m2", "m3", "m4"]
+        page, cursor = await async_crud.get_messages_page(db, user.id, limit=3, before_id=cursor)
+        assert [m.content for m in page] == ["m0", "m1"]
+        assert cursor is None
+
+    _run(test)
@@ -0,0 +1,66 @@
+import pytest
+
+from backend.config import settings
+from backend.rag import ingest_user, lexical, store_cache
+from backend.rag.backends import factory
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    monkeypatch.setattr(settings, "USER_STORE_LAYOUT", "shared")
+    monkeypatch.setattr(settings, "RETRIEVAL_BACKEND", "numpy")
+    monkeypatch.setattr(settings, "SHARED_INDEX_STALE_USERS", 2)
+    monkeypatch.setattr(factory, "get_user_vectorstore", lambda user_id: object())
+    monkeypatch.setattr(factory, "get_shared_user_vectorstore", lambda: object())
+    opened = []
+
+    def open_backend(db, store_dir, name):
+        opened.append(name)
+        return f"{name} #{len(opened)}"
+
+    monkeypatch.setattr(factory, "open_backend", open_backend)
+    store_cache.clear_store_cache()
+    ingest_user._stale_shared_users.clear()
+    yield opened
+    store_cache.clear_store_cache()
+    ingest_user._stale_shared_users.clear()
+
+
+def test_upload_routes_only_the_uploader_to_chroma(shared):
+    assert factory.get_user_backend("u1") == "numpy #1"
+
+    ingest_user._shared_collection_changed("u1")
+    assert factory.get_user_backend("u1") == "chroma #2"
+    assert factory.get_user_backend("u2") == "numpy #1"  # shared index kept
+    assert shared == ["numpy", "chroma"]
+
+
+def test_shared_index_is_rebuilt_once_enough_users_uploaded(shared):
+    factory.get_user_backend("u1")
+    ingest_user._shared_collection_changed("u1")
+    ingest_user._shared_collection_changed("u2")
+
+    assert not ingest_user.shared_index_stale("u1")
+    assert factory.get_user_backend("u1") == "numpy #2"
+    assert factory.get_user_backend("u2") == "numpy #2"
+
+
+def test_missing_bm25_index_is_built_off_the_request_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "USER_STORE_LAYOUT", "per_user")
+    monkeypatch.setattr(factory, "get_user_vectorstore", lambda user_id: object())
+    monkeypatch.setattr(factory, "user_store_dir", lambda user_id: tmp_path / user_id)
+    monkeypatch.setattr(
+        factory, "collection_bootstrap",
+        lambda db, where=None: lambda: (["a"], ["legacy chunk"], [{}])
+    )
+    store_cache.clear_store_cache()
+
+    assert factory.get_user_lexical("u1") is None  # searched by vector only for now
+    lexical._bootstrap_executor.submit(lambda: None).result(5)  # wait for the build
+
+    index = factory.get_user_lexical("u1")
+    assert len(index) == 1
+    assert factory.get_user_lexical("u1") is index  # cached with the user's stores
+    store_cache.invalidate_store("user", "u1")
+    assert factory.get_user_lexical("u1") is not index
+    store_cache.clear_store_cache()
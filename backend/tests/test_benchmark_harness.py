@@ -0,0 +1,67 @@
+import asyncio
+
+from groq import AsyncGroq, Groq
+
+from backend.benchmarks.corpus import generate_corpus, questions
+from backend.benchmarks.e2e_benchmark import bench_env, compare, percentile, summarize
+from backend.benchmarks.fake_groq import FakeLLM, start_server
+
+
+def test_percentile_and_summary():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([], 95) is None
+
+    summary = summarize([10.0, 20.0, 30.0], errors=1, wall_seconds=2.0)
+    assert summary["requests"] == 4
+    assert summary["error_rate"] == 0.25
+    assert summary["throughput_rps"] == 1.5
+    assert summary["p50_ms"] == 20.0
+
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"scenarios": {"chat": {"p95_ms": 100.0, "throughput_rps": 50.0}}}
+    current = {"scenarios": {"chat": {"p95_ms": 120.0, "throughput_rps": 60.0}}}
+
+    rows, regressions = compare(current, baseline, max_regression=10)
+
+    assert ("chat", "p95_ms", 100.0, 120.0, 20.0) in rows
+    assert [(s, m) for s, m, *_ in regressions] == [("chat", "p95_ms")]
+
+
+def test_bench_env_keeps_dotenv_out(tmp_path):
+    env = bench_env(tmp_path, "http://127.0.0.1:1", offline=True)
+    assert env["NO_DOTENV"] == "true"
+    assert env["DATABASE_URL"].endswith("bench.db")
+
+
+def test_corpus_is_deterministic(tmp_path):
+    first = generate_corpus(tmp_path / "a", docs=2, pages=3)
+    second = generate_corpus(tmp_path / "b", docs=2, pages=3)
+
+    assert [p.read_bytes() for p in first] == [p.read_bytes() for p in second]
+    assert first[0].read_bytes().startswith(b"%PDF-1.4")
+    assert first[0].read_bytes().count(b"/Type /Page ") == 3
+    assert questions(5) == questions(5)
+
+
+def test_fake_groq_serves_sdk_clients():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=5)
+    server, url = start_server(llm)
+    try:
+        messages = [{"role": "user", "content": "hi"}]
+        reply = Groq(api_key="fake", base_url=url).chat.completions.create(
+            model="m", messages=messages
+        ).choices[0].message.content
+
+        async def stream():
+            client = AsyncGroq(api_key="fake", base_url=url)
+            chunks = await client.chat.completions.create(model="m", messages=messages, stream=True)
+            return "".join([
+                c.choices[0].delta.content or "" async for c in chunks if c.choices
+            ])
+
+        assert asyncio.run(stream()) == reply
+        assert len(reply.split()) == 5
+        assert llm.calls == 2
+    finally:
+        server.shutdown()
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from backend.rag import bulk_ingest
+
+
+class FakeCollection:
+    def __init__(self):
+        self.writes = []
+        self.deleted = []
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        assert len(ids) == len(embeddings) == len(documents) == len(metadatas)
+        self.writes.append(len(ids))
+
+    def delete(self, ids=None, where=None):
+        self.deleted.append(ids or where)
+
+
+class FakeStore:
+    def __init__(self):
+        self._collection = FakeCollection()
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [[0.0] for _ in texts]
+
+
+def _chunks(prefix, n):
+    return [Document(page_content=f"{prefix}{i}", metadata={}) for i in range(n)]
+
+
+def _pdf(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(name.encode())
+    return str(path)
+
+
+def test_writer_batches_embeddings_and_writes(monkeypatch, tmp_path):
+    model = FakeEmbeddings()
+    monkeypatch.setattr(bulk_ingest, "get_embeddings", lambda: model)
+    db = FakeStore()
+    finished = []
+    a, b = _pdf(tmp_path, "a.pdf"), _pdf(tmp_path, "b.pdf")
+
+    writer = bulk_ingest._BatchWriter(db, {}, 4, 10, finished.append)
+    writer.add_file(a, _chunks("a", 6))
+    assert finished == []  # below write batch size, nothing written yet
+
+    writer.add_file(b, _chunks("b", 7))  # buffer hits 13 -> writes 10
+    assert finished == [a]
+
+    writer.flush()
+    assert finished == [a, b]
+    assert db._collection.writes == [10, 3]
+    assert model.batches == [4, 4, 2, 3]
+    assert writer.chunks_written == 13
+
+
+def test_writer_only_embeds_changed_chunks(monkeypatch, tmp_path):
+    model = FakeEmbeddings()
+    monkeypatch.setattr(bulk_ingest, "get_embeddings", lambda: model)
+    db = FakeStore()
+    manifest = {}
+    a = _pdf(tmp_path, "a.pdf")
+
+    writer = bulk_ingest._BatchWriter(db, manifest, 8, 8, lambda _: None)
+    writer.add_file(a, _chunks("x", 3))
+    writer.flush()
+    assert writer.chunks_written == 3
+
+    # Same file re-parsed: one chunk changed, one removed
+    writer = bulk_ingest._BatchWriter(db, manifest, 8, 8, lambda _: None)
+    writer.add_file(a, [Document(page_content="x0"), Document(page_content="new")])
+    writer.flush()
+
+    assert writer.chunks_written == 1
+    assert writer.chunks_skipped == 1
+    assert writer.chunks_deleted == 2
+    assert len(manifest[a]["chunk_ids"]) == 2
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    assert bulk_ingest._load_checkpoint(path) == set()
+
+    bulk_ingest._save_checkpoint(path, {"a.pdf", "b.pdf"})
+    assert bulk_ingest._load_checkpoint(path) == {"a.pdf", "b.pdf"}
+
+
+def test_checkpointer_saves_every_k_files_and_on_flush():
+    saves = []
+    checkpointer = bulk_ingest._Checkpointer(set(), lambda done: saves.append(sorted(done)), 2, 3600)
+
+    checkpointer.file_done("a.pdf")
+    assert saves == []
+    checkpointer.file_done("b.pdf")
+    checkpointer.file_done("c.pdf")
+    assert saves == [["a.pdf", "b.pdf"]]
+
+    checkpointer.flush()
+    assert saves[-1] == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_checkpointer_saves_after_interval():
+    saves = []
+    checkpointer = bulk_ingest._Checkpointer(set(), lambda done: saves.append(len(done)), 100, 0)
+    checkpointer.file_done("a.pdf")
+    assert saves == [1]
+
+
+def test_parse_window_bounds_files_in_flight(monkeypatch):
+    monkeypatch.setattr(bulk_ingest, "parse_pdf", lambda path, tag: (path, 1, [tag]))
+    submitted = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            submitted.append(args[0])
+            return super().submit(fn, *args)
+
+    consumed = []
+    with CountingPool(max_workers=2) as pool:
+        for pdf_path, _, _ in bulk_ingest.parse_in_window(pool, [f"{i}.pdf" for i in range(20)], 4, "t"):
+            consumed.append(pdf_path)
+            assert len(submitted) - len(consumed) <= 4
+
+    assert sorted(consumed) == sorted(submitted) == sorted(f"{i}.pdf" for i in range(20))
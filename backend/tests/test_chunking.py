@@ -0,0 +1,51 @@
+from langchain_core.documents import Document
+
+from backend.rag.chunking import split_documents, split_text
+
+TEXT = (
+    "The first sentence is here. A second sentence follows it! "
+    "Does a third one exist? Yes, and it ends the paragraph.\n\n"
+    "A new paragraph starts here and keeps going for a while."
+)
+
+
+def test_chunks_respect_size_and_sentence_boundaries():
+    spans = split_text(TEXT, chunk_size=70, chunk_overlap=0)
+
+    for start, end in spans:
+        assert end - start <= 70
+        assert TEXT[end - 1] in ".!?"
+
+    # Every sentence is covered by some chunk
+    covered = "".join(TEXT[s:e] for s, e in spans)
+    assert "Does a third one exist?" in covered
+    assert "keeps going for a while." in covered
+
+
+def test_overlap_repeats_trailing_sentence():
+    spans = split_text(TEXT, chunk_size=90, chunk_overlap=40)
+    first, second = TEXT[spans[0][0]:spans[0][1]], TEXT[spans[1][0]:spans[1][1]]
+
+    assert first.endswith("Does a third one exist?")
+    assert second.startswith("Does a third one exist?")
+
+
+def test_long_sentence_is_hard_split():
+    text = "word " * 100
+    spans = split_text(text, chunk_size=50, chunk_overlap=0)
+
+    assert len(spans) > 1
+    assert all(e - s <= 50 for s, e in spans)
+
+
+def test_documents_keep_page_metadata_and_offsets():
+    page = Document(page_content=TEXT, metadata={"source": "a.pdf", "page": 2})
+
+    chunks = split_documents([page], chunk_size=70, chunk_overlap=0)
+
+    assert chunks[0].metadata["page"] == 2
+    assert chunks[0].metadata["source"] == "a.pdf"
+    for i, chunk in enumerate(chunks):
+        meta = chunk.metadata
+        assert meta["chunk_index"] == i
+        assert TEXT[meta["start_offset"]:meta["end_offset"]] == chunk.page_content
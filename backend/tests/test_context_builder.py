@@ -0,0 +1,83 @@
+import pytest
+
+from backend import context_builder
+from backend.config import settings
+from backend.context_builder import build_prompt, count_tokens, estimate_tokens
+
+TEMPLATE = "Rules.\nCONTEXT:\n{context}\n"
+
+
+@pytest.fixture(autouse=True)
+def estimated_counts(monkeypatch):
+    """Budget tests below are written against the tokenizer-free estimate."""
+    monkeypatch.setattr(settings, "TOKENIZER", "")
+    monkeypatch.setattr(context_builder, "_tokenizer", None)
+
+
+def _turn(role, words):
+    return {"role": role, "content": " ".join(["word"] * words)}
+
+
+def test_count_tokens_is_roughly_four_chars_per_token():
+    assert count_tokens("") == 0
+    assert count_tokens("hi all") == 2
+    assert count_tokens("internationalization!") == 6
+
+
+def test_count_tokens_uses_the_bpe_tokenizer(monkeypatch, tmp_path):
+    tokenizers = pytest.importorskip("tokenizers")
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.BPE(unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    trainer = tokenizers.trainers.BpeTrainer(vocab_size=60, special_tokens=["[UNK]"])
+    tokenizer.train_from_iterator(["internationalization is long"] * 10, trainer)
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    monkeypatch.setattr(settings, "TOKENIZER", str(tmp_path / "tokenizer.json"))
+
+    text = "internationalization is long!"
+    assert count_tokens(text) == len(tokenizer.encode(text).ids)
+    assert count_tokens(text) != estimate_tokens(text)
+
+
+def test_unloadable_tokenizer_falls_back_to_the_estimate(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "TOKENIZER", str(tmp_path / "missing" / "tokenizer"))
+
+    assert count_tokens("internationalization!") == estimate_tokens("internationalization!") == 6
+
+
+def test_everything_fits_in_a_large_budget():
+    history = [_turn("user", 5), _turn("assistant", 5), _turn("user", 5)]
+    chunks = [("chunk one", "a.pdf"), ("chunk two", "b.pdf")]
+
+    messages, sources, usage = build_prompt(TEMPLATE, chunks, history, budget=1000)
+
+    assert sources == ["a.pdf", "b.pdf"]
+    assert "chunk one" in messages[0]["content"]
+    assert messages[1:] == history
+    assert usage["turns_used"] == 3
+    assert usage["total"] == usage["system"] + usage["chunks"] + usage["history"]
+
+
+def test_chunks_win_over_older_turns_when_budget_is_tight():
+    history = [_turn("user", 40), _turn("assistant", 40), _turn("user", 3)]
+    chunks = [(" ".join(["fact"] * 30), "a.pdf"), (" ".join(["huge"] * 500), "b.pdf")]
+
+    messages, sources, usage = build_prompt(TEMPLATE, chunks, history, budget=90)
+
+    # Oversized chunk is skipped, the older turns don't fit after the chunk
+    assert sources == ["a.pdf"]
+    assert usage["chunks_dropped"] == 1
+    assert messages[-1] == history[-1]
+    assert usage["turns_used"] == 1
+    assert usage["turns_dropped"] == 2
+    assert usage["total"] <= 90
+
+
+def test_summary_is_added_last_if_room_remains():
+    history = [_turn("user", 3)]
+
+    messages, _, usage = build_prompt(TEMPLATE, [], history, summary="User likes tea.", budget=500)
+    assert "User likes tea." in messages[0]["content"]
+    assert usage["summary"] > 0
+
+    messages, _, usage = build_prompt(TEMPLATE, [], history, summary="x " * 400, budget=50)
+    assert usage["summary"] == 0
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud
+from backend.database import Base
+from backend.models import Message
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _add_messages(db, user_id, count):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        db.add(Message(
+            user_id=user_id,
+            role="user",
+            content=f"m{i}",
+            timestamp=start + timedelta(minutes=i)
+        ))
+    db.commit()
+
+
+def test_recent_messages_returns_tail_oldest_first(db):
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    other = crud.get_or_create_user(db, "g2", "x@y.z", "X")
+    _add_messages(db, user.id, 25)
+    _add_messages(db, other.id, 5)
+
+    recent = crud.get_recent_messages(db, user.id, 10)
+
+    assert [m.content for m in recent] == [f"m{i}" for i in range(15, 25)]
+
+
+def test_messages_page_walks_back_with_cursor(db):
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _add_messages(db, user.id, 7)
+
+    page, cursor = crud.get_messages_page(db, user.id, limit=3)
+    assert [m.content for m in page] == ["m4", "m5", "m6"]
+
+    page, cursor = crud.get_messages_page(db, user.id, limit=3, before_id=cursor)
+    assert [m.content for m in page] == ["m1", "m2", "m3"]
+
+    page, cursor = crud.get_messages_page(db, user.id, limit=3, before_id=cursor)
+    assert [m.content for m in page] == ["m0"]
+    assert cursor is None
+
+
+def test_save_turn_commits_user_question_and_reply_together(db):
+    commits = []
+    original_commit = db.commit
+    db.commit = lambda: (commits.append(1), original_commit())
+
+    user = crud.save_turn(db, "g1", "a@b.c", "A", "hi", "hello", asked_at=datetime(2024, 1, 1))
+
+    assert len(commits) == 1
+    assert [(m.role, m.content) for m in crud.get_recent_messages(db, user.id, 10)] == [
+        ("user", "hi"), ("assistant", "hello")
+    ]
+
+
+def test_save_turn_without_reply_keeps_question(db):
+    user = crud.save_turn(db, "g1", "a@b.c", "A", "hi")
+
+    assert [m.role for m in crud.get_chat_history(db, user.id)] == ["user"]
+
+
+def test_paging_overlapping_turns_skips_nothing(db):
+    # Turn A was asked first but committed after turn B (slower generation)
+    t0 = datetime(2024, 1, 1)
+    crud.save_turn(db, "g1", "a@b.c", "A", "B-q", "B-r", asked_at=t0 + timedelta(seconds=1))
+    crud.save_turn(db, "g1", "a@b.c", "A", "A-q", "A-r", asked_at=t0)
+    user = crud.get_user_by_google_id(db, "g1")
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = crud.get_messages_page(db, user.id, 2, before_id=cursor)
+        seen = [m.content for m in page] + seen
+        if cursor is None:
+            break
+
+    assert seen == ["B-q", "B-r", "A-q", "A-r"]
+    recent = crud.get_recent_messages(db, user.id, 2, after_id=page[-1].id)
+    assert [m.content for m in recent] == ["A-q", "A-r"]
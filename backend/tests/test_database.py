@@ -0,0 +1,27 @@
+from sqlalchemy import text
+
+from backend.database import make_engine
+
+
+def test_sqlite_file_uses_wal_and_pooling(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    assert engine.pool.size() >= 1
+
+
+def test_in_memory_sqlite_still_works():
+    engine = make_engine("sqlite://")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_async_url_swaps_in_asyncio_drivers():
+    from backend.database import async_database_url
+
+    assert async_database_url("sqlite:///./chat.db").drivername == "sqlite+aiosqlite"
+    assert async_database_url(
+        "postgresql+psycopg2://u:p@db/chat"
+    ).render_as_string(hide_password=False) == "postgresql+asyncpg://u:p@db/chat"
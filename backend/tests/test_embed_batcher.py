@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.rag.embed_batcher import MicroBatcher
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_concurrent_calls_share_one_batch():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait=0.2)
+    texts = [f"query {i}" * (i + 1) for i in range(16)]
+    try:
+        with ThreadPoolExecutor(16) as pool:
+            vectors = list(pool.map(batcher, texts))
+    finally:
+        batcher.stop()
+
+    assert vectors == [[float(len(t)), 1.0] for t in texts]
+    assert len(model.calls) < len(texts)
+    assert batcher.stats()["items"] == 16
+    assert batcher.stats()["largest_batch"] > 1
+
+
+def test_batch_size_cap_and_dedup():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait=0.2)
+    batcher.start()
+    futures = [batcher.submit(text) for text in ["a", "a", "b", "c", "d", "e"]]
+    try:
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.stop()
+
+    assert results[0] == results[1] == [1.0, 1.0]
+    assert all(len(call) <= 4 for call in model.calls)
+    assert model.calls[0] == ["a", "b", "c"]  # 4 requests, "a" computed once
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    model = FakeModel()
+    failures = [RuntimeError("model crashed")]
+
+    def flaky(texts):
+        if failures:
+            raise failures.pop()
+        return model(texts)
+
+    batcher = MicroBatcher(flaky, max_batch_size=8, max_wait=0.05)
+    futures = [batcher.submit(t) for t in ("x", "y")]
+    try:
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model crashed"):
+                future.result(timeout=5)
+        assert batcher("ok") == [2.0, 1.0]  # the worker survived
+    finally:
+        batcher.stop()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from backend.rag.embedding_backends import OnnxEmbeddings, _normalize, load_embeddings
+
+MODEL = "all-MiniLM-L6-v2"
+
+DOCS = [
+    "Write-ahead logging lets readers proceed while a single writer commits.",
+    "An LRU cache evicts the least recently used entry once it is full.",
+    "BM25 scores documents by term frequency and inverse document frequency.",
+    "Exponential backoff with jitter spreads out retries after a failure.",
+    "HNSW graphs give approximate nearest neighbours in logarithmic time.",
+    "The invoice total includes tax and shipping charges.",
+    "Quarterly revenue grew by twelve percent year over year.",
+    "Photosynthesis converts light energy into chemical energy in plants.",
+]
+QUERIES = [
+    ("how do sqlite readers and writers avoid blocking", 0),
+    ("which cache entry gets evicted", 1),
+    ("keyword ranking formula for search", 2),
+    ("spacing out retry attempts", 3),
+    ("how much did sales increase", 6),
+]
+
+
+def _load(name, **kwargs):
+    try:
+        return load_embeddings(name, MODEL, **kwargs)
+    except ImportError as e:
+        pytest.skip(f"{name} backend unavailable: {e}")
+    except OSError as e:  # model files not cached and no network
+        pytest.skip(f"{MODEL} not available: {e}")
+
+
+@pytest.fixture(scope="module")
+def reference():
+    model = _load("torch")
+    return np.asarray(model.embed_documents(DOCS + [q for q, _ in QUERIES]))
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="EMBEDDING_BACKEND"):
+        load_embeddings("tpu", MODEL)
+
+
+def test_normalize_rows():
+    out = _normalize(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert np.allclose(out[0], [0.6, 0.8])
+    assert np.allclose(out[1], [0.0, 0.0])
+
+
+@pytest.mark.parametrize("name, options, min_cosine, mean_cosine", [
+    ("onnx", {}, 0.999, 0.9995),
+    ("onnx", {"onnx_file": "onnx/model_quint8_avx2.onnx"}, 0.95, 0.98),
+    ("torch_int8", {}, 0.95, 0.98),
+])
+def test_cosine_drift_against_torch(reference, name, options, min_cosine, mean_cosine):
+    model = _load(name, **options)
+    vectors = np.asarray(model.embed_documents(DOCS + [q for q, _ in QUERIES]))
+
+    cosines = (_normalize(reference) * _normalize(vectors)).sum(axis=1)
+    print(f"{name} {options}: cosine mean {cosines.mean():.5f} min {cosines.min():.5f}")
+    assert cosines.min() >= min_cosine
+    assert cosines.mean() >= mean_cosine
+
+    # Same nearest document for every query
+    docs, queries = _normalize(vectors[:len(DOCS)]), _normalize(vectors[len(DOCS):])
+    assert [int(i) for i in (queries @ docs.T).argmax(axis=1)] == [d for _, d in QUERIES]
+
+    # Single queries match the batched path (int8 scales are per batch)
+    single = _normalize(np.asarray([model.embed_query(DOCS[0])]))[0]
+    assert float(single @ _normalize(vectors[:1])[0]) >= 0.99
+
+
+def test_onnx_pads_batches_without_changing_vectors():
+    model = _load("onnx")
+    assert isinstance(model, OnnxEmbeddings)
+    alone = np.asarray(model.embed_query("short text"))
+    batched = np.asarray(model.embed_documents(["short text", DOCS[0] * 5])[0])
+    assert np.allclose(alone, batched, atol=1e-5)
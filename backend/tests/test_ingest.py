@@ -5,8 +5,6 @@
 # for d in docs:
 #     print(d.page_content)
 
-from backend.config import settings
-print(settings.GROQ_API_KEY)
 
 
 
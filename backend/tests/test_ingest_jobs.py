@@ -0,0 +1,95 @@
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+import pytest
+
+from backend import ingest_jobs
+from backend.config import settings
+
+
+@pytest.fixture
+def fake_ingest(monkeypatch):
+    """Replaces the RAG ingest function; jobs block until `release` is set."""
+    release = threading.Event()
+
+    def ingest_user_pdf(pdf_path, user_id, progress=None):
+        progress("embedding", pages=1, chunks=2)
+        release.wait(5)
+        if pdf_path == "bad.pdf":
+            raise ValueError("broken pdf")
+        return {"pages": 1, "chunks": 2}
+
+    module = types.ModuleType("backend.rag.ingest_user")
+    module.ingest_user_pdf = ingest_user_pdf
+    monkeypatch.setitem(sys.modules, "backend.rag.ingest_user", module)
+    monkeypatch.setattr(settings, "INGEST_JOB_WORKERS", 1)
+    monkeypatch.setattr(settings, "INGEST_QUEUE_SIZE", 1)
+
+    yield release
+    release.set()
+    ingest_jobs.stop_workers()
+
+
+def _wait_for(job_id, status):
+    for _ in range(200):
+        job = ingest_jobs.get_job(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job never reached {status}: {job}")
+
+
+def test_jobs_run_in_background_and_report_status(fake_ingest):
+    ok = ingest_jobs.submit_ingest_job("ok.pdf", "u1")
+    job = _wait_for(ok, "running")
+    assert job["stage"] == "embedding"
+    assert job["chunks"] == 2
+
+    fake_ingest.set()
+    assert _wait_for(ok, "done")["result"] == {"pages": 1, "chunks": 2}
+
+    bad = ingest_jobs.submit_ingest_job("bad.pdf", "u1")
+    assert _wait_for(bad, "failed")["error"] == "broken pdf"
+
+
+def test_full_queue_rejects_instead_of_blocking(fake_ingest):
+    a = ingest_jobs.submit_ingest_job("a.pdf", "u1")
+    _wait_for(a, "running")  # worker is now busy
+    ingest_jobs.submit_ingest_job("b.pdf", "u1")  # fills the queue
+
+    with pytest.raises(ingest_jobs.QueueFullError):
+        ingest_jobs.submit_ingest_job("c.pdf", "u1")
+
+
+def test_second_upload_of_a_file_waits_for_the_running_job(fake_ingest, monkeypatch, tmp_path):
+    seen = []
+
+    def ingest_user_pdf(pdf_path, user_id, progress=None):
+        seen.append(Path(pdf_path).read_bytes())
+        fake_ingest.wait(5)
+        return {}
+
+    sys.modules["backend.rag.ingest_user"].ingest_user_pdf = ingest_user_pdf
+    monkeypatch.setattr(settings, "INGEST_JOB_WORKERS", 2)
+    monkeypatch.setattr(settings, "INGEST_QUEUE_SIZE", 4)
+    target = tmp_path / "doc.pdf"
+    staged = []
+    for content in (b"v1", b"v2"):
+        staged.append(tmp_path / f".doc.pdf.{content.decode()}.part")
+        staged[-1].write_bytes(content)
+
+    first = ingest_jobs.submit_ingest_job(str(target), "u1", staged_path=str(staged[0]))
+    _wait_for(first, "running")
+    second = ingest_jobs.submit_ingest_job(str(target), "u1", staged_path=str(staged[1]))
+    time.sleep(0.05)
+
+    assert ingest_jobs.get_job(second)["status"] == "queued"
+    assert target.read_bytes() == b"v1"  # not replaced while the first job parses it
+
+    fake_ingest.set()
+    _wait_for(second, "done")
+    assert seen == [b"v1", b"v2"]
+    assert not any(path.exists() for path in staged)
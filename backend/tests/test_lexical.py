@@ -0,0 +1,66 @@
+import threading
+
+from backend.rag import lexical
+from backend.rag.lexical import BM25Index, load_lexical_index, tokenize
+
+
+def test_tokenize_keeps_codes_and_their_parts():
+    assert tokenize("Order IV-DELTA-204, v2.1") == [
+        "order", "iv-delta-204", "iv", "delta", "204", "v2.1", "v2", "1"
+    ]
+
+
+def test_exact_identifier_ranks_first():
+    index = BM25Index()
+    index.add("a", "The delta valve series covers many models.")
+    index.add("b", "Part IV-DELTA-204 is rated for high pressure.")
+    index.add("c", "Delta delta delta overview page.")
+
+    results = index.search("specs for IV-DELTA-204", k=2)
+
+    assert results[0][0].page_content.startswith("Part IV-DELTA-204")
+
+
+def test_remove_and_filter(tmp_path):
+    index = BM25Index(tmp_path / "bm25.json")
+    index.add("a", "apple pie", {"user_id": "u1", "source": "x.pdf"})
+    index.add("b", "apple juice", {"user_id": "u2", "source": "y.pdf"})
+
+    assert [d.metadata["user_id"] for d, _ in index.search("apple", 5, filter={"user_id": "u2"})] == ["u2"]
+
+    index.remove_source("x.pdf")
+    index.save()
+    reloaded = BM25Index.load(tmp_path / "bm25.json")
+    assert len(reloaded) == 1
+    assert reloaded.search("pie", 5) == []
+
+
+def test_slow_bootstrap_blocks_only_its_own_store(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_bootstrap():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ["a"], ["slow store text"], [{}]
+
+    results = []
+    loaders = [
+        threading.Thread(target=lambda: results.append(load_lexical_index(tmp_path / "slow", slow_bootstrap)))
+        for _ in range(2)
+    ]
+    for t in loaders:
+        t.start()
+    try:
+        assert started.wait(5)
+        other = load_lexical_index(tmp_path / "other")  # not stuck behind the bootstrap
+        assert len(other) == 0
+    finally:
+        release.set()
+        for t in loaders:
+            t.join(5)
+
+    assert calls == [1]  # the second load found the saved index
+    assert [len(index) for index in results] == [1, 1]
+    assert lexical._load_locks == {}
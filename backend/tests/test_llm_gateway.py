@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from backend.benchmarks.fake_groq import FakeLLM, start_server
+from backend.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailableError
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _run(llm, coro_fn, **options):
+    """Runs coro_fn(gateway) against a fake API serving `llm`."""
+    server, url = start_server(llm)
+    options = {"api_key": "fake", "base_url": url, "retry_base_delay": 0.001, **options}
+
+    async def main():
+        gateway = LLMGateway("primary", options.pop("fallback_model", None), **options)
+        try:
+            return await coro_fn(gateway)
+        finally:
+            await gateway.aclose()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        server.shutdown()
+
+
+def test_retries_transient_errors():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=3, script=[{"status": 503}, {"status": 429}])
+
+    reply = _run(llm, lambda g: g.complete(MESSAGES), max_retries=2)
+
+    assert reply.strip()
+    assert llm.calls == 3
+
+
+def test_timeout_then_fallback_model():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=3, script=[{"ttft_ms": 2000}, {"ttft_ms": 2000}])
+
+    reply = _run(llm, lambda g: g.complete(MESSAGES), timeout=0.2, max_retries=1,
+                 fallback_model="cheap")
+
+    assert reply.strip()
+    assert llm.models == ["primary", "primary", "cheap"]
+
+
+def test_open_breaker_routes_to_fallback_and_fails_fast_without_one():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=3, script=[{"status": 500}] * 2)
+
+    async def scenario(gateway):
+        with pytest.raises(LLMUnavailableError):
+            await gateway.complete(MESSAGES)  # 2 failures open the breaker
+        assert gateway.breakers["primary"].state == "open"
+        with pytest.raises(LLMUnavailableError):
+            await gateway.complete(MESSAGES)  # refused without a call
+
+    _run(llm, scenario, max_retries=1, breaker_failures=2)
+    assert llm.calls == 2
+
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=3, script=[{"status": 500}, {}, {"status": 500}])
+
+    async def with_fallback(gateway):
+        for _ in range(3):
+            await gateway.complete(MESSAGES)
+
+    _run(llm, with_fallback, max_retries=0, breaker_failures=2, fallback_model="cheap")
+    assert llm.models == ["primary", "cheap", "primary", "cheap", "cheap"]
+
+
+def test_hedge_answers_before_slow_primary():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=3, jitter=0, script=[{"ttft_ms": 3000}])
+
+    async def scenario(gateway):
+        start = asyncio.get_running_loop().time()
+        reply = await gateway.complete(MESSAGES)
+        return reply, asyncio.get_running_loop().time() - start
+
+    reply, elapsed = _run(llm, scenario, hedge=True, hedge_delay_ms=50)
+
+    assert reply.strip()
+    assert elapsed < 1.0
+    assert llm.calls == 2
+
+
+def test_stream_retries_only_before_first_token():
+    llm = FakeLLM(ttft_ms=0, token_ms=0, tokens=4, script=[{"status": 503}])
+
+    async def scenario(gateway):
+        return [token async for token in gateway.stream(MESSAGES)]
+
+    tokens = _run(llm, scenario, max_retries=1)
+
+    assert len(tokens) == 4
+    assert llm.calls == 2
+
+
+def test_abandoned_stream_closes_the_upstream_response():
+    llm = FakeLLM(ttft_ms=0, token_ms=5, tokens=50)
+    streams = []
+
+    async def scenario(gateway):
+        create = gateway.client.chat.completions.create
+
+        async def recording_create(**kwargs):
+            stream = await create(**kwargs)
+            streams.append(stream)
+            return stream
+
+        gateway.client.chat.completions.create = recording_create
+        tokens = gateway.stream(MESSAGES)
+        first = await tokens.__anext__()
+        await tokens.aclose()  # client went away after one token
+        return first
+
+    assert _run(llm, scenario)
+    assert len(streams) == 1 and streams[0].response.is_closed
+
+
+def test_concurrency_limit_rejects_when_queue_times_out():
+    llm = FakeLLM(ttft_ms=500, token_ms=0, tokens=1, jitter=0)
+
+    async def scenario(gateway):
+        return await asyncio.gather(
+            gateway.complete(MESSAGES), gateway.complete(MESSAGES), return_exceptions=True
+        )
+
+    results = _run(llm, scenario, max_concurrency=1, queue_timeout=0.1)
+
+    assert sum(isinstance(r, LLMUnavailableError) for r in results) == 1
+    assert llm.calls == 1
+
+
+def test_breaker_half_open_allows_single_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failures=1, reset_after=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.allow()      # the trial
+    assert not breaker.allow()  # only one at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
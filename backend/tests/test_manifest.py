@@ -0,0 +1,99 @@
+import os
+import threading
+
+from langchain_core.documents import Document
+
+from backend.rag import manifest as mf
+from backend.rag.lexical import load_lexical_index
+
+
+class FakeCollection:
+    def __init__(self):
+        self.where_deletes = []
+
+    def delete(self, where=None):
+        self.where_deletes.append(where)
+
+    def get(self, include, where=None):
+        return {"ids": [], "documents": [], "metadatas": []}
+
+
+class FakeStore:
+    def __init__(self):
+        self._collection = FakeCollection()
+        self.added = []
+        self.deleted = []
+
+    def add_documents(self, docs, ids):
+        self.added.extend(ids)
+
+    def delete(self, ids):
+        self.deleted.extend(ids)
+
+
+def test_chunk_id_is_stable_and_source_scoped():
+    assert mf.chunk_id("a.pdf", "text") == mf.chunk_id("a.pdf", "text")
+    assert mf.chunk_id("a.pdf", "text") != mf.chunk_id("b.pdf", "text")
+
+
+def test_touched_but_identical_file_counts_as_unchanged(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"v1")
+    manifest = {}
+    mf.record_file(manifest, pdf, ["id1"])
+
+    os.utime(pdf, (1, 1))
+    assert mf.file_unchanged(manifest, pdf)
+    assert manifest[str(pdf)]["mtime"] == 1
+
+    pdf.write_bytes(b"v2")
+    assert not mf.file_unchanged(manifest, pdf)
+
+
+def test_sync_chunks_is_incremental(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"v1")
+    db = FakeStore()
+
+    added, deleted = mf.sync_chunks(db, tmp_path, pdf, [Document(page_content="a"), Document(page_content="b")])
+    assert (added, deleted) == (2, 0)
+    assert db._collection.where_deletes == [{"source": str(pdf)}]  # legacy rows cleared once
+
+    added, deleted = mf.sync_chunks(db, tmp_path, pdf, [Document(page_content="a"), Document(page_content="a")])
+    assert (added, deleted) == (0, 1)
+    assert db.deleted == [mf.chunk_id(str(pdf), "b")]
+    assert len(db._collection.where_deletes) == 1
+
+    # BM25 index follows the same adds / deletes
+    assert len(load_lexical_index(tmp_path)) == 1
+
+
+def test_embedding_does_not_hold_the_manifest_lock(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowStore(FakeStore):
+        def add_documents(self, docs, ids):
+            started.set()
+            release.wait(5)
+            super().add_documents(docs, ids)
+
+    slow_pdf, other_pdf = tmp_path / "slow.pdf", tmp_path / "other.pdf"
+    slow_pdf.write_bytes(b"slow")
+    other_pdf.write_bytes(b"other")
+    db = SlowStore()
+    syncing = threading.Thread(
+        target=mf.sync_chunks, args=(db, tmp_path, slow_pdf, [Document(page_content="s")])
+    )
+    syncing.start()
+    try:
+        assert started.wait(5)
+        # Answered, and another file synced, while the slow file embeds
+        assert not mf.is_ingested(tmp_path, slow_pdf)
+        mf.sync_chunks(FakeStore(), tmp_path, other_pdf, [Document(page_content="o")])
+    finally:
+        release.set()
+        syncing.join(5)
+
+    # Both files recorded: the slow sync re-read the manifest before saving
+    assert set(mf.load_manifest(tmp_path)) == {str(slow_pdf), str(other_pdf)}
+    assert mf._store_locks == {}
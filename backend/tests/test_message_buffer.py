@@ -0,0 +1,167 @@
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import crud
+from backend.database import Base
+from backend.message_buffer import BufferFullError, MessageBuffer, merge_history
+from backend.models import Message
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _contents(session_factory):
+    db = session_factory()
+    try:
+        return [m.content for m in db.query(Message).order_by(Message.id)]
+    finally:
+        db.close()
+
+
+def test_buffered_messages_are_readable_before_and_after_flush(session_factory):
+    buffer = MessageBuffer(session_factory, batch_size=100, flush_interval=60)
+    buffer.add_turn("g1", "a@b.c", "A", "hi", "hello")
+    buffer.add_turn("g2", "x@y.z", "X", "other")
+
+    pending = buffer.pending("g1")
+    assert [m["content"] for m in pending] == ["hi", "hello"]
+    assert _contents(session_factory) == []
+
+    # A flush between reading the buffer and the DB must not duplicate messages
+    assert buffer.flush() == 3
+    db = session_factory()
+    user = crud.get_user_by_google_id(db, "g1")
+    rows = crud.get_recent_messages(db, user.id, 10)
+    assert [m["content"] for m in merge_history(rows, pending, 10)] == ["hi", "hello"]
+    assert buffer.pending("g1") == []
+    db.close()
+
+
+def test_flushes_in_background_once_batch_is_full(session_factory):
+    buffer = MessageBuffer(session_factory, batch_size=4, flush_interval=60)
+    buffer.start()
+    try:
+        buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+        buffer.add_turn("g1", "a@b.c", "A", "q2", "a2")
+        deadline = time.time() + 5
+        while len(buffer) and time.time() < deadline:
+            time.sleep(0.01)
+        assert _contents(session_factory) == ["q1", "a1", "q2", "a2"]
+        assert buffer.buffer_stats()["batches"] == 1
+    finally:
+        buffer.stop()
+
+
+def test_stop_flushes_everything_still_buffered(session_factory):
+    buffer = MessageBuffer(session_factory, batch_size=100, flush_interval=60)
+    buffer.start()
+    buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+    buffer.stop()
+
+    assert _contents(session_factory) == ["q1", "a1"]
+    assert len(buffer) == 0
+
+
+def test_failed_flush_keeps_messages_for_retry(session_factory):
+    calls = []
+
+    def flaky_factory():
+        session = session_factory()
+        if not calls:
+            calls.append(1)
+
+            def fail():
+                raise RuntimeError("database is locked")
+            session.commit = fail
+        return session
+
+    buffer = MessageBuffer(flaky_factory, batch_size=100, flush_interval=60)
+    buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert [m["content"] for m in buffer.pending("g1")] == ["q1", "a1"]
+    assert _contents(session_factory) == []
+
+    assert buffer.flush() == 2
+    assert _contents(session_factory) == ["q1", "a1"]
+    assert buffer.buffer_stats()["failures"] == 1
+
+
+def test_full_buffer_rejects_new_turns(session_factory):
+    buffer = MessageBuffer(session_factory, batch_size=100, flush_interval=60, max_pending=3)
+    buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+
+    with pytest.raises(BufferFullError):
+        buffer.add_turn("g1", "a@b.c", "A", "q2", "a2")
+    assert len(buffer) == 2
+    assert buffer.buffer_stats()["rejected"] == 1
+
+
+def test_poison_row_is_dropped_after_max_attempts(session_factory):
+    buffer = MessageBuffer(session_factory, batch_size=100, flush_interval=60, max_attempts=2)
+    buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+    buffer.add_turn("g2", "x@y.z", "X", object())  # cannot be bound by the driver
+    buffer.add_turn("g1", "a@b.c", "A", "q2")
+
+    with pytest.raises(Exception):
+        buffer.flush()
+    assert len(buffer) == 4 and _contents(session_factory) == []
+
+    assert buffer.flush() == 3
+    assert _contents(session_factory) == ["q1", "a1", "q2"]
+    assert len(buffer) == 0
+    assert buffer.buffer_stats()["dropped"] == 1
+
+
+def test_outage_keeps_every_message_after_max_attempts(session_factory):
+    def down():
+        raise RuntimeError("database is down")
+
+    buffer = MessageBuffer(down, batch_size=100, flush_interval=60, max_attempts=1)
+    buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert len(buffer) == 2
+    assert buffer.buffer_stats()["dropped"] == 0
+
+
+def test_process_exit_without_shutdown_hook_still_flushes(tmp_path):
+    db_path = tmp_path / "chat.db"
+    script = textwrap.dedent(f"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from backend.database import Base
+        from backend.message_buffer import MessageBuffer
+
+        engine = create_engine("sqlite:///{db_path}")
+        Base.metadata.create_all(bind=engine)
+        buffer = MessageBuffer(sessionmaker(bind=engine), batch_size=100, flush_interval=60)
+        buffer.start()
+        buffer.add_turn("g1", "a@b.c", "A", "q1", "a1")
+        # exits without buffer.stop(): the atexit hook has to flush
+    """)
+    subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, check=True, timeout=60)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    factory = sessionmaker(bind=engine)
+    assert _contents(factory) == ["q1", "a1"]
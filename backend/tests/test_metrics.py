@@ -0,0 +1,56 @@
+from backend.metrics import Registry, cache_collector
+from backend.timing import StageTimer
+from backend import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("req_seconds", "Request time", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="llm")
+    hist.observe(0.5, stage="llm")
+    hist.observe(5.0, stage="llm")
+
+    text = registry.render()
+    assert "# TYPE req_seconds histogram" in text
+    assert 'req_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'req_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'req_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'req_seconds_count{stage="llm"} 3' in text
+    assert 'req_seconds_sum{stage="llm"} 5.55' in text
+
+
+def test_counter_and_label_escaping():
+    registry = Registry()
+    counter = registry.counter("chunks_total", "Chunks", ("scope",))
+    counter.inc(3, scope="global")
+    counter.inc(scope='we"ird')
+
+    text = registry.render()
+    assert 'chunks_total{scope="global"} 3' in text
+    assert 'chunks_total{scope="we\\"ird"} 1' in text
+
+
+def test_cache_collector_and_broken_collector():
+    registry = Registry()
+    registry.add_collector(cache_collector("c", lambda: {"retrieval": {"hits": 4, "misses": 1, "size": 2}}))
+
+    def broken():
+        raise RuntimeError("boom")
+    registry.add_collector(broken)
+
+    text = registry.render()
+    assert 'c_hits_total{cache="retrieval"} 4' in text
+    assert 'c_entries{cache="retrieval"} 2' in text
+    assert "collector broken failed: boom" in text
+
+
+def test_stage_timer_feeds_request_histogram():
+    before = metrics.request_stage_seconds.count(endpoint="test", stage="retrieval")
+    timer = StageTimer("test")
+    with timer.stage("retrieval"):
+        pass
+    timer.as_dict()
+    timer.as_dict()
+
+    assert metrics.request_stage_seconds.count(endpoint="test", stage="retrieval") == before + 1
+    assert metrics.request_stage_seconds.count(endpoint="test", stage="total") == 1
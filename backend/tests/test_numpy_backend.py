@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from backend.config import settings
+from backend.rag.backends.numpy_backend import NumpyBackend
+
+
+class FakeCollection:
+    """Minimal Chroma collection: get() with include / limit / offset."""
+
+    def __init__(self, vectors, metadatas):
+        self.ids = [f"id{i}" for i in range(len(vectors))]
+        self.vectors = vectors
+        self.metadatas = metadatas
+        self.exports = 0
+
+    def get(self, include, limit=None, offset=0):
+        if "embeddings" in include and offset == 0:
+            self.exports += 1
+        end = len(self.ids) if limit is None else offset + limit
+        return {
+            "ids": self.ids[offset:end],
+            "embeddings": self.vectors[offset:end],
+            "documents": [f"text {i}" for i in range(len(self.ids))][offset:end],
+            "metadatas": self.metadatas[offset:end],
+        }
+
+
+class FakeStore:
+    def __init__(self, collection):
+        self._collection = collection
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((50, 8)).astype(np.float32)
+    metadatas = [{"user_id": "a" if i % 2 else "b"} for i in range(50)]
+    return vectors, metadatas
+
+
+def _exact(vectors, q, k, keep=None):
+    d = ((vectors - q) ** 2).sum(axis=1)
+    if keep is not None:
+        d = np.where(keep, d, np.inf)
+    return list(np.argsort(d)[:k])
+
+
+def test_matches_brute_force_squared_l2(tmp_path, corpus):
+    vectors, metadatas = corpus
+    backend = NumpyBackend(FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path)
+    q = vectors[3] + 0.01
+
+    results = backend.search(q.tolist(), k=5)
+
+    assert [doc.page_content for doc, _ in results] == [f"text {i}" for i in _exact(vectors, q, 5)]
+    assert results[0][1] == pytest.approx(float(((vectors[3] - q) ** 2).sum()), abs=1e-4)
+
+
+def test_filter_restricts_to_matching_metadata(tmp_path, corpus):
+    vectors, metadatas = corpus
+    backend = NumpyBackend(FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path)
+    keep = np.array([m["user_id"] == "a" for m in metadatas])
+
+    results = backend.search(vectors[0].tolist(), k=4, filter={"user_id": "a"})
+
+    assert all(doc.metadata["user_id"] == "a" for doc, _ in results)
+    assert [doc.page_content for doc, _ in results] == [f"text {i}" for i in _exact(vectors, vectors[0], 4, keep)]
+
+
+def test_index_is_reused_until_collection_changes(tmp_path, corpus):
+    vectors, metadatas = corpus
+    collection = FakeCollection(vectors.tolist(), metadatas)
+
+    NumpyBackend(FakeStore(collection), tmp_path)
+    NumpyBackend(FakeStore(collection), tmp_path)
+    assert collection.exports == 1
+
+    collection.ids[0] = "changed"
+    NumpyBackend(FakeStore(collection), tmp_path)
+    assert collection.exports == 2
+
+
+def test_float16_index_keeps_ranking(tmp_path, corpus):
+    vectors, metadatas = corpus
+    backend = NumpyBackend(FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path, dtype="float16")
+
+    results = backend.search(vectors[7].tolist(), k=1)
+
+    assert backend.matrix.dtype == np.float16
+    assert results[0][0].page_content == "text 7"
+
+
+def test_rebuild_leaves_open_instances_on_their_own_files(tmp_path, corpus):
+    vectors, metadatas = corpus
+    old = NumpyBackend(FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path)
+    q = vectors[7]
+    before = old.search(q.tolist(), k=3)
+
+    changed = FakeCollection((vectors[:30] * 2).tolist(), metadatas[:30])
+    changed.ids = [f"new{i}" for i in range(30)]
+    new = NumpyBackend(FakeStore(changed), tmp_path)
+
+    # The old mapping still reads the previous build, untouched
+    assert old.search(q.tolist(), k=3) == before
+    assert new.count() == 30
+    assert len(list(tmp_path.glob("embeddings*.npy"))) == 1
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_filter_masks_are_kept_lru_bounded(tmp_path, corpus, monkeypatch):
+    monkeypatch.setattr(settings, "FILTER_MASK_CACHE_SIZE", 2)
+    vectors, metadatas = corpus
+    backend = NumpyBackend(FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path)
+
+    for user in ("a", "b", "a", "c"):
+        backend.search(vectors[0].tolist(), k=2, filter={"user_id": user})
+
+    assert len(backend._masks) == 2
+    assert backend._masks.get({"user_id": "a"}) is backend._masks.get({"user_id": "a"})
+    assert backend.search(vectors[0].tolist(), k=2, filter={"user_id": "c"}) == []
+
+
+def test_backends_must_implement_the_interface():
+    from backend.rag.backends import RetrievalBackend
+
+    class Partial(RetrievalBackend):
+        def search(self, vector, k, filter=None):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert issubclass(NumpyBackend, RetrievalBackend)
+
+
+def test_hnsw_sparse_filter_falls_back_to_exact_search(tmp_path):
+    pytest.importorskip("hnswlib")
+    from backend.rag.backends.hnsw_backend import HnswBackend
+
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((2000, 16)).astype(np.float32)
+    keep = np.zeros(len(vectors), dtype=bool)
+    keep[[7, 900, 1500, 1998]] = True
+    metadatas = [{"user_id": "rare" if k else "common"} for k in keep]
+    # A tiny graph and ef: the walk cannot reach 3 of the 4 allowed nodes
+    backend = HnswBackend(
+        FakeStore(FakeCollection(vectors.tolist(), metadatas)), tmp_path,
+        m=2, ef_construction=2, ef_search=1
+    )
+
+    results = backend.search(vectors[0].tolist(), k=3, filter={"user_id": "rare"})
+
+    assert [doc.page_content for doc, _ in results] == [f"text {i}" for i in _exact(vectors, vectors[0], 3, keep)]
@@ -0,0 +1,101 @@
+import asyncio
+
+from backend.config import settings
+from backend.rag import query_cache, store_cache
+from backend.rag.embed_batcher import MicroBatcher
+from backend.rag.query_cache import TTLCache
+
+
+class FakeStore:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, vector, k, filter=None):
+        self.calls += 1
+        return [(f"doc-{i}", float(i)) for i in range(k)]
+
+
+def setup_function():
+    query_cache.retrieval_cache.clear()
+    store_cache.clear_store_cache()
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("q", [1.0])
+    assert cache.get("q") == [1.0]
+
+    now[0] += 6
+    assert cache.get("q") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_search_results_are_reused_until_ingest():
+    db = FakeStore()
+
+    query_cache.cached_search(db, "hello", [0.1], 3, scope="user", user_id="u1")
+    query_cache.cached_search(db, "hello", [0.1], 3, scope="user", user_id="u1")
+    assert db.calls == 1
+
+    # Ingest bumps the collection version
+    store_cache.invalidate_store("user", "u1")
+    query_cache.cached_search(db, "hello", [0.1], 3, scope="user", user_id="u1")
+    assert db.calls == 2
+
+
+def test_embed_query_runs_model_once(monkeypatch):
+    calls = []
+
+    class FakeEmbeddings:
+        def embed_query(self, text):
+            calls.append(text)
+            return [0.5]
+
+    monkeypatch.setattr(query_cache, "get_embeddings", lambda: FakeEmbeddings())
+    query_cache.query_embedding_cache.clear()
+
+    assert query_cache.embed_query("same") == [0.5]
+    assert query_cache.embed_query("same") == [0.5]
+    assert calls == ["same"]
+
+
+def test_async_embeds_share_one_batch_without_pool_threads(monkeypatch):
+    batches = []
+
+    def embed(texts):
+        batches.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = MicroBatcher(embed, max_batch_size=64, max_wait=0.2)
+    monkeypatch.setattr(settings, "QUERY_EMBED_BATCHING", True)
+    monkeypatch.setattr(query_cache, "get_query_batcher", lambda: batcher)
+    query_cache.query_embedding_cache.clear()
+
+    async def embed_all(queries):
+        return await asyncio.gather(*(query_cache.aembed_query(q) for q in queries))
+
+    queries = [f"q{i}" * (i + 1) for i in range(20)]  # more than RETRIEVAL_WORKERS
+    try:
+        vectors = asyncio.run(embed_all(queries))
+    finally:
+        batcher.stop()
+        query_cache.query_embedding_cache.clear()
+
+    assert vectors == [[float(len(q))] for q in queries]
+    assert batches == [queries]
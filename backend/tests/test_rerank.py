@@ -0,0 +1,96 @@
+import threading
+
+from backend.rag import rerank as rerank_mod
+from backend.timing import StageTimer
+
+
+class Doc:
+    def __init__(self, text, source="a.pdf"):
+        self.page_content = text
+        self.metadata = {"source": source}
+
+
+class FakeCrossEncoder:
+    def __init__(self, release=None):
+        self.calls = []
+        self.release = release
+
+    def predict(self, pairs, batch_size=32):
+        if self.release is not None:
+            self.release.wait(5)
+        self.calls.append(len(pairs))
+        # Longer chunks are "more relevant"
+        return [float(len(text)) for _, text in pairs]
+
+
+def setup_function():
+    rerank_mod.score_cache.clear()
+
+
+def _wait_idle():
+    """Blocks until no scoring job holds a slot."""
+    assert rerank_mod._slots.acquire(timeout=5)
+    rerank_mod._slots.release()
+
+
+def test_rerank_reorders_and_caches_scores(monkeypatch):
+    model = FakeCrossEncoder()
+    monkeypatch.setattr(rerank_mod, "get_reranker", lambda: model)
+    chunks = [(Doc("a"), 0.1), (Doc("ccc"), 0.2), (Doc("bb"), 0.3)]
+
+    ranked, reranked = rerank_mod.rerank("q", chunks, top_n=2, timeout=5)
+    assert reranked
+    assert [doc.page_content for doc, _ in ranked] == ["ccc", "bb"]
+
+    rerank_mod.rerank("q", chunks, top_n=2, timeout=5)
+    assert model.calls == [3]
+
+
+def test_rerank_falls_back_to_retrieval_order_on_timeout(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(rerank_mod, "get_reranker", lambda: FakeCrossEncoder(release))
+    chunks = [(Doc("a"), 0.1), (Doc("ccc"), 0.2), (Doc("bb"), 0.3)]
+
+    ranked, reranked = rerank_mod.rerank("q", chunks, top_n=2, timeout=0.01)
+    release.set()
+
+    assert not reranked
+    assert ranked == chunks[:2]
+    _wait_idle()
+
+
+def test_rerank_skips_while_a_job_is_in_flight(monkeypatch):
+    release = threading.Event()
+    model = FakeCrossEncoder(release)
+    monkeypatch.setattr(rerank_mod, "get_reranker", lambda: model)
+    busy = rerank_mod.rerank_stats()["busy"]
+
+    rerank_mod.rerank("slow", [(Doc("a"), 0.1)], timeout=0.01)
+    ranked, reranked = rerank_mod.rerank("q", [(Doc("b"), 0.1), (Doc("cc"), 0.2)], top_n=2, timeout=5)
+    release.set()
+    _wait_idle()
+
+    assert not reranked and [doc.page_content for doc, _ in ranked] == ["b", "cc"]
+    assert rerank_mod.rerank_stats()["busy"] == busy + 1
+    assert model.calls == [1]  # the second query never reached the model
+
+
+def test_rerank_falls_back_when_the_model_cannot_load(monkeypatch):
+    def missing():
+        raise ImportError("No module named 'sentence_transformers'")
+
+    monkeypatch.setattr(rerank_mod, "get_reranker", missing)
+    chunks = [(Doc("a"), 0.1), (Doc("bb"), 0.2)]
+
+    assert rerank_mod.rerank("q", chunks, top_n=2, timeout=5) == (chunks, False)
+    _wait_idle()
+
+
+def test_stage_timer_accumulates_stages():
+    timer = StageTimer()
+    timer.record("save", 0.001)
+    timer.record("save", 0.002)
+
+    timings = timer.as_dict()
+    assert timings["save_ms"] == 3.0
+    assert "total_ms" in timings
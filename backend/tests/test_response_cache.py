@@ -0,0 +1,71 @@
+from backend.rag import response_cache as rc
+from backend.rag.response_cache import SemanticCache, cache_scope, context_fingerprint, shared_cache_key
+
+
+class Doc:
+    def __init__(self, text, source="a.pdf", scope="global"):
+        self.page_content = text
+        self.metadata = {"source": source, "scope": scope}
+
+
+def test_similar_query_with_same_context_hits():
+    cache = SemanticCache(maxsize=10, ttl=60, threshold=0.95)
+    cache.set([1.0, 0.0], "global", "ctx", {"response": "answer"})
+
+    assert cache.get([0.99, 0.05], "global", "ctx") == {"response": "answer"}
+    assert cache.get([0.0, 1.0], "global", "ctx") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_different_context_or_scope_misses():
+    cache = SemanticCache(maxsize=10, ttl=60, threshold=0.9)
+    cache.set([1.0, 0.0], "user/alice", "ctx", {"response": "private"})
+
+    assert cache.get([1.0, 0.0], "user/bob", "ctx") is None
+    assert cache.get([1.0, 0.0], "user/alice", "other") is None
+
+
+def test_entries_expire_and_evict_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rc.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(maxsize=2, ttl=5, threshold=0.9)
+    cache.set([1.0, 0.0], "global", "a", 1)
+    cache.set([1.0, 0.0], "global", "b", 2)
+    cache.get([1.0, 0.0], "global", "a")
+    cache.set([1.0, 0.0], "global", "c", 3)
+
+    assert cache.get([1.0, 0.0], "global", "b") is None
+    assert cache.get([1.0, 0.0], "global", "a") == 1
+
+    now[0] += 6
+    assert cache.get([1.0, 0.0], "global", "c") is None
+    assert len(cache) == 1
+
+
+def test_scope_and_fingerprint_follow_retrieved_docs():
+    global_docs = [Doc("x"), Doc("y")]
+    mixed = [Doc("x"), Doc("mine", "notes.pdf", scope="user")]
+
+    assert cache_scope(global_docs, "alice") == "global"
+    assert cache_scope(mixed, "alice") == "user/alice"
+    assert context_fingerprint(global_docs) == context_fingerprint([Doc("x"), Doc("y")])
+    assert context_fingerprint(global_docs) != context_fingerprint([Doc("y"), Doc("x")])
+
+
+def test_same_global_question_hits_across_users_with_different_histories():
+    cache = SemanticCache(maxsize=10, ttl=60, threshold=0.95)
+    docs = [Doc("x"), Doc("y")]
+
+    # Alice (long private history) asks first; her history never reaches
+    # the prompt of a cacheable turn, so the key holds none of it
+    alice = shared_cache_key([1.0, 0.0], docs)
+    cache.set(*alice, {"response": "generic"})
+
+    # Bob, with a different history, asks nearly the same question
+    bob = shared_cache_key([0.99, 0.05], [Doc("x"), Doc("y")])
+    assert cache.get(*bob) == {"response": "generic"}
+
+
+def test_turns_with_user_docs_are_not_cached():
+    assert shared_cache_key([1.0, 0.0], [Doc("x"), Doc("mine", "notes.pdf", scope="user")]) is None
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.documents import Document
+
+from backend.config import settings
+from backend.rag import retriever
+from backend.rag.query_cache import retrieval_cache
+
+
+class FakeBackend:
+    """Returns fixed (document, distance) hits, optionally after `release`."""
+
+    def __init__(self, hits, release=None):
+        self.hits = hits
+        self.release = release
+        self.calls = 0
+
+    def search(self, vector, k, filter=None):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return [(Document(page_content=text, metadata={"source": f"{text}.pdf"}), d) for text, d in self.hits][:k]
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    monkeypatch.setattr(settings, "HYBRID_SEARCH", False)
+    monkeypatch.setattr(settings, "USER_STORE_LAYOUT", "per_user")
+    monkeypatch.setattr(settings, "RETRIEVAL_TIMEOUT_GLOBAL", 2.0)
+    monkeypatch.setattr(settings, "RETRIEVAL_TIMEOUT_USER", 0.05)
+    monkeypatch.setattr(retriever, "embed_query", lambda query: [0.0, 1.0])
+
+    async def aembed_query(query):
+        return [0.0, 1.0]
+
+    monkeypatch.setattr(retriever, "aembed_query", aembed_query)
+    retrieval_cache.clear()
+
+    scopes = {
+        "global": FakeBackend([("g1", 0.3), ("g2", 0.9)]),
+        "user": FakeBackend([("u1", 0.1), ("u2", 0.5)]),
+    }
+    monkeypatch.setattr(retriever, "get_global_backend", lambda: scopes["global"])
+    monkeypatch.setattr(retriever, "get_user_backend", lambda user_id: scopes["user"])
+    yield scopes
+    retrieval_cache.clear()
+
+
+def _texts(results):
+    return [(doc.page_content, doc.metadata["scope"]) for doc, _ in results]
+
+
+def test_scopes_are_merged_by_distance(backends):
+    results = retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)
+
+    assert _texts(results) == [("u1", "user"), ("g1", "global"), ("u2", "user"), ("g2", "global")]
+
+
+def test_fused_scores_are_merged_highest_first(backends, monkeypatch):
+    monkeypatch.setattr(settings, "HYBRID_SEARCH", True)
+    monkeypatch.setattr(retriever, "fuse_results", lambda vector, lexical, weights, k: vector)
+    monkeypatch.setattr(retriever, "get_global_lexical", lambda: FakeBackend([]))
+    monkeypatch.setattr(retriever, "get_user_lexical", lambda user_id: FakeBackend([]))
+
+    results = retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)
+
+    assert [doc.page_content for doc, _ in results] == ["g2", "u2", "g1", "u1"]
+
+
+def test_slow_user_scope_is_skipped_and_fills_the_cache(backends):
+    release = threading.Event()
+    backends["user"].release = release
+
+    start = time.perf_counter()
+    results = retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert _texts(results) == [("g1", "global"), ("g2", "global")]
+    assert elapsed < 1.0
+
+    # The abandoned search finishes in the background; the next turn reuses it
+    deadline = time.time() + 5
+    while retrieval_cache.stats()["size"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    results = retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)
+    assert [doc.page_content for doc, _ in results] == ["u1", "g1", "u2", "g2"]
+    assert backends["user"].calls == 1
+
+
+def test_async_retrieval_skips_a_slow_scope_without_cancelling_it(backends):
+    release = threading.Event()
+    backends["user"].release = release
+
+    results = asyncio.run(retriever.aretrieve_chunks("q", "u", k_global=2, k_user=2))
+    release.set()
+
+    assert _texts(results) == [("g1", "global"), ("g2", "global")]
+    deadline = time.time() + 5
+    while retrieval_cache.stats()["size"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert retrieval_cache.stats()["size"] == 2  # the user search still completed
+
+
+def test_without_user_only_global_is_searched(backends):
+    results = retriever.retrieve_chunks("q", None, k_global=1)
+
+    assert _texts(results) == [("g1", "global")]
+    assert backends["user"].calls == 0
+
+
+def test_scope_with_searches_pending_is_skipped_at_once(backends, monkeypatch):
+    monkeypatch.setitem(retriever._slots, "user", threading.BoundedSemaphore(1))
+    release = threading.Event()
+    backends["user"].release = release
+
+    retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)  # times out, still running
+    results = retriever.retrieve_chunks("q2", "u", k_global=2, k_user=2)
+    release.set()
+
+    assert _texts(results) == [("g1", "global"), ("g2", "global")]
+    assert backends["user"].calls == 1  # the second turn never queued a search
+
+
+def test_timed_out_search_that_never_started_is_cancelled(backends, monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(retriever, "_executor", pool)
+    monkeypatch.setattr(settings, "RETRIEVAL_TIMEOUT_GLOBAL", 0.05)
+    release = threading.Event()
+    backends["global"].release = release  # holds the only worker
+
+    results = retriever.retrieve_chunks("q", "u", k_global=2, k_user=2)
+    release.set()
+    pool.shutdown(wait=True)
+
+    assert results == []
+    assert backends["user"].calls == 0
@@ -0,0 +1,107 @@
+import pytest
+
+from backend.config import settings
+from backend.rag import store_cache
+
+
+def setup_function():
+    store_cache.clear_store_cache()
+
+
+def test_handle_is_built_once_and_reused():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    first = store_cache.get_cached_store("global", factory=factory)
+    second = store_cache.get_cached_store("global", factory=factory)
+
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_empty_user_store_is_cached_until_invalidated():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return None
+
+    assert store_cache.get_cached_store("user", "u1", factory) is None
+    assert store_cache.get_cached_store("user", "u1", factory) is None
+    assert len(calls) == 1
+
+    store_cache.invalidate_store("user", "u1")
+    store_cache.get_cached_store("user", "u1", factory)
+    assert len(calls) == 2
+
+
+def test_user_stores_are_evicted_lru(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_OPEN_USER_STORES", 2)
+
+    store_cache.get_cached_store("user", "a", object)
+    store_cache.get_cached_store("user", "b", object)
+    store_cache.get_cached_store("user", "a", object)  # a is now most recent
+    store_cache.get_cached_store("user", "c", object)  # evicts b
+
+    stats = store_cache.store_cache_stats()
+    assert stats["open_user_stores"] == 2
+    assert stats["evictions"] == 1
+
+    calls = []
+    store_cache.get_cached_store("user", "a", lambda: calls.append(1))
+    assert calls == []
+
+
+def test_invalidate_drops_derived_handles():
+    store_cache.get_cached_store("global", factory=object)
+    store_cache.get_cached_store("global/numpy", factory=object)
+    store_cache.get_cached_store("user/numpy", "u1", object)
+
+    store_cache.invalidate_store("global")
+
+    calls = []
+    store_cache.get_cached_store("global/numpy", factory=lambda: calls.append(1))
+    store_cache.get_cached_store("user/numpy", "u1", lambda: calls.append(2))
+    assert calls == [1]
+
+
+def test_build_overlapping_an_invalidation_is_not_cached():
+    built = []
+
+    def racing_factory():
+        built.append("old")
+        store_cache.invalidate_store("user", "u1")  # an ingest lands mid-build
+        return None
+
+    assert store_cache.get_cached_store("user", "u1", racing_factory) is None
+
+    handle = object()
+    assert store_cache.get_cached_store("user", "u1", lambda: handle) is handle
+    assert built == ["old"]
+
+
+def test_evicted_chroma_stores_release_their_system(monkeypatch, tmp_path):
+    chromadb = pytest.importorskip("chromadb")
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    monkeypatch.setattr(settings, "MAX_OPEN_USER_STORES", 2)
+    monkeypatch.setattr(settings, "STORE_CLOSE_GRACE", 0)
+
+    class Store:  # what langchain's Chroma keeps: the client as ._client
+        def __init__(self, path):
+            self._client = chromadb.PersistentClient(path=str(path))
+
+    def open_systems():
+        return [i for i in SharedSystemClient._identifier_to_system if i.startswith(str(tmp_path))]
+
+    for i in range(5):
+        store_cache.get_cached_store("user", f"u{i}", lambda: Store(tmp_path / f"u{i}"))
+        assert len(open_systems()) <= 2
+
+    store_cache.invalidate_store("user", "u4")
+    assert len(open_systems()) == 1
+    store_cache.clear_store_cache()
+    assert open_systems() == []
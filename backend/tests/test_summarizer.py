@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import crud, summarizer
+from backend.config import settings
+from backend.database import Base
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_ENABLED", True)
+    monkeypatch.setattr(settings, "SUMMARY_EVERY_TURNS", 2)
+    monkeypatch.setattr(settings, "SUMMARY_KEEP_MESSAGES", 2)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    seen = []
+
+    def fake_complete(prompt):
+        seen.append(prompt)
+        return f"summary {len(seen)}"
+
+    monkeypatch.setattr(summarizer, "complete", fake_complete)
+    return seen
+
+
+def _chat(db, user_id, turns, start=0):
+    for i in range(start, start + turns):
+        crud.save_message(db, user_id, "user", f"q{i}")
+        crud.save_message(db, user_id, "assistant", f"a{i}")
+
+
+def test_waits_for_enough_turns(session_factory, prompts):
+    db = session_factory()
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _chat(db, user.id, 2)  # 4 messages, 2 kept raw -> only 1 turn to fold
+
+    assert not summarizer.summarize_user(session_factory, user.id)
+    assert prompts == []
+
+
+def test_folds_older_turns_and_keeps_recent_raw(session_factory, prompts):
+    db = session_factory()
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _chat(db, user.id, 3)
+
+    assert summarizer.summarize_user(session_factory, user.id)
+    summary = crud.get_summary(db, user.id)
+    assert summary.content == "summary 1"
+    assert "q0" in prompts[0] and "a1" in prompts[0] and "q2" not in prompts[0]
+
+    recent = crud.get_recent_messages(db, user.id, 20, after_id=summary.last_message_id)
+    assert [m.content for m in recent] == ["q2", "a2"]
+
+    # Next update builds on the previous summary
+    _chat(db, user.id, 2, start=3)
+    assert summarizer.summarize_user(session_factory, user.id)
+    assert "summary 1" in prompts[1] and "q0" not in prompts[1]
+    db.expire_all()
+    assert crud.get_summary(db, user.id).content == "summary 2"
+
+
+def test_schedule_runs_in_background_once_per_user(session_factory, prompts):
+    db = session_factory()
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _chat(db, user.id, 3)
+
+    assert not summarizer.schedule_summary(session_factory, user.id, unsummarized=5)
+    try:
+        assert summarizer.schedule_summary(session_factory, user.id, unsummarized=6)
+        summarizer._queue.join()
+    finally:
+        summarizer.stop_worker()
+
+    assert crud.get_summary(db, user.id).content == "summary 1"
+
+
+def test_long_backlog_is_folded_oldest_first_in_capped_batches(session_factory, prompts, monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_MAX_MESSAGES", 4)
+    db = session_factory()
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _chat(db, user.id, 6)
+
+    assert summarizer.summarize_user(session_factory, user.id)
+    assert "a1" in prompts[0] and "q2" not in prompts[0]
+    summary = crud.get_summary(db, user.id)
+    assert [m.content for m in crud.get_unsummarized_messages(db, user.id, summary.last_message_id)][:2] == ["q2", "a2"]
+
+    assert summarizer.summarize_user(session_factory, user.id)
+    assert "q2" in prompts[1] and "a3" in prompts[1] and "q4" not in prompts[1]
+    assert not summarizer.summarize_user(session_factory, user.id)  # only the kept messages remain
+
+
+def test_failed_user_backs_off_before_retrying(session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "SUMMARY_RETRY_SECONDS", 60)
+    calls = []
+
+    def failing(prompt):
+        calls.append(prompt)
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(summarizer, "complete", failing)
+    db = session_factory()
+    user = crud.get_or_create_user(db, "g1", "a@b.c", "A")
+    _chat(db, user.id, 3)
+
+    try:
+        assert summarizer.schedule_summary(session_factory, user.id, unsummarized=6)
+        summarizer._queue.join()
+        assert len(calls) == 1
+        assert not summarizer.schedule_summary(session_factory, user.id, unsummarized=8)
+
+        summarizer._failures[user.id] = (1, 0.0)  # backoff elapsed
+        assert summarizer.schedule_summary(session_factory, user.id, unsummarized=8)
+        summarizer._queue.join()
+        assert summarizer._failures[user.id][0] == 2
+    finally:
+        summarizer.stop_worker()
+        summarizer._failures.clear()
+
@@ -0,0 +1,14 @@
+import pytest
+
+from backend.validation import safe_user_id
+
+
+@pytest.mark.parametrize("user_id", ["117238411953218", "user_1", "a.b@example.com"])
+def test_accepts_ids(user_id):
+    assert safe_user_id(user_id) == user_id
+
+
+@pytest.mark.parametrize("user_id", ["", None, ".", "..", "../../x", "a/b", "a\\b", "x" * 129, "a b"])
+def test_rejects_ids_that_could_escape_a_directory(user_id):
+    with pytest.raises(ValueError):
+        safe_user_id(user_id)
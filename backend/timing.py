@@ -0,0 +1,49 @@
+# ==============================
+# timing.py - Per-stage request timing
+# ==============================
+
+import time
+from contextlib import contextmanager
+
+from backend.metrics import request_stage_seconds
+
+
+class StageTimer:
+    """
+    Collects how long each stage of a request took.
+    With an `endpoint`, every stage (and the total, once) is also
+    observed in the copilot_request_stage_seconds histogram.
+
+        timer = StageTimer("chat")
+        with timer.stage("retrieval"):
+            ...
+        timer.as_dict()  # {"retrieval_ms": 12.3, "total_ms": 12.4}
+    """
+
+    def __init__(self, endpoint: str = None):
+        self.start = time.perf_counter()
+        self.endpoint = endpoint
+        self.stages = {}
+        self._total_observed = False
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.endpoint:
+            request_stage_seconds.observe(seconds, endpoint=self.endpoint, stage=name)
+
+    def as_dict(self):
+        total = time.perf_counter() - self.start
+        if self.endpoint and not self._total_observed:
+            request_stage_seconds.observe(total, endpoint=self.endpoint, stage="total")
+            self._total_observed = True
+        timings = {f"{name}_ms": round(s * 1000, 2) for name, s in self.stages.items()}
+        timings["total_ms"] = round(total * 1000, 2)
+        return timings
@@ -0,0 +1,22 @@
+# ==============================
+# validation.py - Checks on identifiers that end up in file paths
+# ==============================
+
+import re
+
+# Google account ids are digits; allow the usual id characters, never
+# path separators or a bare "." / ".."
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9_.@-]{1,128}")
+
+
+def safe_user_id(user_id) -> str:
+    """
+    Returns `user_id` if it is safe to use as a directory name.
+
+    Raises:
+        ValueError: empty, too long, "."/"..", or containing other characters
+    """
+    user_id = str(user_id or "")
+    if not USER_ID_PATTERN.fullmatch(user_id) or set(user_id) == {"."}:
+        raise ValueError(f"Invalid user id: {user_id!r}")
+    return user_id
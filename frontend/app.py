@@ -2,6 +2,7 @@
 # app.py - Streamlit Frontend
 # ==============================
 
+import json
 import streamlit as st
 import requests
 from datetime import datetime
@@ -12,6 +13,37 @@ from auth.google_auth import login, logout
 # -----------------------------
 BACKEND_URL = "https://knowledge-copilot-mo21.onrender.com"
 
+# -----------------------------
+# Streaming helper
+# -----------------------------
+def stream_reply(payload, result):
+    """
+    Posts to /chat/stream and yields tokens as they arrive (server-sent events).
+    The final `done` / `error` event payload is stored in `result`.
+    """
+    with requests.post(
+        f"{BACKEND_URL}/chat/stream",
+        json=payload,
+        stream=True,
+        timeout=60
+    ) as response:
+        if response.status_code != 200:
+            result["error"] = f"Backend Error {response.status_code}"
+            return
+
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                if event == "token":
+                    yield data["token"]
+                elif event == "done":
+                    result.update(data)
+                elif event == "error":
+                    result["error"] = data["error"]
+
 # -----------------------------
 # Page Configuration
 # Must be first Streamlit command
@@ -126,33 +158,41 @@ if prompt:
     # Call backend for AI response
     # -----------------------------
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = requests.post(
-                    f"{BACKEND_URL}/chat",
-                    json={
+        result = {}
+        try:
+            # Render tokens progressively as the backend streams them
+            reply = st.write_stream(
+                stream_reply(
+                    {
                         "google_id": user["id"],
                         "email": user["email"],
                         "name": user["name"],
                         "message": prompt
                     },
-                    timeout=60
+                    result
                 )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    reply = data.get("response", "No response from AI")
-                    ai_timestamp = datetime.now().strftime("%Y-%m-%d %I:%M %p")
-                else:
-                    reply = f"Backend Error {response.status_code}"
-                    ai_timestamp = None
-
-            except Exception as e:
-                reply = f"Connection failed:\n{str(e)}"
+            )
+
+            # Timing breakdown etc. of the last turn, for Developer Mode
+            st.session_state.last_turn = {
+                key: result[key]
+                for key in ("timings", "context_tokens", "cached", "sources")
+                if key in result
+            }
+
+            if "error" in result:
+                reply = result["error"]
+                st.markdown(reply)
                 ai_timestamp = None
+            else:
+                reply = reply or "No response from AI"
+                ai_timestamp = datetime.now().strftime("%Y-%m-%d %I:%M %p")
+
+        except Exception as e:
+            reply = f"Connection failed:\n{str(e)}"
+            ai_timestamp = None
+            st.markdown(reply)
 
-        # Display AI reply
-        st.markdown(reply)
         if ai_timestamp:
             st.caption(ai_timestamp)
 
@@ -176,3 +216,25 @@ if show_debug:
         "messages_count": len(st.session_state.messages),
         "backend_url": BACKEND_URL
     })
+
+    # Where the last turn spent its time (per-stage timings from the backend)
+    last_turn = st.session_state.get("last_turn") or {}
+    timings = last_turn.get("timings")
+    if timings:
+        st.subheader("⏱️ Last Turn Timing")
+        st.metric("Total", f"{timings.get('total_ms', 0):.0f} ms")
+        stages = {
+            name[:-len("_ms")]: ms
+            for name, ms in timings.items()
+            if name != "total_ms"
+        }
+        st.bar_chart(
+            {"stage": list(stages), "ms": list(stages.values())},
+            x="stage",
+            y="ms"
+        )
+        st.json({
+            "cached_response": last_turn.get("cached", False),
+            "context_tokens": last_turn.get("context_tokens"),
+            "sources": last_turn.get("sources")
+        })